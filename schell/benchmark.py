@@ -0,0 +1,246 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Benchmarks of the Schelling's segregation model.
+
+Boards of a list of sizes are created, populated and run a number of times, after some
+warmup runs, timing each phase in wall clock and CPU time. The medians and spread of the
+timings are saved as JSON, which plot.py reads to draw the time vs board size plots.
+Every board has the same neighbourhood, update mode and relocation policy, those of the main arguments.
+"""
+
+# Python Modules
+import json
+import platform
+import statistics
+import time
+
+# Project Modules
+import schelling
+from neighbourhood import MOORE
+
+
+PHASES = ['create', 'populate', 'run', 'initialization', 'iteration', 'total']
+
+
+def time_board(engine, size, empty_ratio, agent_prob, intolerance_threshold, num_iterations,
+               incremental=False, seed=None, neighbourhood=None, synchronous=False, relocation='random',
+               candidates=8):
+    """
+    Creates, populates and runs one board, timing each phase.
+    Initialization is create and populate together, as in schelling.main.
+
+    :param engine: string, the board's implementation (see schelling.board_class)
+    :param size: int, the board's width and height
+    :param empty_ratio: float, the board's percentage of empty houses
+    :param agent_prob: list of floats, the cumulative probability of each race
+    :param intolerance_threshold: list of floats, the intolerance threshold of each race
+    :param num_iterations: int, the maximum number of iterations
+    :param incremental: Boolean, only check the agents whose neighbourhood changed
+    :param seed: int, the seed of the board
+    :param neighbourhood: neighbourhood.Neighbourhood, the neighbours of every house, MOORE if None
+    :param synchronous: Boolean, move every unhappy agent of an iteration together
+    :param relocation: string, one of vacancies.POLICIES, where the unhappy agents move to
+    :param candidates: int, the number of empty houses drawn by the best_of_k relocation
+    :return: tuple, a dict from phase to (wall, cpu) seconds and the number of iterations run
+    """
+
+    relocation = {} if relocation == 'random' else {'relocation': relocation, 'candidates': candidates}
+    clocks = [(time.perf_counter(), time.process_time())]
+    board = schelling.board_class(engine)(size, size, empty_ratio, seed, neighbourhood, **relocation)
+    clocks.append((time.perf_counter(), time.process_time()))
+    board.populate(agent_prob, intolerance_threshold)
+    clocks.append((time.perf_counter(), time.process_time()))
+    iterations = board.run(num_iterations, incremental, synchronous=synchronous)
+    clocks.append((time.perf_counter(), time.process_time()))
+
+    timings = {phase: (end[0] - start[0], end[1] - start[1])
+               for phase, start, end in zip(PHASES, clocks, clocks[1:])}
+    timings['initialization'] = (clocks[2][0] - clocks[0][0], clocks[2][1] - clocks[0][1])
+    # A run of no iterations spends no time on them
+    timings['iteration'] = tuple(clock / iterations if iterations else 0.0 for clock in timings['run'])
+    timings['total'] = (clocks[3][0] - clocks[0][0], clocks[3][1] - clocks[0][1])
+    return timings, iterations
+
+
+def summarize(samples):
+    """
+    Summarizes the timings of a phase.
+
+    :param samples: list of floats, the seconds taken by each repeat
+    :return: dict, with the median, minimum, maximum and standard deviation and the samples
+    """
+
+    return {'median': statistics.median(samples), 'min': min(samples), 'max': max(samples),
+            'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0, 'samples': samples}
+
+
+def benchmark(engines, sizes, warmup=1, repeats=5, empty_ratio=0.1, agent_prob=(0.5, 1),
+              intolerance_threshold=(0.5, 0.5), num_iterations=500, incremental=False, seed=0,
+              neighbourhood=None, synchronous=False, relocation='random', candidates=8):
+    """
+    Times every engine on boards of every size.
+    Every repeat of a size uses the same seed, so the runs only differ in their timings.
+
+    :param engines: list of strings, the boards' implementations
+    :param sizes: list of ints, the boards' width and height
+    :param warmup: int, the number of runs of each size before the timed ones
+    :param repeats: int, the number of timed runs of each size
+    :param empty_ratio: float, the boards' percentage of empty houses
+    :param agent_prob: list of floats, the cumulative probability of each race
+    :param intolerance_threshold: list of floats, the intolerance threshold of each race
+    :param num_iterations: int, the maximum number of iterations of each run
+    :param incremental: Boolean, only check the agents whose neighbourhood changed
+    :param seed: int, the seed of every board
+    :param neighbourhood: neighbourhood.Neighbourhood, the neighbours of every house, MOORE if None
+    :param synchronous: Boolean, move every unhappy agent of an iteration together
+    :param relocation: string, one of vacancies.POLICIES, where the unhappy agents move to
+    :param candidates: int, the number of empty houses drawn by the best_of_k relocation
+    :return: dict, the configuration and a list of results, one per engine and size,
+        with the iterations run and the wall and CPU timings summarized per phase
+    """
+
+    neighbourhood = neighbourhood or MOORE
+    configuration = {'empty_ratio': empty_ratio, 'agent_prob': list(agent_prob),
+                     'intolerance_threshold': list(intolerance_threshold), 'num_iterations': num_iterations,
+                     'incremental': incremental, 'seed': seed, 'warmup': warmup, 'repeats': repeats,
+                     'neighbourhood': neighbourhood.describe(), 'synchronous': synchronous,
+                     'relocation': relocation, 'candidates': candidates}
+    results = []
+    for engine in engines:
+        for size in sizes:
+            arguments = (engine, size, empty_ratio, agent_prob, intolerance_threshold,
+                         num_iterations, incremental, seed, neighbourhood, synchronous, relocation, candidates)
+            for _run in range(warmup):
+                time_board(*arguments)
+            runs = [time_board(*arguments) for _run in range(repeats)]
+            results.append({
+                'engine': engine, 'size': size, 'iterations': runs[0][1],
+                'wall': {phase: summarize([timings[phase][0] for timings, _iterations in runs])
+                         for phase in PHASES},
+                'cpu': {phase: summarize([timings[phase][1] for timings, _iterations in runs])
+                        for phase in PHASES}})
+            print('{} {}x{}: {} iterations, {:.3f}s median total'
+                  .format(engine, size, size, runs[0][1], results[-1]['wall']['total']['median']))
+
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'configuration': configuration, 'results': results}
+
+
+def save(report, file_name):
+    """
+    Saves a benchmark report as JSON.
+
+    :param report: dict, as returned by benchmark
+    :param file_name: string, to name the file
+    :return: nothing
+    """
+
+    with open(file_name, 'w') as report_file:
+        json.dump(report, report_file, indent=1)
+
+
+def load(file_name):
+    """
+    Loads a benchmark report saved by save.
+
+    :param file_name: string, the name of the file
+    :return: dict, as returned by benchmark
+    """
+
+    with open(file_name) as report_file:
+        return json.load(report_file)
+
+
+def series(report, phase, clock='wall', statistic='median'):
+    """
+    Extracts the timings of a phase against board size, for each engine.
+
+    :param report: dict, as returned by benchmark
+    :param phase: string, one of PHASES
+    :param clock: string, wall or cpu
+    :param statistic: string, median, min, max or stdev
+    :return: dict, from engine to a tuple of lists, the number of houses and the seconds
+    """
+
+    engines = {}
+    for result in report['results']:
+        houses, seconds = engines.setdefault(result['engine'], ([], []))
+        houses.append(result['size'] ** 2)
+        seconds.append(result[clock][phase][statistic])
+    return engines
+
+
+def add_arguments(parser):
+    """
+    Adds the arguments of the benchmark command to a parser.
+
+    :param parser: argparse.ArgumentParser
+    :return: nothing
+    """
+
+    parser.add_argument('--engines', dest='engines',
+                        default=schelling.ENGINES, nargs='+', choices=schelling.ENGINES,
+                        help='boards\' implementations to time, with the main --update, '
+                             '--neighbourhood, --radius, --torus, --relocation and --candidates')
+    parser.add_argument('--sizes', dest='bench_sizes',
+                        default=[50, 100, 150, 200, 250, 300, 350, 400], nargs='+', type=int,
+                        help='boards\' width and height')
+    parser.add_argument('--warmup', dest='warmup',
+                        default=1, type=int,
+                        help='number of untimed runs of each size')
+    parser.add_argument('--repeats', dest='repeats',
+                        default=5, type=int,
+                        help='number of timed runs of each size')
+    parser.add_argument('--iterations', dest='bench_iterations',
+                        default=500, type=int,
+                        help='maximum number of iterations of each run')
+    parser.add_argument('--incremental', dest='bench_incremental', action='store_true',
+                        help='only check the agents whose neighbourhood changed')
+    parser.add_argument('--seed', dest='bench_seed',
+                        default=0, type=int,
+                        help='seed of every board')
+    parser.add_argument('--output', dest='bench_output',
+                        default='benchmark.json',
+                        help='file to save the report to')
+
+
+def arguments_error(args):
+    """
+    Finds why the parsed command line arguments don't describe a benchmark that can run.
+
+    :param args: argparse.Namespace, with the arguments added by add_arguments and the main ones
+    :return: string, the reason, or None if they do
+    """
+
+    if args.relocation != 'random':
+        others = [engine for engine in args.engines if engine not in schelling.RELOCATION_ENGINES]
+        if others:
+            return 'the {} relocation needs the neighbour counts kept by the {} engines, not {}'.format(
+                args.relocation, ', '.join(schelling.RELOCATION_ENGINES), ', '.join(others))
+        if args.update == 'synchronous':
+            return 'the agents moving together with --update synchronous go to random empty houses, ' \
+                'not by the {} relocation'.format(args.relocation)
+    return None
+
+
+def main(args):
+    """
+    Runs the benchmark described by the parsed command line arguments and saves the report.
+    The board's parameters are the main ones (empty ratio, agents, intolerance,
+    update mode, neighbourhood and relocation).
+
+    :param args: argparse.Namespace, with the arguments added by add_arguments and the main ones,
+        which arguments_error finds no fault with
+    :return: nothing
+    """
+
+    report = benchmark(args.engines, args.bench_sizes, args.warmup, args.repeats, args.empty_ratio,
+                       args.agent_prob, args.intolerance_threshold, args.bench_iterations,
+                       args.bench_incremental, args.bench_seed, args.neighbourhood, args.update == 'synchronous',
+                       args.relocation, args.candidates)
+    save(report, args.bench_output)
+    print('The report was saved to {}'.format(args.bench_output))
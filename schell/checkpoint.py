@@ -0,0 +1,176 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Checkpoints of the boards of the Schelling's segregation model.
+
+A checkpoint keeps everything a run depends on: the races and intolerances of the Agents,
+the order of the empty houses, the iterations (and, for a QueueBoard, the moves) run so far, the board's
+neighbourhood and relocation policy and the state of its RandomStream, so a board loaded from it runs
+exactly as the saved one would have.
+
+The file starts with MAGIC and the length of a JSON header, which describes the board
+and where each array is. The arrays follow as raw bytes, each aligned to ALIGNMENT bytes,
+so they can be memory-mapped when loading.
+"""
+
+# Python Modules
+import json
+import os
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+import schelling
+from neighbourhood import Neighbourhood
+
+
+MAGIC = b'SCHELCK1'
+
+ALIGNMENT = 64
+
+
+def align(offset):
+    """
+    Rounds an offset up to the next multiple of ALIGNMENT.
+
+    :param offset: int, in bytes
+    :return: int
+    """
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save(board, file_name, frames=None):
+    """
+    Saves a board, replacing the file only once it is completely written.
+
+    :param board: Board, ArrayBoard or one of its subclasses
+    :param file_name: string, to name the file
+    :param frames: frames.FrameWriter, recording the run, to keep its frames up to this point when resuming,
+        or None
+    :return: nothing
+    """
+
+    races, intolerance = board.to_arrays()
+    random_state = board.random.state()
+    arrays = {'races': np.ascontiguousarray(races, dtype=np.int8),
+              'intolerance': np.ascontiguousarray(intolerance, dtype=np.float64),
+              'empty_houses': np.array(board.empty_houses.houses, dtype=np.int32).reshape(-1, 2),
+              'batch': np.array(random_state.pop('batch'), dtype=np.int64),
+              'fractions': np.array(random_state.pop('fractions'), dtype=np.float64)}
+
+    description = {'engine': next(engine for engine in schelling.ENGINES
+                                  if type(board) is schelling.board_class(engine)),
+                   'width': board.width, 'height': board.height, 'empty_ratio': board.empty_ratio,
+                   'iteration': board.iteration, 'moves': getattr(board, 'moves', None),
+                   'neighbourhood': board.neighbourhood.describe(),
+                   'relocation': getattr(board, 'relocation', 'random'),
+                   'candidates': getattr(board, 'candidates', None),
+                   'frames': None if frames is None else frames.frames,
+                   'random': random_state, 'arrays': {}}
+    offset = 0
+    for name, array in arrays.items():
+        description['arrays'][name] = {'dtype': array.dtype.str, 'shape': array.shape, 'offset': offset}
+        offset = align(offset + array.nbytes)
+    header = json.dumps(description).encode()
+    start = align(len(MAGIC) + 8 + len(header))
+
+    temporary_name = file_name + '.tmp'
+    with open(temporary_name, 'wb') as checkpoint_file:
+        checkpoint_file.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+        for name, array in arrays.items():
+            checkpoint_file.seek(start + description['arrays'][name]['offset'])
+            checkpoint_file.write(array.tobytes())
+        checkpoint_file.truncate(start + offset)
+    os.replace(temporary_name, file_name)
+
+
+def read_header(file_name):
+    """
+    Reads the header of a checkpoint.
+
+    :param file_name: string, the name of the file
+    :return: tuple, a dict with the description of the board and its arrays,
+        and the int position where the arrays start, to which their offsets are relative
+    """
+
+    with open(file_name, 'rb') as checkpoint_file:
+        if checkpoint_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not a checkpoint'.format(file_name))
+        length = int.from_bytes(checkpoint_file.read(8), 'little')
+        return json.loads(checkpoint_file.read(length).decode()), align(len(MAGIC) + 8 + length)
+
+
+def load(file_name, engine=None):
+    """
+    Loads a board saved by save. The arrays are memory-mapped copy on write,
+    so the file is only read as the board uses it and is never modified.
+
+    :param file_name: string, the name of the file
+    :param engine: string, the implementation of the loaded board (see schelling.board_class),
+        the saved board's if None. It must be one of schelling.RELOCATION_ENGINES
+        if the Agents move by another relocation policy than random
+    :return: Board or ArrayBoard
+    """
+
+    description, start = read_header(file_name)
+    arrays = {}
+    for name, array in description['arrays'].items():
+        dtype, shape = np.dtype(array['dtype']), tuple(array['shape'])
+        if 0 in shape:
+            # Nothing to map, e.g. the batch of a RandomStream that has not drawn any index yet
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(file_name, dtype=dtype, mode='c', offset=start + array['offset'], shape=shape)
+
+    engine = engine or description['engine']
+    if description['relocation'] != 'random' and engine not in schelling.RELOCATION_ENGINES:
+        raise ValueError('the board of {} moves its Agents by the {} relocation, which the {} engine does not have'
+                         .format(file_name, description['relocation'], engine))
+    board_class = schelling.board_class(engine)
+    relocation = {}
+    if description['relocation'] != 'random':
+        relocation = {'relocation': description['relocation'], 'candidates': description['candidates']}
+    board = board_class(description['width'], description['height'], description['empty_ratio'],
+                        description['random']['seed'], Neighbourhood(**description['neighbourhood']), **relocation)
+    board.restore(arrays['races'], arrays['intolerance'], arrays['empty_houses'])
+    board.random.restore(dict(description['random'], batch=arrays['batch'].tolist(),
+                              fractions=arrays['fractions'].tolist()))
+    board.iteration = description['iteration']
+    if description.get('moves') is not None and hasattr(board, 'moves'):
+        board.moves = description['moves']
+    return board
+
+
+class Checkpointer:
+    """
+    Class Checkpointer has 4 attributes:
+        file_name: string, the name of the file the checkpoints are saved to
+        every: int, a checkpoint is saved every this many iterations
+        last: int, the iteration of the last checkpoint saved, or None
+        frames: frames.FrameWriter, recording the same run, whose number of frames is saved, or None
+    """
+
+    def __init__(self, file_name, every, frames=None):
+        self.file_name = file_name
+        self.every = every
+        self.last = None
+        self.frames = frames
+
+    def record(self, board, final=False):
+        """
+        Saves the board if its iteration is a multiple of every, or if it is the final one,
+        unless it was already saved.
+
+        :param board: Board or ArrayBoard
+        :param final: Boolean, the run is over
+        :return: nothing
+        """
+
+        if (board.iteration % self.every == 0 or final) and board.iteration != self.last:
+            save(board, self.file_name, self.frames)
+            self.last = board.iteration
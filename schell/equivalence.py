@@ -0,0 +1,294 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Cross-engine equivalence checks of the Schelling's segregation model.
+
+The same configuration is run with a list of seeds through each engine. The engines that draw
+their random numbers from a RandomStream in the same order (EXACT) must end every run with
+the same board, the same order of empty houses and the same number of iterations as the
+reference engine. The others (my_schelling.Board, which uses the global random module, and the
+legacy schelling_board.Schelling, with its own populate and dynamics) can only be compared
+statistically: the distributions of their segregation, happiness and iterations over the seeds
+are tested against the reference's with a two-sample Kolmogorov-Smirnov test.
+
+Every run also records the engine's throughput, in agent updates (agents checked) per second.
+"""
+
+# Python Modules
+import contextlib
+import io
+import json
+import math
+import platform
+import random
+import statistics
+import time
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+import happiness
+import schelling
+from happiness import EMPTY
+from neighbourhood import MOORE
+
+
+ENGINES = schelling.ENGINES + ['batch', 'my_schelling', 'legacy']
+
+# Engines that make exactly the same moves for the same seed, in sequential and in synchronous mode
+# (the queue engine moves the unhappy Agents in random order, but synchronously as the others)
+EXACT = {'sequential': ['agents', 'array', 'batch', 'compiled'],
+         'synchronous': ['agents', 'array', 'queue', 'compiled']}
+
+MEASURES = ['segregation', 'happiness', 'iterations']
+
+
+def run_engine(engine, size, empty_ratio, agent_prob, intolerance, num_iterations, seed,
+               incremental=False, synchronous=False, neighbourhood=None):
+    """
+    Populates and runs one board with an engine, timing the run.
+
+    :param engine: string, one of ENGINES
+    :param size: int, the board's width and height
+    :param empty_ratio: float, the board's percentage of empty houses
+    :param agent_prob: list of floats, the cumulative probability of each race
+        (the legacy engine only takes their number, and splits the Agents evenly)
+    :param intolerance: float, the intolerance threshold shared by every race
+    :param num_iterations: int, the maximum number of iterations
+    :param seed: int, the seed of the board
+    :param incremental: Boolean, only check the agents whose neighbourhood changed (schelling.ENGINES only)
+    :param synchronous: Boolean, move the unhappy agents together (schelling.ENGINES only)
+    :param neighbourhood: neighbourhood.Neighbourhood, MOORE if None
+    :return: dict, with the final grid (2 dimensional numpy array of int8, EMPTY if empty),
+        the empty houses in order, the iterations run, the run time, the segregation and happiness
+        at the end and the throughput in agent updates per second
+    """
+
+    num_races = len(agent_prob)
+    thresholds = [intolerance] * num_races
+    empty_houses = None
+    neighbourhood = neighbourhood or MOORE
+
+    if engine in schelling.ENGINES:
+        board = schelling.board_class(engine)(size, size, empty_ratio, seed, neighbourhood)
+        board.populate(agent_prob, thresholds)
+        run_start = time.perf_counter()
+        iterations = board.run(num_iterations, incremental, synchronous=synchronous)
+        run_time = time.perf_counter() - run_start
+        grid = np.array(board.to_ints(), dtype=np.int8)
+        empty_houses = list(board.empty_houses)
+
+    elif engine == 'batch':
+        from schelling_batch import BatchBoard
+        batch = BatchBoard(1, size, size, empty_ratio, [seed], neighbourhood)
+        batch.populate(agent_prob, thresholds)
+        run_start = time.perf_counter()
+        iterations = int(batch.run(num_iterations)[0])
+        run_time = time.perf_counter() - run_start
+        grid = batch.grid[0].copy()
+        empty_houses = list(batch.empty_houses[0])
+
+    elif engine == 'my_schelling':
+        import my_schelling
+        random.seed(seed)
+        # It prints the races created and every iteration
+        with contextlib.redirect_stdout(io.StringIO()):
+            board = my_schelling.Board(size, size, empty_ratio, neighbourhood)
+            board.populate(agent_prob, thresholds)
+            run_start = time.perf_counter()
+            iterations = board.run(num_iterations)
+            run_time = time.perf_counter() - run_start
+        grid = np.array(board.to_ints(), dtype=np.int8)
+
+    else:
+        import schelling_board
+        board = schelling_board.Schelling(size, size, empty_ratio, intolerance, num_iterations, num_races, seed,
+                                          neighbourhood)
+        board.populate()
+        run_start = time.perf_counter()
+        iterations = board.update()
+        run_time = time.perf_counter() - run_start
+        grid = np.full((size, size), EMPTY, dtype=np.int8)
+        for (x, y), race in board.agents.items():
+            grid[y, x] = race - 1
+
+    agents = int(np.count_nonzero(grid != EMPTY))
+    segregation, happy = happiness.calculate_segregation_happiness(
+        grid, np.where(grid != EMPTY, intolerance, 0.0), schelling.similarity_table(num_races), neighbourhood)
+    return {'engine': engine, 'seed': seed, 'grid': grid, 'empty_houses': empty_houses,
+            'iterations': iterations, 'run_time': run_time, 'segregation': segregation, 'happiness': happy,
+            'updates_per_second': agents * iterations / run_time if run_time > 0 else math.inf}
+
+
+def ks_test(sample, other):
+    """
+    Two-sample Kolmogorov-Smirnov test, with the asymptotic distribution of the statistic.
+
+    :param sample, other: lists of floats
+    :return: tuple of floats, the statistic (the largest distance between the two empirical
+        distribution functions) and the p-value of the samples coming from the same distribution
+    """
+
+    sample, other = np.sort(sample), np.sort(other)
+    values = np.concatenate([sample, other])
+    distance = float(np.max(np.abs(np.searchsorted(sample, values, side='right') / len(sample)
+                                   - np.searchsorted(other, values, side='right') / len(other))))
+    effective = math.sqrt(len(sample) * len(other) / (len(sample) + len(other)))
+    scaled = (effective + 0.12 + 0.11 / effective) * distance
+    if scaled == 0:
+        return distance, 1.0
+    p_value = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * scaled * scaled) for k in range(1, 101))
+    return distance, min(max(p_value, 0.0), 1.0)
+
+
+def compare(runs, reference, exact, alpha=0.01):
+    """
+    Compares the runs of every engine with those of the reference engine.
+
+    :param runs: dict, from engine to its list of runs (as returned by run_engine), one per seed
+    :param reference: string, the engine compared against
+    :param exact: list of strings, the engines that must match the reference exactly
+    :param alpha: float, the significance level under which a measure's distribution differs
+    :return: dict, from engine to its comparison: the seeds whose runs differ from the reference's
+        (exact engines only), and for each measure the mean, standard deviation, statistic and p-value
+    """
+
+    comparison = {}
+    for engine, engine_runs in runs.items():
+        result = {'exact': engine in exact and reference in exact, 'mismatches': [], 'measures': {},
+                  'updates_per_second': statistics.median(run['updates_per_second'] for run in engine_runs)}
+        if result['exact']:
+            result['mismatches'] = [run['seed'] for run, reference_run in zip(engine_runs, runs[reference])
+                                    if run['iterations'] != reference_run['iterations']
+                                    or run['empty_houses'] != reference_run['empty_houses']
+                                    or not np.array_equal(run['grid'], reference_run['grid'])]
+        for measure in MEASURES:
+            values = [float(run[measure]) for run in engine_runs]
+            statistic, p_value = ks_test(values, [float(run[measure]) for run in runs[reference]])
+            result['measures'][measure] = {'mean': statistics.mean(values),
+                                           'stdev': statistics.pstdev(values),
+                                           'statistic': statistic, 'p_value': p_value,
+                                           'differs': p_value < alpha}
+        result['equivalent'] = not result['mismatches'] and not any(
+            measure['differs'] for measure in result['measures'].values())
+        comparison[engine] = result
+    return comparison
+
+
+def check(engines, seeds, size=30, empty_ratio=0.1, agent_prob=(0.5, 1), intolerance=0.5, num_iterations=100,
+          incremental=False, synchronous=False, alpha=0.01, neighbourhood=None):
+    """
+    Runs every engine with every seed and compares them with the first engine.
+
+    :param engines: list of strings, the engines to run, the first is the reference
+    :param seeds: list of ints, the seeds of the boards
+    :param size: int, the boards' width and height
+    :param empty_ratio: float, the boards' percentage of empty houses
+    :param agent_prob: list of floats, the cumulative probability of each race
+    :param intolerance: float, the intolerance threshold shared by every race
+    :param num_iterations: int, the maximum number of iterations of each run
+    :param incremental: Boolean, only check the agents whose neighbourhood changed
+    :param synchronous: Boolean, move the unhappy agents together, only for the engines that can
+    :param alpha: float, the significance level under which a measure's distribution differs
+    :param neighbourhood: neighbourhood.Neighbourhood, MOORE if None
+    :return: dict, the configuration and the comparison of every engine, see compare
+    """
+
+    update = 'synchronous' if synchronous else 'sequential'
+    neighbourhood = neighbourhood or MOORE
+    if synchronous:
+        engines = [engine for engine in engines if engine in schelling.ENGINES]
+    configuration = {'size': size, 'empty_ratio': empty_ratio, 'agent_prob': list(agent_prob),
+                     'intolerance': intolerance, 'num_iterations': num_iterations, 'incremental': incremental,
+                     'update': update, 'neighbourhood': neighbourhood.describe(), 'seeds': list(seeds),
+                     'reference': engines[0], 'alpha': alpha}
+    runs = {engine: [run_engine(engine, size, empty_ratio, list(agent_prob), intolerance, num_iterations, seed,
+                                incremental, synchronous, neighbourhood)
+                     for seed in seeds]
+            for engine in engines}
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'configuration': configuration, 'engines': compare(runs, engines[0], EXACT[update], alpha)}
+
+
+def report_lines(report):
+    """
+    Formats the comparison of every engine, one line each.
+
+    :param report: dict, as returned by check
+    :return: list of strings
+    """
+
+    lines = []
+    for engine, result in report['engines'].items():
+        if result['exact']:
+            verdict = 'exact' if not result['mismatches'] else 'MISMATCH on seeds {}'.format(result['mismatches'])
+        else:
+            verdict = 'same distributions' if result['equivalent'] else 'DIFFERENT distributions'
+        measures = ', '.join('{} {:.2f}±{:.2f} (p={:.2f})'.format(name, measure['mean'], measure['stdev'],
+                                                                 measure['p_value'])
+                             for name, measure in result['measures'].items())
+        lines.append('{}: {}, {:.0f} agent updates/s; {}'.format(engine, verdict, result['updates_per_second'],
+                                                                 measures))
+    return lines
+
+
+def add_arguments(parser):
+    """
+    Adds the arguments of the equivalence command to a parser.
+
+    :param parser: argparse.ArgumentParser
+    :return: nothing
+    """
+
+    parser.add_argument('--engines', dest='check_engines',
+                        default=ENGINES, nargs='+', choices=ENGINES,
+                        help='engines to compare, the first is the reference')
+    parser.add_argument('--size', dest='check_size',
+                        default=30, type=int,
+                        help='boards\' width and height')
+    parser.add_argument('--seeds', dest='check_seeds',
+                        default=20, type=int,
+                        help='number of seeds, run by every engine')
+    parser.add_argument('--first_seed', dest='check_first_seed',
+                        default=0, type=int,
+                        help='first of the consecutive seeds')
+    parser.add_argument('--intolerance', dest='check_intolerance',
+                        default=0.5, type=float,
+                        help='intolerance threshold, the same for every race')
+    parser.add_argument('--iterations', dest='check_iterations',
+                        default=100, type=int,
+                        help='maximum number of iterations of each run')
+    parser.add_argument('--alpha', dest='alpha',
+                        default=0.01, type=float,
+                        help='significance level under which a distribution differs from the reference\'s')
+    parser.add_argument('--output', dest='check_output',
+                        default='equivalence.json',
+                        help='file to save the report to')
+
+
+def main(args):
+    """
+    Runs the check described by the parsed command line arguments, prints and saves the report.
+    The board's empty ratio, agents, neighbourhood, update mode and incremental flag are the main ones.
+    Exits with status 1 if an exact engine differs from the reference.
+
+    :param args: argparse.Namespace, with the arguments added by add_arguments and the main ones
+    :return: nothing
+    """
+
+    seeds = range(args.check_first_seed, args.check_first_seed + args.check_seeds)
+    report = check(args.check_engines, seeds, args.check_size, args.empty_ratio, args.agent_prob,
+                   args.check_intolerance, args.check_iterations, args.incremental,
+                   args.update == 'synchronous', args.alpha, args.neighbourhood)
+    for line in report_lines(report):
+        print(line)
+    with open(args.check_output, 'w') as report_file:
+        json.dump(report, report_file, indent=1)
+    print('The report was saved to {}'.format(args.check_output))
+
+    if any(result['mismatches'] for result in report['engines'].values()):
+        raise SystemExit(1)
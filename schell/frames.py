@@ -0,0 +1,187 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Frame streams of the board states of a run of the Schelling's segregation model.
+
+While a board runs, a FrameWriter appends its state every few iterations to a .npy file
+of uint8 frames, 0 for empty houses and the race plus one otherwise. The header is
+rewritten after every frame, so the file can be loaded (memory-mapped) at any time,
+even if the run is interrupted. A run resumed from a checkpoint keeps the frames recorded
+up to the checkpoint (see checkpoint.save) and appends to them.
+Rendering the frames to images is a separate step.
+"""
+
+# Python Modules
+import ast
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+import raster
+
+
+MAGIC = b'\x93NUMPY\x01\x00'
+
+# Size of the .npy header, fixed so it can be rewritten as frames are appended
+HEADER_SIZE = 128
+
+
+def header(frames, height, width):
+    """
+    Builds the .npy header of a stream of frames, padded to HEADER_SIZE bytes.
+
+    :param frames: int, the number of frames
+    :param height, width: int, the board's size
+    :return: bytes
+    """
+
+    description = "{{'descr': '|u1', 'fortran_order': False, 'shape': ({}, {}, {}), }}" \
+        .format(frames, height, width)
+    description = description.ljust(HEADER_SIZE - len(MAGIC) - 3) + '\n'
+    return MAGIC + len(description).to_bytes(2, 'little') + description.encode('latin1')
+
+
+class FrameWriter:
+    """
+    Class FrameWriter has 6 attributes:
+        file_name: string, the name of the .npy file
+        height, width: int, the board's size
+        every: int, a frame is recorded every this many iterations
+        frames: int, the number of frames in the file
+        last: int, the iteration of the last frame recorded, or None
+        stream: file, open for writing
+    """
+
+    def __init__(self, file_name, height, width, every=1, keep=None):
+        self.file_name = file_name
+        self.height = height
+        self.width = width
+        self.every = every
+        self.frames = 0
+        self.last = None
+
+        if keep is not None:
+            # Resuming a run: the frames recorded after its checkpoint are dropped, as the run makes them again
+            self.stream = open(file_name, 'r+b')
+            shape = ast.literal_eval(self.stream.read(HEADER_SIZE)[len(MAGIC) + 2:].decode('latin1'))['shape']
+            if shape[1:] != (height, width) or shape[0] < keep:
+                self.stream.close()
+                raise ValueError('{} has {} frames of {}x{}, not at least {} of {}x{}'
+                                 .format(file_name, shape[0], shape[2], shape[1], keep, width, height))
+            self.frames = keep
+            self.stream.seek(HEADER_SIZE + keep * height * width)
+            self.stream.truncate()
+            self.stream.seek(0)
+            self.stream.write(header(keep, height, width))
+            self.stream.seek(HEADER_SIZE + keep * height * width)
+            self.stream.flush()
+        else:
+            self.stream = open(file_name, 'wb')
+            self.stream.write(header(0, height, width))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def write(self, frame):
+        """
+        Appends a frame to the file and updates the header.
+
+        :param frame: 2 dimensional numpy array of uint8, the board's state
+        :return: nothing
+        """
+
+        self.stream.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+        self.frames += 1
+        position = self.stream.tell()
+        self.stream.seek(0)
+        self.stream.write(header(self.frames, self.height, self.width))
+        self.stream.seek(position)
+        self.stream.flush()
+
+    def record(self, board, iteration, final=False):
+        """
+        Appends the board's state if the iteration is a multiple of every, or if it is the final one,
+        unless it was already recorded.
+
+        :param board: Board or ArrayBoard
+        :param iteration: int, the number of iterations run so far
+        :param final: Boolean, the run is over
+        :return: nothing
+        """
+
+        if (iteration % self.every == 0 or final) and iteration != self.last:
+            self.write(board.frame())
+            self.last = iteration
+
+    def close(self):
+        """
+        Closes the file.
+
+        :return: nothing
+        """
+
+        self.stream.close()
+
+
+def load(file_name):
+    """
+    Loads a stream of frames, memory-mapped.
+
+    :param file_name: string, the name of the .npy file
+    :return: 3 dimensional numpy array of uint8, indexed by frame, y and x
+    """
+
+    return np.load(file_name, mmap_mode='r')
+
+
+def render(file_name, prefix='frame', scale=1):
+    """
+    Saves every frame of a stream as a PNG, see raster.write_png.
+
+    :param file_name: string, the name of the .npy file
+    :param prefix: string, the images are named prefix_0000.png, prefix_0001.png, ...
+    :param scale: int, the side in pixels of the block drawn for each house
+    :return: int, the number of frames rendered
+    """
+
+    frames = load(file_name)
+    for number, frame in enumerate(frames):
+        raster.write_png(frame, '{}_{:04d}.png'.format(prefix, number), scale)
+    return len(frames)
+
+
+def add_arguments(parser):
+    """
+    Adds the arguments of the render command to a parser.
+
+    :param parser: argparse.ArgumentParser
+    :return: nothing
+    """
+
+    parser.add_argument('frames_file',
+                        help='.npy file of frames saved with --frames')
+    parser.add_argument('--prefix', dest='frames_prefix',
+                        default='frame',
+                        help='prefix of the images\' file names')
+    parser.add_argument('--scale', dest='frames_scale',
+                        default=1, type=int,
+                        help='side in pixels of the block drawn for each house')
+
+
+def main(args):
+    """
+    Renders the frames given by the parsed command line arguments.
+
+    :param args: argparse.Namespace, with the arguments added by add_arguments
+    :return: nothing
+    """
+
+    rendered = render(args.frames_file, args.frames_prefix, args.frames_scale)
+    print('{} frames were rendered to {}_*.png'.format(rendered, args.frames_prefix))
@@ -0,0 +1,118 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Whole board happiness evaluation for the Schelling's segregation model.
+
+Instead of asking every Agent for its neighbours, the number of neighbours of each race
+is counted for all the houses at once, summing shifted copies of one mask per race.
+Boards are numpy arrays of races (EMPTY for empty houses), and any leading dimensions
+are treated as a stack of boards of the same size. The neighbours of a house are those of
+a neighbourhood.Neighbourhood, by default the first level of neighbours on a bounded board.
+"""
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+from neighbourhood import MOORE
+
+
+EMPTY = -1
+
+
+def stencil_sum(mask, neighbourhood=None):
+    """
+    Counts, for every house, how many of its neighbours are set in the mask.
+
+    :param mask: numpy array of bool, whose last two dimensions are the height and width
+    :param neighbourhood: neighbourhood.Neighbourhood, MOORE if None
+    :return: numpy array of integers (int8 unless the neighbourhood is bigger) with the same shape as mask
+    """
+
+    return (neighbourhood or MOORE).stencil_sum(mask)
+
+
+def neighbour_counts(grid, num_races, neighbourhood=None):
+    """
+    Counts the neighbours of each race of every house.
+
+    :param grid: numpy array of ints, the race living in each house, EMPTY if empty
+    :param num_races: int, number of races
+    :param neighbourhood: neighbourhood.Neighbourhood, MOORE if None
+    :return: numpy array of integers (int8 unless the neighbourhood is bigger) with one more
+        leading dimension of size num_races + 1, where entry [r] is the number of neighbours
+        of race r of each house and entry [num_races] is the number of neighbours of each house
+    """
+
+    neighbourhood = neighbourhood or MOORE
+    counts = np.empty((num_races + 1,) + grid.shape, dtype=neighbourhood.count_dtype)
+    for race in range(num_races):
+        counts[race] = neighbourhood.stencil_sum(grid == race)
+    counts[num_races] = neighbourhood.stencil_sum(grid != EMPTY)
+    return counts
+
+
+def evaluate(grid, intolerance, similar, neighbourhood=None):
+    """
+    Checks the happiness of every Agent on the board at once.
+
+    :param grid: numpy array of ints, the race living in each house, EMPTY if empty
+    :param intolerance: numpy array of floats, broadcastable to grid,
+        the intolerance of the Agent living in each house
+    :param similar: 2 dimensional list of Booleans, where entry [a][b] is True
+        if an Agent of race a ranks an Agent of race b as similar
+    :param neighbourhood: neighbourhood.Neighbourhood, MOORE if None
+    :return: tuple of numpy arrays shaped like grid, a mask of the unhappy Agents
+        and the fraction of similar neighbours of each Agent (0 without neighbours or Agent)
+    """
+
+    similar = np.asarray(similar, dtype=np.int8)
+    num_races = len(similar)
+    counts = neighbour_counts(grid, num_races, neighbourhood)
+    total = counts[num_races]
+    populated = grid != EMPTY
+    liked = np.tensordot(similar, counts[:num_races], axes=1)
+    same = np.take_along_axis(liked, np.where(populated, grid, 0)[np.newaxis].astype(np.intp), axis=0)[0]
+    neighboured = populated & (total > 0)
+    similarity = np.divide(same, total, out=np.zeros(grid.shape), where=neighboured)
+    unhappy = neighboured & (similarity < intolerance)
+    return unhappy, similarity
+
+
+def calculate_happiness(grid, intolerance, similar, neighbourhood=None):
+    """
+    Computes the fraction of happy Agents on the board.
+
+    :param grid: numpy array of ints, the race living in each house, EMPTY if empty
+    :param intolerance: numpy array of floats, the intolerance of the Agent living in each house
+    :param similar: 2 dimensional list of Booleans, how Agents of each race rank every race
+    :param neighbourhood: neighbourhood.Neighbourhood, MOORE if None
+    :return: float, rounded to two decimal places
+    """
+
+    unhappy, _similarity = evaluate(grid, intolerance, similar, neighbourhood)
+    total = int(np.count_nonzero(grid != EMPTY))
+    return round((total - int(np.count_nonzero(unhappy))) / total, 2)
+
+
+def calculate_segregation_happiness(grid, intolerance, similar, neighbourhood=None):
+    """
+    Computes the segregation, the average fraction of similar neighbours,
+    and the percentage of happy Agents on the board.
+
+    :param grid: numpy array of ints, the race living in each house, EMPTY if empty
+    :param intolerance: numpy array of floats, the intolerance of the Agent living in each house
+    :param similar: 2 dimensional list of Booleans, how Agents of each race rank every race
+    :param neighbourhood: neighbourhood.Neighbourhood, MOORE if None
+    :return: tuple of floats, segregation and happiness percentages rounded to two decimal places
+    """
+
+    unhappy, similarity = evaluate(grid, intolerance, similar, neighbourhood)
+    populated = grid != EMPTY
+    total = int(np.count_nonzero(populated))
+    happy = total - int(np.count_nonzero(unhappy))
+    return round(sum(similarity[populated].tolist()) / total * 100, 2), \
+        round(happy / total * 100, 2)
@@ -22,6 +22,8 @@ import matplotlib.colors
 import matplotlib.pyplot as plt
 import pendulum
 
+# Project Modules
+from neighbourhood import KINDS, MOORE, Neighbourhood
 
 
 class AbstractAgentStrategy(object):
@@ -133,22 +135,27 @@ class Agent:
 
 class Board:
     """
-    Class Board has 6 attributes:
+    Class Board has 8 attributes:
         width, height: int, the size of the Board
         empty_ratio: float, percentage (from 0 to 1) of empty houses on the Board
         empty_houses: list of tuples, where the tuple is a coordinate that is empty
         num_empty: int, the number of empty houses on the Board (size of the empty_houses list)
         matrix: 2 dimensional list, the Board itself where each entry is a house
             that if empty is None, if populated it's an Agent object
+        neighbourhood: neighbourhood.Neighbourhood, the neighbours of every house
+        table: neighbourhood.NeighbourTable, the neighbours of every house of the Board,
+            where the neighbours of house (x, y) are table[y * width + x]
     """
 
-    def __init__(self, width, height, empty_ratio):
+    def __init__(self, width, height, empty_ratio, neighbourhood=None):
         self.width = width
         self.height = height
         self.empty_ratio = empty_ratio
         self.empty_houses = []
         self.num_empty = int(math.ceil(width * height * empty_ratio))
         self.matrix = [[None for _x in range(width)] for _y in range(height)]
+        self.neighbourhood = neighbourhood or MOORE
+        self.table = self.neighbourhood.table(width, height)
 
     def create_empty_houses(self):
         """
@@ -194,20 +201,18 @@ class Board:
 
     def neighbours(self, agent):
         """
-        Creates a list of the first level of neighbours of the given Agent.
+        Creates a list of the neighbours of the given Agent, in the Board's neighbourhood.
 
         :param agent: an Agent object
         :return: list of Agents, that are this agent's neighbours
         """
 
         neighbours = []
-        for y in (-1, 0, 1):
-            for x in (-1, 0, 1):
-                if (x != 0 or y != 0) \
-                        and 0 <= agent.x + x < self.width and 0 <= agent.y + y < self.height:
-                    neighbour = self.matrix[agent.y + y][agent.x + x]
-                    if neighbour is not None:
-                        neighbours.append(neighbour)
+        for house in self.table[agent.y * self.width + agent.x].tolist():
+            y, x = divmod(house, self.width)
+            neighbour = self.matrix[y][x]
+            if neighbour is not None:
+                neighbours.append(neighbour)
         return neighbours
 
     def move_agent(self, agent):
@@ -348,11 +353,21 @@ def main():
     parser.add_argument('-i', '--num_iterations', dest='num_iterations',
                         default=500, nargs='?', type=int,
                         help='number of iterations')
+    parser.add_argument('--neighbourhood', dest='neighbourhood',
+                        default='moore', choices=KINDS,
+                        help='the neighbours of a house, the square around it (moore) '
+                             'or the diamond around it (von_neumann)')
+    parser.add_argument('--radius', dest='radius',
+                        default=1, type=int,
+                        help='how far the neighbours of a house reach')
+    parser.add_argument('--torus', dest='torus', action='store_true',
+                        help='wrap the board around its edges, so every house has the same number of neighbours')
     
     
     args = parser.parse_args()
     
-    board = Board(args.width, args.height, args.empty_ratio)
+    board = Board(args.width, args.height, args.empty_ratio,
+                  Neighbourhood(args.neighbourhood, args.radius, args.torus))
     print("POPULATING")
     board.populate(args.agent_prob, args.intolerance_threshold)
 
@@ -0,0 +1,311 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Neighbourhoods of the houses of the Schelling's segregation model.
+
+A Neighbourhood is a shape (Moore, the square around a house, or von Neumann, the diamond
+around it) of a given radius, on a board that is bounded or wraps around its edges (a torus).
+Its neighbour table lists the neighbours of every house of a board of a given size once,
+as flat indices (y * width + x), so the engines never check bounds or build the list
+of neighbours again. Big neighbourhoods on big boards would make the table too big
+(TABLE_ENTRIES), and their neighbours are then found from the offsets when they are needed.
+
+The neighbours of every house of a whole board are counted from summed-area tables
+(integral images) for big neighbourhoods (see SUMMED_AREA_SIZE): the count of any square
+of houses is then four lookups, whatever its size, where summing shifted copies of the
+board takes one pass per neighbour. A von Neumann diamond is a square on the board
+turned 45 degrees, where it is counted the same way, on a turned board four times as big.
+"""
+
+# Python Modules
+import functools
+
+# Python Packages
+import numpy as np
+
+
+KINDS = ['moore', 'von_neumann']
+
+# Number of neighbours of each kind of neighbourhood from which stencil_sum counts
+# with summed-area tables instead of shifted copies of the board
+SUMMED_AREA_SIZE = {'moore': 150, 'von_neumann': 600}
+
+# Number of neighbours, across the houses of a board, above which a NeighbourTable
+# finds the neighbours of a house from the offsets instead of listing them all in advance
+TABLE_ENTRIES = 2 ** 26
+
+# Number of neighbours listed at a time while building a neighbour table
+TABLE_CHUNK = 2 ** 22
+
+
+class Neighbourhood:
+    """
+    Class Neighbourhood has 5 attributes:
+        kind: string, one of KINDS
+        radius: int, how far the neighbours of a house reach
+        torus: Boolean, the board wraps around its edges, otherwise houses near them have fewer neighbours
+        offsets: list of tuples of ints, the offsets (x, y) of the neighbours of a house, in raster order
+        size: int, the number of neighbours of a house away from the edges
+    """
+
+    def __init__(self, kind='moore', radius=1, torus=False):
+        if kind not in KINDS:
+            raise ValueError('unknown neighbourhood {}, not one of {}'.format(kind, ', '.join(KINDS)))
+        if radius < 1:
+            raise ValueError('the radius of a neighbourhood must be at least 1, not {}'.format(radius))
+        self.kind = kind
+        self.radius = radius
+        self.torus = torus
+        self.offsets = [(x, y) for y in range(-radius, radius + 1) for x in range(-radius, radius + 1)
+                        if (x != 0 or y != 0) and (kind == 'moore' or abs(x) + abs(y) <= radius)]
+        self.size = len(self.offsets)
+
+    def __eq__(self, other):
+        return isinstance(other, Neighbourhood) and self.describe() == other.describe()
+
+    def __hash__(self):
+        return hash((self.kind, self.radius, self.torus))
+
+    def __repr__(self):
+        return 'Neighbourhood({!r}, {}, {})'.format(self.kind, self.radius, self.torus)
+
+    def describe(self):
+        """
+        Describes the neighbourhood, to build it again with Neighbourhood(**description).
+
+        :return: dict, with the kind, radius and torus
+        """
+
+        return {'kind': self.kind, 'radius': self.radius, 'torus': self.torus}
+
+    @property
+    def count_dtype(self):
+        """
+        The smallest integer type that can count the neighbours of a house.
+
+        :return: numpy dtype, int8 or int16
+        """
+
+        return np.dtype(np.int8 if self.size <= np.iinfo(np.int8).max else np.int16)
+
+    @property
+    def summed_area(self):
+        """
+        The neighbours are counted from summed-area tables, see stencil_sum.
+
+        :return: Boolean
+        """
+
+        return self.size >= SUMMED_AREA_SIZE[self.kind]
+
+    def table(self, width, height):
+        """
+        Finds the neighbours of every house of a board, see NeighbourTable.
+
+        :param width, height: int, the board's size
+        :return: NeighbourTable
+        """
+
+        return NeighbourTable(self, width, height)
+
+    def stencil_sum(self, mask):
+        """
+        Counts, for every house, how many of its neighbours are set in the mask.
+
+        :param mask: numpy array of bool, whose last two dimensions are the height and width
+        :return: numpy array of count_dtype with the same shape as mask
+        """
+
+        if self.summed_area:
+            return self.summed_area_sum(mask)
+
+        height, width = mask.shape[-2:]
+        radius = self.radius
+        padded = self.pad(mask.astype(self.count_dtype))
+        total = np.zeros(mask.shape, dtype=self.count_dtype)
+        for x, y in self.offsets:
+            total += padded[..., radius + y:radius + y + height, radius + x:radius + x + width]
+        return total
+
+    def summed_area_sum(self, mask):
+        """
+        Counts, for every house, how many of its neighbours are set in the mask,
+        in constant time per house from summed-area tables, see stencil_sum.
+
+        :param mask: numpy array of bool, whose last two dimensions are the height and width
+        :return: numpy array of count_dtype with the same shape as mask
+        """
+
+        height, width = mask.shape[-2:]
+        radius = self.radius
+        side = 2 * radius + 1
+        padded = self.pad(mask.astype(np.int32))
+        if self.kind == 'moore':
+            total = window_sums(summed_area_table(padded), side)
+        else:
+            # House (x, y) of the padded board goes to (x + y, x - y + rows - 1), where the diamond
+            # around it is the square of side 2 * radius + 1 around that point
+            rows, columns = padded.shape[-2:]
+            turned = np.zeros(padded.shape[:-2] + (rows + columns - 1,) * 2, dtype=np.int32)
+            diagonals(turned, rows - 1, (rows, columns))[...] = padded
+            windows = window_sums(summed_area_table(turned), side)
+            total = diagonals(windows, radius * windows.shape[-1] + rows - 1 - radius, (height, width))
+        # The windows count the house itself too
+        return (total - mask).astype(self.count_dtype)
+
+    def pad(self, values):
+        """
+        Pads a board with radius houses on every side, empty ones or,
+        on a torus, those on the other side of the board.
+
+        :param values: numpy array, whose last two dimensions are the height and width
+        :return: numpy array, radius houses bigger on every side
+        """
+
+        padding = [(0, 0)] * (values.ndim - 2) + [(self.radius, self.radius)] * 2
+        return np.pad(values, padding, mode='wrap' if self.torus else 'constant')
+
+
+class NeighbourTable:
+    """
+    Class NeighbourTable has 5 attributes:
+        neighbourhood: Neighbourhood, whose neighbours are found
+        width, height: int, the board's size
+        starts: memoryview of int64, where the neighbours of house h are indices[starts[h]:starts[h + 1]],
+            or None if they are found from the offsets, for big neighbourhoods (summed_area) or boards
+        indices: memoryview of int32, the neighbours of every house, one house after another, or None
+    """
+
+    def __init__(self, neighbourhood, width, height):
+        self.neighbourhood = neighbourhood
+        self.width = width
+        self.height = height
+        radius = neighbourhood.radius
+        if neighbourhood.torus and (width <= 2 * radius or height <= 2 * radius):
+            raise ValueError('a {}x{} torus is too small for a radius of {}, a house would be its own neighbour'
+                             .format(width, height, radius))
+        self.starts = self.indices = None
+        if not neighbourhood.summed_area and neighbourhood.size * width * height <= TABLE_ENTRIES:
+            starts, indices = neighbour_table(neighbourhood.kind, radius, neighbourhood.torus, width, height)
+            self.starts, self.indices = memoryview(starts), memoryview(indices)
+        self._xs = np.array([x for x, _y in neighbourhood.offsets])
+        self._ys = np.array([y for _x, y in neighbourhood.offsets])
+
+    def __getitem__(self, house):
+        """
+        Finds the neighbours of a house, in the order of the neighbourhood's offsets.
+
+        :param house: int, the index of the house (y * width + x)
+        :return: memoryview or 1 dimensional numpy array of ints, the indices of the neighbours
+        """
+
+        if self.indices is not None:
+            return self.indices[self.starts[house]:self.starts[house + 1]]
+        width, height = self.width, self.height
+        y, x = divmod(house, width)
+        xs, ys = self._xs + x, self._ys + y
+        if self.neighbourhood.torus:
+            return ys % height * width + xs % width
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        return ys[inside] * width + xs[inside]
+
+
+def summed_area_table(values):
+    """
+    Sums every rectangle of a board starting at its top left corner (an integral image).
+
+    :param values: numpy array of ints, whose last two dimensions are the height and width
+    :return: numpy array of int32, with one more row and column, where entry [y][x]
+        is the sum of the values of rows 0 to y - 1 and columns 0 to x - 1
+    """
+
+    table = np.zeros(values.shape[:-2] + (values.shape[-2] + 1, values.shape[-1] + 1), dtype=np.int32)
+    np.cumsum(values, axis=-2, out=table[..., 1:, 1:])
+    np.cumsum(table[..., 1:, 1:], axis=-1, out=table[..., 1:, 1:])
+    return table
+
+
+def diagonals(square, first, shape):
+    """
+    Views the houses of an upright board on a board turned 45 degrees, where house (x, y)
+    of the upright board is house first + (x + y) * side + x - y of the turned one, of a given side.
+    Neighbouring houses of the upright board are on diagonals of the turned one, so the view is strided.
+
+    :param square: numpy array, C contiguous, whose last two dimensions are the side of the turned board
+    :param first: int, the flat index on the turned board of house (0, 0) of the upright one
+    :param shape: tuple of ints, the height and width of the upright board
+    :return: numpy array, a view of square, whose last two dimensions are shape
+    """
+
+    side = square.shape[-1]
+    flat = square.reshape(square.shape[:-2] + (-1,))[..., first:]
+    return np.lib.stride_tricks.as_strided(flat, square.shape[:-2] + tuple(shape),
+                                           square.strides[:-2] + ((side - 1) * square.itemsize,
+                                                                  (side + 1) * square.itemsize))
+
+
+def window_sums(table, side):
+    """
+    Sums every square window of a board from its summed-area table, with four lookups each.
+
+    :param table: numpy array of ints, as returned by summed_area_table
+    :param side: int, the side of the windows
+    :return: numpy array of ints, where entry [y][x] is the sum of the window whose top left corner is (x, y)
+    """
+
+    return table[..., side:, side:] - table[..., :-side, side:] - table[..., side:, :-side] + table[..., :-side, :-side]
+
+
+@functools.lru_cache(maxsize=16)
+def neighbour_table(kind, radius, torus, width, height):
+    """
+    Lists the neighbours of every house of a board, in the order of the neighbourhood's offsets,
+    a band of rows at a time (TABLE_CHUNK neighbours), so only the table itself takes memory.
+    The tables are cached, so boards of the same size and neighbourhood share them.
+
+    :param kind: string, one of KINDS
+    :param radius: int, how far the neighbours of a house reach
+    :param torus: Boolean, the board wraps around its edges
+    :param width, height: int, the board's size
+    :return: tuple of 1 dimensional numpy arrays, of int64 and int32, where the neighbours of house h
+        are indices[starts[h]:starts[h + 1]]
+    """
+
+    offsets = np.array(Neighbourhood(kind, radius, torus).offsets, dtype=np.int32).reshape(-1, 2)
+    # The neighbours of the houses of a row, in the middle of a board that is high enough
+    xs = np.arange(width, dtype=np.int32)[:, np.newaxis] + offsets[:, 0]
+    if torus:
+        row_valid = np.ones(xs.shape, dtype=bool)
+        xs %= width
+    else:
+        row_valid = (xs >= 0) & (xs < width)
+
+    counts = np.empty((height, width), dtype=np.int64)
+    for y in range(height):
+        ys = y + offsets[:, 1]
+        counts[y] = np.count_nonzero(row_valid & (torus | ((ys >= 0) & (ys < height))), axis=1)
+    starts = np.zeros(width * height + 1, dtype=np.int64)
+    np.cumsum(counts, out=starts[1:])
+
+    indices = np.empty(starts[-1], dtype=np.int32)
+    rows = max(TABLE_CHUNK // max(width * len(offsets), 1), 1)
+    for first in range(0, height, rows):
+        ys = np.arange(first, min(first + rows, height), dtype=np.int32)[:, np.newaxis, np.newaxis] + offsets[:, 1]
+        if torus:
+            valid = np.broadcast_to(row_valid, ys.shape[:1] + row_valid.shape)
+            ys %= height
+        else:
+            valid = row_valid & (ys >= 0) & (ys < height)
+        neighbours = ys * width + xs
+        indices[starts[first * width]:starts[min(first + rows, height) * width]] = \
+            np.broadcast_to(neighbours, valid.shape)[valid]
+    tables = (starts, indices)
+    for table in tables:
+        table.flags.writeable = False
+    return tables
+
+
+MOORE = Neighbourhood()
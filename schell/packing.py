@@ -0,0 +1,296 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Bit-packed boards of the Schelling's segregation model.
+
+A packed board keeps each house in 2 or 4 bits (BITS), the same code as the frames:
+0 for an empty house and the race plus one otherwise, so 2 bits hold 3 races and 4 bits 15.
+The houses of a row are packed into bytes, 8 // bits houses per byte, the first house in the
+lowest bits, and every row starts a new byte, so any band of rows is a slice of the words.
+The Agents of a race share its intolerance, kept once per race, as populate gives them.
+A 10000x10000 board takes 25 MB with 2 bits, where the races and intolerances take 900 MB.
+
+The neighbour counts and metrics are computed band by band (CHUNK_ROWS rows at a time),
+decoding each band with as many rows above and below as the radius of the neighbourhood,
+so a big board is never decoded whole. A packed board is saved as MAGIC, the length of
+a JSON header and the header, followed by the words, which are memory-mapped when loading.
+"""
+
+# Python Modules
+import json
+import os
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+import happiness
+import schelling
+from happiness import EMPTY
+from neighbourhood import MOORE, Neighbourhood
+
+
+MAGIC = b'SCHELPK1'
+
+# Bits per house of the packed boards
+BITS = [2, 4]
+
+# Number of rows decoded at a time
+CHUNK_ROWS = 512
+
+
+class PackedGrid:
+    """
+    Class PackedGrid has 6 attributes:
+        width, height: int, the size of the board
+        bits: int, one of BITS, the bits per house
+        words: 2 dimensional numpy array of uint8, where the houses of row y are packed in words[y]
+        intolerance: list of floats, the intolerance of the Agents of each race (list index)
+        neighbourhood: neighbourhood.Neighbourhood, the neighbours of every house
+    """
+
+    def __init__(self, width, height, bits, words, intolerance, neighbourhood=None):
+        if bits not in BITS:
+            raise ValueError('a packed board has {} bits per house, not {}'.format(' or '.join(map(str, BITS)), bits))
+        self.width = width
+        self.height = height
+        self.bits = bits
+        self.words = words
+        self.intolerance = intolerance
+        self.neighbourhood = neighbourhood or MOORE
+
+    @property
+    def nbytes(self):
+        """
+        The memory taken by the packed houses.
+
+        :return: int, the number of bytes of words
+        """
+
+        return self.words.nbytes
+
+    def rows(self, start, stop):
+        """
+        Decodes a band of rows.
+
+        :param start, stop: int, the first row and the one after the last
+        :return: 2 dimensional numpy array of int8, the race of the Agent living in each house
+            of the rows, EMPTY if the house is empty
+        """
+
+        return decode(self.words[start:stop], self.bits, self.width)
+
+    def to_arrays(self):
+        """
+        Decodes the whole board, see schelling.Board.to_arrays.
+
+        :return: tuple of 2 dimensional numpy arrays, the race (int8) of the Agent occupying
+            each house or -1 if empty, and its intolerance (float64) or 0 if empty
+        """
+
+        races = self.rows(0, self.height)
+        return races, self.tolerance(races)
+
+    def tolerance(self, races):
+        """
+        Gives every Agent the intolerance of its race.
+
+        :param races: numpy array of int8, the race living in each house, EMPTY if empty
+        :return: numpy array of float64 shaped like races, 0 for the empty houses
+        """
+
+        return np.append(self.intolerance, 0.0)[races]
+
+    def bands(self):
+        """
+        Decodes the board band by band, each with the rows around it whose houses
+        are neighbours of its own: as many as the radius, from the other side on a torus.
+
+        :return: generator of tuples, the first and after last rows of the band, the row where the band starts
+            among the rows decoded (the radius, or less at the top of a board with edges), and the 2 dimensional
+            numpy array of int8 of the races of the rows decoded
+        """
+
+        radius = self.neighbourhood.radius
+        for start in range(0, self.height, CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, self.height)
+            if self.neighbourhood.torus:
+                rows = np.arange(start - radius, stop + radius) % self.height
+                yield start, stop, radius, decode(self.words[rows], self.bits, self.width)
+            else:
+                first = max(start - radius, 0)
+                yield start, stop, start - first, self.rows(first, min(stop + radius, self.height))
+
+    def neighbour_counts(self):
+        """
+        Counts the neighbours of each race of every house, see happiness.neighbour_counts.
+
+        :return: generator of tuples, the first and after last rows of each band, and the numpy array
+            of ints with the counts of its houses, where entry [r] is the number of neighbours of race r
+            and entry [len(intolerance)] is the number of neighbours
+        """
+
+        for start, stop, top, races in self.bands():
+            counts = happiness.neighbour_counts(races, len(self.intolerance), self.neighbourhood)
+            yield start, stop, counts[:, top:top + stop - start]
+
+    def calculate_segregation_happiness(self, similar=None):
+        """
+        Computes the segregation, the average fraction of similar neighbours,
+        and the percentage of happy Agents on the board, see happiness.calculate_segregation_happiness.
+
+        :param similar: 2 dimensional list of Booleans, how Agents of each race rank every race,
+            schelling.similarity_table if None
+        :return: tuple of floats, segregation and happiness percentages rounded to two decimal places
+        """
+
+        if similar is None:
+            similar = schelling.similarity_table(len(self.intolerance))
+        similarity_sum, total, happy = 0, 0, 0
+        for start, stop, top, races in self.bands():
+            unhappy, similarity = happiness.evaluate(races, self.tolerance(races), similar, self.neighbourhood)
+            band = slice(top, top + stop - start)
+            populated = races[band] != EMPTY
+            # The same sum, in the same order, as for the whole board at once
+            similarity_sum = sum(similarity[band][populated].tolist(), similarity_sum)
+            total += int(np.count_nonzero(populated))
+            happy += int(np.count_nonzero(populated)) - int(np.count_nonzero(unhappy[band]))
+        return round(similarity_sum / total * 100, 2), round(happy / total * 100, 2)
+
+
+def encode(races, bits):
+    """
+    Packs the houses of some rows, 8 // bits houses per byte.
+
+    :param races: 2 dimensional numpy array of ints, the race living in each house, EMPTY if empty
+    :param bits: int, one of BITS
+    :return: 2 dimensional numpy array of uint8, with a byte for every 8 // bits houses of a row
+    """
+
+    per_byte = 8 // bits
+    height, width = races.shape
+    codes = np.zeros((height, -(-width // per_byte) * per_byte), dtype=np.uint8)
+    codes[:, :width] = races + 1
+    codes = codes.reshape(height, -1, per_byte) << np.arange(0, 8, bits, dtype=np.uint8)
+    return np.bitwise_or.reduce(codes, axis=2)
+
+
+def decode(words, bits, width):
+    """
+    Unpacks the houses of some rows packed by encode.
+
+    :param words: 2 dimensional numpy array of uint8, the packed rows
+    :param bits: int, one of BITS
+    :param width: int, the number of houses of a row
+    :return: 2 dimensional numpy array of int8, the race living in each house, EMPTY if empty
+    """
+
+    codes = (words[:, :, np.newaxis] >> np.arange(0, 8, bits, dtype=np.uint8)) & ((1 << bits) - 1)
+    return codes.reshape(len(words), -1)[:, :width].astype(np.int8) - 1
+
+
+def pack(races, intolerance, bits=None, neighbourhood=None):
+    """
+    Packs a board, band by band.
+
+    :param races: 2 dimensional numpy array of ints, the race living in each house, EMPTY if empty
+    :param intolerance: 2 dimensional numpy array of floats, the intolerance of the Agent living
+        in each house, the same for every Agent of a race
+    :param bits: int, one of BITS, the fewest that hold every race if None
+    :param neighbourhood: neighbourhood.Neighbourhood, MOORE if None
+    :return: PackedGrid
+    """
+
+    height, width = races.shape
+    num_races = int(races.max()) + 1
+    if bits is None:
+        bits = next((bits for bits in BITS if num_races < 1 << bits), BITS[-1])
+    if num_races >= 1 << bits:
+        raise ValueError('{} bits per house hold {} races, not {}'.format(bits, (1 << bits) - 1, num_races))
+
+    words = np.empty((height, -(-width * bits // 8)), dtype=np.uint8)
+    lowest = np.full(num_races, np.inf)
+    highest = np.full(num_races, -np.inf)
+    for start in range(0, height, CHUNK_ROWS):
+        band_races, band_intolerance = races[start:start + CHUNK_ROWS], intolerance[start:start + CHUNK_ROWS]
+        words[start:start + CHUNK_ROWS] = encode(band_races, bits)
+        for race in range(num_races):
+            race_intolerance = band_intolerance[band_races == race]
+            if race_intolerance.size:
+                lowest[race] = min(lowest[race], race_intolerance.min())
+                highest[race] = max(highest[race], race_intolerance.max())
+    present = np.isfinite(lowest)
+    if (lowest[present] != highest[present]).any():
+        raise ValueError('a packed board keeps one intolerance per race, the Agents of a race have several')
+    return PackedGrid(width, height, bits, words, np.where(present, lowest, 0.0).tolist(), neighbourhood)
+
+
+def save(packed, file_name):
+    """
+    Saves a packed board, replacing the file only once it is completely written.
+
+    :param packed: PackedGrid
+    :param file_name: string, to name the file
+    :return: nothing
+    """
+
+    header = json.dumps({'width': packed.width, 'height': packed.height, 'bits': packed.bits,
+                         'intolerance': packed.intolerance,
+                         'neighbourhood': packed.neighbourhood.describe()}).encode()
+    temporary_name = file_name + '.tmp'
+    with open(temporary_name, 'wb') as packed_file:
+        packed_file.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+        packed_file.write(np.ascontiguousarray(packed.words).tobytes())
+    os.replace(temporary_name, file_name)
+
+
+def load(file_name):
+    """
+    Loads a packed board saved by save, memory-mapped read only.
+
+    :param file_name: string, the name of the file
+    :return: PackedGrid
+    """
+
+    with open(file_name, 'rb') as packed_file:
+        if packed_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not a packed board'.format(file_name))
+        length = int.from_bytes(packed_file.read(8), 'little')
+        description = json.loads(packed_file.read(length).decode())
+    width, height, bits = description['width'], description['height'], description['bits']
+    shape = (height, -(-width * bits // 8))
+    words = np.zeros(shape, dtype=np.uint8)
+    if 0 not in shape:
+        words = np.memmap(file_name, dtype=np.uint8, mode='r', offset=len(MAGIC) + 8 + length, shape=shape)
+    return PackedGrid(width, height, bits, words, description['intolerance'],
+                      Neighbourhood(**description['neighbourhood']))
+
+
+def add_arguments(parser):
+    """
+    Adds the arguments of the measure command to a parser.
+
+    :param parser: argparse.ArgumentParser
+    :return: nothing
+    """
+
+    parser.add_argument('packed_files', nargs='+',
+                        help='packed boards saved with --packed')
+
+
+def main(args):
+    """
+    Prints the segregation and happiness of the packed boards given by the parsed command line arguments.
+
+    :param args: argparse.Namespace, with the arguments added by add_arguments
+    :return: nothing
+    """
+
+    for file_name in args.packed_files:
+        packed = load(file_name)
+        segregation, happiness_percentage = packed.calculate_segregation_happiness()
+        print('{}: {}x{}, {} bits per house, {}% segregation, {}% happiness'
+              .format(file_name, packed.width, packed.height, packed.bits, segregation, happiness_percentage))
@@ -1,35 +1,28 @@
 import matplotlib.pyplot as plt
 
-sizes = [50*50, 100*100, 150*150, 200*200, 250*250, 300*300, 350*350, 400*400]
+import benchmark
+import sweep
 
-initialization_times = [0.034, 0.420, 2.050, 6.444, 15.571, 32.180, 59.834, 76.218]
-plt.plot(sizes, initialization_times)
-plt.title('Initialization Time vs Board Size')
-plt.savefig('plot/initialization_time_plot.png')
-plt.show()
-
-iterations_times = [0.260, 1.273, 3.179, 5.421, 9.226, 14.366, 21.712, 22.972]
-plt.plot(sizes, iterations_times)
-plt.title('Iterations Time vs Board Size')
-plt.savefig('plot/iterations_time_plot.png')
-plt.show()
+# regenerate with: ./schelling.py benchmark --output plot/benchmark.json
+report = benchmark.load('plot/benchmark.json')
 
-avg_iteration_times = [0.023, 0.090, 0.206, 0.375, 0.592, 0.855, 1.202, 1.397]
-plt.plot(sizes, avg_iteration_times)
-plt.title('Average Iteration Time vs Board Size')
-plt.savefig('plot/average_iteration_time_plot.png')
-plt.show()
-
-total_times = [0.690, 2.251, 6.049, 13.014, 26.430, 48.692, 85.189, 112.457]
-plt.plot(sizes, total_times)
-plt.title('Total Time vs Board Size')
-plt.savefig('plot/total_time_plot.png')
-plt.show()
+plots = [('initialization', 'Initialization Time vs Board Size', 'plot/initialization_time_plot.png'),
+         ('run', 'Iterations Time vs Board Size', 'plot/iterations_time_plot.png'),
+         ('iteration', 'Average Iteration Time vs Board Size', 'plot/average_iteration_time_plot.png'),
+         ('total', 'Total Time vs Board Size', 'plot/total_time_plot.png')]
+for phase, title, file_name in plots:
+    for engine, (sizes, times) in benchmark.series(report, phase).items():
+        plt.plot(sizes, times, label=engine)
+    plt.legend()
+    plt.title(title)
+    plt.savefig(file_name)
+    plt.show()
+    plt.close()
 
-intolerance = [0.05 * i for i in range(1, 18)]
-segregation = [51.24, 51.19, 55.48, 56.83, 58.02, 75.25, 77.24, 84.15, 88.00,
-               88.12, 93.36, 97.22, 97.71, 99.20, 99.78, 99.70, 99.62]
-plt.plot(intolerance, segregation)
+# regenerate with: ./schelling.py sweep --incremental --output plot/segregation.csv
+for board, points in sweep.curves(sweep.read_table('plot/segregation.csv'), 'segregation').items():
+    intolerance, segregation, _deviation = zip(*points)
+    plt.plot(intolerance, segregation)
 plt.title('Segregation vs Intolerance')
 plt.savefig('plot/segregation_plot.png')
 plt.show()
@@ -0,0 +1,153 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Per iteration profiling of the runs of the Schelling's segregation model.
+
+A RunTrace handed to Board.run counts, for every iteration, the happiness evaluations,
+the unhappy Agents, the moves and the empty houses picked, and times the calls of the
+instrumented functions. Without a RunTrace the run does none of this work.
+The synchronous iterations evaluate, pick and move for the whole board at once, and add
+an evaluation for every Agent, and a pick and a move for every Agent moved, with the time taken.
+"""
+
+# Python Modules
+import contextlib
+import csv
+import json
+import time
+
+
+# Functions timed by the boards when a RunTrace is given
+TIMED = ['neighbours', 'is_happy', 'move_agent', 'empty_house_pick']
+
+
+class RunTrace:
+    """
+    Class RunTrace has 2 attributes:
+        iterations: list of dicts, one per iteration run, with the iteration number,
+            its time, the number of unhappy Agents and the calls and time of each timed function
+        record: dict, the counters of the iteration being run
+    """
+
+    def __init__(self):
+        self.iterations = []
+        self.record = None
+
+    def begin_iteration(self):
+        """
+        Starts counting a new iteration.
+
+        :return: nothing
+        """
+
+        self.record = {'iteration': len(self.iterations), 'time': time.perf_counter(), 'unhappy': 0}
+        for name in TIMED:
+            self.record[name + '_calls'] = 0
+            self.record[name + '_time'] = 0.0
+
+    def end_iteration(self, unhappy):
+        """
+        Finishes the iteration being counted.
+
+        :param unhappy: int, the number of unhappy Agents found in the iteration
+        :return: nothing
+        """
+
+        self.record['time'] = time.perf_counter() - self.record['time']
+        self.record['unhappy'] = unhappy
+        self.iterations.append(self.record)
+        self.record = None
+
+    def timed(self, name, function):
+        """
+        Wraps a function so that its calls and time count towards the iteration being run.
+
+        :param name: string, one of TIMED
+        :param function: the function to wrap
+        :return: the wrapped function
+        """
+
+        calls = name + '_calls'
+        elapsed = name + '_time'
+
+        def timed_function(*args):
+            start = time.perf_counter()
+            result = function(*args)
+            self.record[elapsed] += time.perf_counter() - start
+            self.record[calls] += 1
+            return result
+
+        return timed_function
+
+    def add(self, name, calls, seconds):
+        """
+        Counts the calls of a timed function made all at once, by a whole-board operation.
+
+        :param name: string, one of TIMED
+        :param calls: int, the number of calls the operation stands for
+        :param seconds: float, the time the operation took
+        :return: nothing
+        """
+
+        self.record[name + '_calls'] += calls
+        self.record[name + '_time'] += seconds
+
+    def totals(self):
+        """
+        Adds up the counters of every iteration.
+
+        :return: dict, with the iterations, their time, the unhappy Agents
+            and the calls and time of each timed function
+        """
+
+        totals = {'iterations': len(self.iterations)}
+        for record in self.iterations:
+            for key, value in record.items():
+                if key != 'iteration':
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def save(self, file_name):
+        """
+        Saves the trace, as JSON if the file name ends in .json and as csv otherwise.
+
+        :param file_name: string, to name the file
+        :return: nothing
+        """
+
+        if file_name.endswith('.json'):
+            with open(file_name, 'w') as trace_file:
+                json.dump({'iterations': self.iterations, 'totals': self.totals()}, trace_file, indent=1)
+            return
+
+        fields = ['iteration', 'time', 'unhappy'] + [name + suffix for name in TIMED for suffix in ('_calls', '_time')]
+        with open(file_name, 'w', newline='') as trace_file:
+            writer = csv.DictWriter(trace_file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self.iterations)
+
+
+@contextlib.contextmanager
+def instrument(trace, owner, attribute, name):
+    """
+    Times a method of an object while the context lasts, if there is a trace.
+
+    :param trace: RunTrace or None
+    :param owner: the object whose method is timed
+    :param attribute: string, the name of the method
+    :param name: string, one of TIMED
+    :return: nothing
+    """
+
+    if trace is None:
+        yield
+        return
+
+    setattr(owner, attribute, trace.timed(name, getattr(owner, attribute)))
+    try:
+        yield
+    finally:
+        delattr(owner, attribute)
@@ -0,0 +1,160 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Seeded random number streams for the Schelling's segregation model.
+
+Every board owns a RandomStream, so runs can be reproduced from their seed
+and many boards can run side by side without sharing the global random state.
+"""
+
+# Python Packages
+import numpy as np
+
+
+class RandomStream:
+    """
+    Class RandomStream has 8 attributes:
+        seed: int, the seed of the stream
+        generator: numpy Generator, where every random number of the stream comes from
+        batch_size: int, how many indices (or fractions) are drawn at once
+        batch: list of ints, indices drawn in advance
+        batch_high: int, the indices in batch are drawn from range(batch_high)
+        position: int, the position of the next index in batch
+        fractions: list of floats, drawn in advance from [0, 1) for index_below
+        fraction_position: int, the position of the next float in fractions
+    """
+
+    def __init__(self, seed=None, batch_size=4096):
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1, np.uint32)[0])
+        self.seed = seed
+        self.generator = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.batch = []
+        self.batch_high = 0
+        self.position = 0
+        self.fractions = []
+        self.fraction_position = 0
+
+    def sample(self, population, k):
+        """
+        Draws k distinct ints from range(population), in random order.
+
+        :param population: int, the number of ints to choose from
+        :param k: int, the number of ints to draw
+        :return: list of ints
+        """
+
+        return self.generator.choice(population, k, replace=False).tolist()
+
+    def uniform(self, size):
+        """
+        Draws floats uniformly from [0, 1).
+
+        :param size: int, the number of floats to draw
+        :return: 1 dimensional numpy array of float64
+        """
+
+        return self.generator.random(size)
+
+    def shuffle(self, items):
+        """
+        Shuffles a list in place.
+
+        :param items: list
+        :return: nothing
+        """
+
+        items[:] = [items[i] for i in self.generator.permutation(len(items))]
+
+    def refill(self, high):
+        """
+        Draws a new batch of indices below high if the current one is used up or has other bounds.
+
+        :param high: int, the number of ints to choose from
+        :return: nothing
+        """
+
+        if self.position == len(self.batch) or high != self.batch_high:
+            self.batch = self.generator.integers(high, size=self.batch_size).tolist()
+            self.batch_high = high
+            self.position = 0
+
+    def index(self, high):
+        """
+        Draws an int uniformly from range(high), from a batch drawn in advance.
+
+        :param high: int, the number of ints to choose from
+        :return: int
+        """
+
+        self.refill(high)
+        self.position += 1
+        return self.batch[self.position - 1]
+
+    def index_below(self, high):
+        """
+        Draws an int from range(high), for bounds that change from one draw to the next,
+        where index would draw a new batch every time. It scales a float drawn in advance,
+        which is uniform but for a bias of high / 2 ** 53 at most.
+
+        :param high: int, the number of ints to choose from
+        :return: int
+        """
+
+        if self.fraction_position == len(self.fractions):
+            self.fractions = self.generator.random(self.batch_size).tolist()
+            self.fraction_position = 0
+        self.fraction_position += 1
+        # A fraction just below 1 can round up to high
+        return min(int(self.fractions[self.fraction_position - 1] * high), high - 1)
+
+    def indices(self, high, size):
+        """
+        Draws ints uniformly from range(high), the same ints that as many calls to index would.
+
+        :param high: int, the number of ints to choose from
+        :param size: int, the number of ints to draw
+        :return: list of ints
+        """
+
+        drawn = []
+        while len(drawn) < size:
+            self.refill(high)
+            taken = self.batch[self.position:self.position + size - len(drawn)]
+            self.position += len(taken)
+            drawn.extend(taken)
+        return drawn
+
+    def state(self):
+        """
+        Captures the state of the stream, to restore it later and draw the same numbers.
+
+        :return: dict, with the seed, the generator's state, the batch and the fractions drawn in advance
+            and their bounds and positions
+        """
+
+        return {'seed': self.seed, 'generator': self.generator.bit_generator.state,
+                'batch_size': self.batch_size, 'batch': list(self.batch),
+                'batch_high': self.batch_high, 'position': self.position,
+                'fractions': list(self.fractions), 'fraction_position': self.fraction_position}
+
+    def restore(self, state):
+        """
+        Restores a state captured by state.
+
+        :param state: dict, as returned by state
+        :return: nothing
+        """
+
+        self.seed = state['seed']
+        self.generator.bit_generator.state = state['generator']
+        self.batch_size = state['batch_size']
+        self.batch = list(state['batch'])
+        self.batch_high = state['batch_high']
+        self.position = state['position']
+        self.fractions = list(state['fractions'])
+        self.fraction_position = state['fraction_position']
@@ -0,0 +1,78 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Indexed PNG snapshots of the boards of the Schelling's segregation model.
+
+The board is written directly as a paletted PNG, one pixel (or a square block of pixels)
+per house, with zlib and struct alone, so snapshots cost the same as a pass over the board
+and need no plotting library.
+"""
+
+# Python Modules
+import struct
+import zlib
+
+# Python Packages
+import numpy as np
+
+
+# Colors of the empty houses and of each race, the same as schelling.plot_matrix
+# (matplotlib's w, r, b, g, c, m, y and k)
+PALETTE = [(255, 255, 255), (255, 0, 0), (0, 0, 255), (0, 128, 0),
+           (0, 191, 191), (191, 0, 191), (191, 191, 0), (0, 0, 0)]
+
+
+def chunk(kind, data):
+    """
+    Builds a PNG chunk.
+
+    :param kind: bytes, the 4 letter type of the chunk
+    :param data: bytes, the contents of the chunk
+    :return: bytes, with the length, type, contents and CRC of the chunk
+    """
+
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def encode(indices, scale=1, palette=PALETTE):
+    """
+    Encodes a matrix of palette indices as a PNG.
+
+    :param indices: 2 dimensional numpy array of uint8, the palette index of each house
+        (a board's frame: 0 for empty houses and the race plus one otherwise)
+    :param scale: int, the side in pixels of the block drawn for each house
+    :param palette: list of tuples of ints, the RGB color of each index
+    :return: bytes, the PNG file
+    """
+
+    pixels = np.ascontiguousarray(indices, dtype=np.uint8)
+    if scale > 1:
+        pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+    height, width = pixels.shape
+    # Every scanline starts with its filter type, 0 (none)
+    scanlines = np.zeros((height, width + 1), dtype=np.uint8)
+    scanlines[:, 1:] = pixels
+
+    return b''.join([b'\x89PNG\r\n\x1a\n',
+                     chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0)),
+                     chunk(b'PLTE', bytes(channel for color in palette for channel in color)),
+                     chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6)),
+                     chunk(b'IEND', b'')])
+
+
+def write_png(indices, file_name, scale=1, palette=PALETTE):
+    """
+    Saves a matrix of palette indices as a PNG, see encode.
+
+    :param indices: 2 dimensional numpy array of uint8, the palette index of each house
+    :param file_name: string, to name the file
+    :param scale: int, the side in pixels of the block drawn for each house
+    :param palette: list of tuples of ints, the RGB color of each index
+    :return: nothing
+    """
+
+    with open(file_name, 'wb') as png_file:
+        png_file.write(encode(indices, scale, palette))
@@ -11,25 +11,40 @@ An implementation of the Schelling's segregation model.
 
 # Python Modules
 import abc
-import argparse
+import heapq
 import math
-import random
+import time
 
 # Python Packages
-import matplotlib.colors
-import matplotlib.pyplot as plt
-import pendulum
+import numpy as np
+
+# Project Modules
+import happiness
+import profiling
+import randomness
+import raster
+from neighbourhood import KINDS, MOORE, Neighbourhood
+from vacancies import POLICIES, EmptyHouses
+
+
+# Fraction of dirty houses above which Board.run_incremental checks every house
+FULL_SWEEP_RATIO = 0.2
 
 
 class AbstractAgentStrategy(object):
     __metaclass__ = abc.ABCMeta
 
+    # Index in Agent.traits of the trait compared by the strategy
+    key = None
+
     @abc.abstractmethod
     def rank_diff(self):
         """Required Method"""
 
 
 class RacialStrategy(AbstractAgentStrategy):
+    key = 0
+
     def rank_diff(self, agent):
         # print('Racial Strategy')
         if self.race == agent.race:
@@ -39,6 +54,8 @@ class RacialStrategy(AbstractAgentStrategy):
 
 
 class EconomicStrategy(AbstractAgentStrategy):
+    key = 1
+
     def rank_diff(self, agent):
         if self.income == agent.income:
             return 0
@@ -47,6 +64,8 @@ class EconomicStrategy(AbstractAgentStrategy):
 
 
 class AcademicStrategy(AbstractAgentStrategy):
+    key = 2
+
     def rank_diff(self, agent):
         if self.academic == agent.academic:
             return 0
@@ -54,35 +73,48 @@ class AcademicStrategy(AbstractAgentStrategy):
             return 1
 
 
+# Strategy and traits (race, income, academic) of the Agents of each race
+RACES = [(RacialStrategy, (0, 0, 0)),
+         (EconomicStrategy, (1, 1, 0)),
+         (AcademicStrategy, (2, 0, 1))]
+
+
 class Agent:
     """
-    Class Agent has 4 attributes:
+    Class Agent has 6 attributes:
         intolerance: float, level of intolerance of other Agents
         race: int, the defining characteristic of the Agent
         x, y: int, the coordinates of this Agent on the Board
+        traits: tuple of ints, the race, income and academic level of the Agent, shared by its race
+        key: int, the index in traits of the trait the Agent compares, fixed by its race's strategy
     """
 
+    __slots__ = ('intolerance', 'race', 'x', 'y', 'traits', 'key')
+
     def __init__(self, race, intolerance, x, y):
         self.intolerance = intolerance
         self.race = race
         self.x = x
         self.y = y
-        
-        if race == 0:
-            self.behaviour = RacialStrategy
-            self.income = 0
-            self.academic = 0
-        elif race == 1:
-            self.behaviour = EconomicStrategy
-            self.income = 1
-            self.academic = 0
-        elif race == 2:
-            self.behaviour = AcademicStrategy
-            self.income = 0
-            self.academic = 1
+
+        if 0 <= race < len(RACES):
+            strategy, self.traits = RACES[race]
+            self.key = strategy.key
         else:
             print('problems instantiating agent')
 
+    @property
+    def behaviour(self):
+        return RACES[self.race][0]
+
+    @property
+    def income(self):
+        return self.traits[1]
+
+    @property
+    def academic(self):
+        return self.traits[2]
+
     def set_pair(self, pair):
         """
         Setter of the coordinates of the agent.
@@ -95,7 +127,16 @@ class Agent:
         self.y = pair[1]
 
     def rank_diff(self, agent):
-        return self.behaviour.rank_diff(self, agent)
+        """
+        Ranks another Agent by the trait of this Agent's strategy,
+        the same as self.behaviour.rank_diff(self, agent).
+
+        :param agent: Agent, to rank
+        :return: int, 0 if the Agents are similar and 1 otherwise
+        """
+
+        key = self.key
+        return 0 if self.traits[key] == agent.traits[key] else 1
 
     def is_happy(self, neighbours):
         """
@@ -105,51 +146,186 @@ class Agent:
         :return: Boolean, happy or not
         """
 
-        total = 0
+        key = self.key
+        trait = self.traits[key]
+        total = len(neighbours)
         happy_with_neighbour = 0
         for neighbour in neighbours:
-            total += 1
-            if self.rank_diff(neighbour) == 0:
+            if neighbour.traits[key] == trait:
                 happy_with_neighbour += 1
 
         return total == 0 or (happy_with_neighbour / total) >= self.intolerance
 
 
+def similarity_table(num_races):
+    """
+    Tabulates how Agents of each race rank Agents of every race.
+
+    :param num_races: int, number of races
+    :return: 2 dimensional list of Booleans, where entry [a][b] is True
+        if an Agent of race a ranks an Agent of race b as similar (rank_diff is 0)
+    """
+
+    agents = [Agent(race, 0, 0, 0) for race in range(num_races)]
+    return [[agent.rank_diff(other) == 0 for other in agents] for agent in agents]
+
+
+def relocate(empty_houses, random, house):
+    """
+    Picks the empty house an Agent moves to, uniformly at random, and leaves the Agent's house
+    empty in its place: the Agent's house takes the slot of the picked house, in constant time.
+    Every engine moves its Agents through here, so for the same random numbers they pick the same houses.
+
+    :param empty_houses: vacancies.EmptyHouses, the empty houses
+    :param random: RandomStream, to pick the house
+    :param house: tuple of ints, the coordinates of the Agent's house
+    :return: tuple of ints, the coordinates of the picked house
+    """
+
+    return empty_houses.replace(random.index(len(empty_houses)), house)
+
+
+def match_movers(movers, empty_houses, random):
+    """
+    Matches the unhappy Agents found on one snapshot of a board with empty houses, all at once.
+    The Agents are shuffled and each, in that order, gets a different empty house drawn at random,
+    so no two Agents claim the same house. When there are fewer empty houses than Agents the last
+    ones stay where they are. The houses taken are replaced in empty_houses by the houses the Agents
+    leave, which are free for the next iteration.
+
+    :param movers: list of tuples, the coordinates of the unhappy Agents' houses
+    :param empty_houses: vacancies.EmptyHouses, the empty houses
+    :param random: RandomStream, to shuffle the Agents and pick the houses
+    :return: list of tuples, the coordinates of the house each moving Agent leaves and of its new house
+    """
+
+    order = random.sample(len(movers), len(movers))
+    picks = random.sample(len(empty_houses), min(len(movers), len(empty_houses)))
+    moves = []
+    for mover, pick in zip(order, picks):
+        moves.append((movers[mover], empty_houses.replace(pick, movers[mover])))
+    return moves
+
+
+def plot_matrix(data, num_races, title, file_name):
+    """
+    Creates a plot of a matrix of ints and saves it in the current directory.
+    Matplotlib is only imported here, for plots with a title and axes,
+    plain snapshots are written by raster.write_png.
+
+    :param data: 2 dimensional list of ints, -1 for empty houses and the race otherwise
+    :param num_races: int, to know how many colors to use
+    :param title: string, to be the plot title
+    :param file_name: string, to name the file
+    :return: nothing
+    """
+
+    import matplotlib.colors
+    import matplotlib.pyplot as plt
+
+    available_colors = ['w', 'r', 'b', 'g', 'c', 'm', 'y', 'k']
+    c_map = matplotlib.colors.ListedColormap(available_colors[:num_races + 1])
+    figure, axes = plt.subplots()
+    axes.set_title(title)
+    axes.imshow(data, cmap=c_map, vmin=-1, vmax=num_races - 1, interpolation='nearest')
+    figure.savefig(file_name)
+    plt.close(figure)
+
+
+class HouseRow:
+    """
+    Class HouseRow has 3 attributes:
+        houses: list, the houses of a Board (see Board.houses), which the row reads and writes
+        start: int, the index in houses of the first house of the row
+        width: int, the number of houses of the row
+    """
+
+    def __init__(self, houses, start, width):
+        self.houses = houses
+        self.start = start
+        self.width = width
+
+    def __len__(self):
+        return self.width
+
+    def __iter__(self):
+        return iter(self.houses[self.start:self.start + self.width])
+
+    def __eq__(self, other):
+        if not isinstance(other, (HouseRow, list)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return 'HouseRow({!r})'.format(list(self))
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return [self.houses[house] for house in range(self.start, self.start + self.width)[x]]
+        return self.houses[range(self.start, self.start + self.width)[x]]
+
+    def __setitem__(self, x, agent):
+        if isinstance(x, slice):
+            houses = range(self.start, self.start + self.width)[x]
+            agents = list(agent)
+            if len(agents) != len(houses):
+                raise ValueError('{} houses of a row can\'t take {} Agents'.format(len(houses), len(agents)))
+            for house, row_agent in zip(houses, agents):
+                self.houses[house] = row_agent
+            return
+        self.houses[range(self.start, self.start + self.width)[x]] = agent
+
+
 class Board:
     """
-    Class Board has 6 attributes:
+    Class Board has 10 attributes:
         width, height: int, the size of the Board
         empty_ratio: float, percentage (from 0 to 1) of empty houses on the Board
-        empty_houses: list of tuples, where the tuple is a coordinate that is empty
+        empty_houses: vacancies.EmptyHouses, the coordinates of the empty houses
         num_empty: int, the number of empty houses on the Board (size of the empty_houses list)
-        matrix: 2 dimensional list, the Board itself where each entry is a house
+        houses: list, the Board itself where entry y * width + x is house (x, y)
             that if empty is None, if populated it's an Agent object
+        random: RandomStream, where every random number of the Board comes from
+        iteration: int, the number of iterations run so far, across runs and resumes
+        neighbourhood: neighbourhood.Neighbourhood, the neighbours of every house
+        table: neighbourhood.NeighbourTable, the neighbours of every house of the Board,
+            where the neighbours of house h are table[h]
     """
 
-    def __init__(self, width, height, empty_ratio):
+    def __init__(self, width, height, empty_ratio, seed=None, neighbourhood=None):
         self.width = width
         self.height = height
         self.empty_ratio = empty_ratio
-        self.empty_houses = []
+        self.empty_houses = EmptyHouses(width, height)
         self.num_empty = int(math.ceil(width * height * empty_ratio))
-        self.matrix = [[None for _x in range(width)] for _y in range(height)]
+        self.random = randomness.RandomStream(seed)
+        self.iteration = 0
+        self.houses = [None] * (width * height)
+        self.neighbourhood = neighbourhood or MOORE
+        self.table = self.neighbourhood.table(width, height)
+
+    @property
+    def matrix(self):
+        """
+        The Board as rows of houses, each None or an Agent object, so matrix[y][x] is house (x, y).
+        The rows are views of houses: setting matrix[y][x] sets the house, as with the old matrix.
+
+        :return: list of HouseRow
+        """
+
+        return [HouseRow(self.houses, y * self.width, self.width) for y in range(self.height)]
 
     def create_empty_houses(self):
         """
-        Generates the list of empty houses.
+        Generates the list of empty houses, in random order,
+        from a random sample of the houses' indices (y * width + x).
 
         :return: nothing
         """
 
-        for _i in range(self.num_empty):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            pair = (x, y)
-            while pair in self.empty_houses:
-                x = random.randint(0, self.width - 1)
-                y = random.randint(0, self.height - 1)
-                pair = (x, y)
-            self.empty_houses.append(pair)
+        houses = self.random.sample(self.width * self.height, self.num_empty)
+        self.empty_houses = EmptyHouses(self.width, self.height,
+                                        [(house % self.width, house // self.width) for house in houses])
 
     def populate(self, agent_prob, intolerance_threshold):
         """
@@ -163,30 +339,49 @@ class Board:
         """
 
         self.create_empty_houses()
+        empty = set(self.empty_houses)
+        race_gens = iter(self.random.uniform(self.width * self.height - len(empty)).tolist())
         for y in range(self.height):
             for x in range(self.width):
-                if (x, y) not in self.empty_houses:
-                    race_gen = random.uniform(0, 1)
+                if (x, y) not in empty:
+                    race_gen = next(race_gens)
                     race = next(aux[0] for aux in enumerate(agent_prob) if aux[1] >= race_gen)
                     agent = Agent(race, intolerance_threshold[race], x, y)
-                    self.matrix[y][x] = agent
+                    self.houses[y * self.width + x] = agent
+
+    def restore(self, races, intolerance, empty_houses):
+        """
+        Populates the Board with the Agents of a saved board, see checkpoint.load.
+
+        :param races: 2 dimensional numpy array of ints, the race of the Agent living in each house,
+            -1 if the house is empty
+        :param intolerance: 2 dimensional numpy array of floats, the intolerance of the Agent
+            living in each house
+        :param empty_houses: 2 dimensional numpy array of ints, the coordinates (x, y)
+            of the empty houses, in the order of empty_houses
+        :return: nothing
+        """
+
+        self.empty_houses = EmptyHouses(self.width, self.height, [tuple(house) for house in empty_houses.tolist()])
+        self.num_empty = len(self.empty_houses)
+        for y, (row, tolerances) in enumerate(zip(races.tolist(), intolerance.tolist())):
+            for x, (race, tolerance) in enumerate(zip(row, tolerances)):
+                self.houses[y * self.width + x] = None if race == -1 else Agent(race, tolerance, x, y)
 
     def neighbours(self, agent):
         """
-        Creates a list of the first level of neighbours of the given Agent.
+        Creates a list of the neighbours of the given Agent, from the neighbour table.
 
         :param agent: an Agent object
         :return: list of Agents, that are this agent's neighbours
         """
 
+        houses = self.houses
         neighbours = []
-        for y in (-1, 0, 1):
-            for x in (-1, 0, 1):
-                if (x != 0 or y != 0) \
-                        and 0 <= agent.x + x < self.width and 0 <= agent.y + y < self.height:
-                    neighbour = self.matrix[agent.y + y][agent.x + x]
-                    if neighbour is not None:
-                        neighbours.append(neighbour)
+        for near in self.table[agent.y * self.width + agent.x].tolist():
+            neighbour = houses[near]
+            if neighbour is not None:
+                neighbours.append(neighbour)
         return neighbours
 
     def move_agent(self, agent):
@@ -198,81 +393,231 @@ class Board:
         """
 
         agent_house = (agent.x, agent.y)
-        random_house = random.randint(0, self.num_empty - 1)
-        empty_house = self.empty_houses.pop(random_house)
-        self.empty_houses.append(agent_house)
+        empty_house = relocate(self.empty_houses, self.random, agent_house)
         agent.x = empty_house[0]
         agent.y = empty_house[1]
-        self.matrix[empty_house[1]][empty_house[0]] = agent
-        self.matrix[agent_house[1]][agent_house[0]] = None
+        self.houses[empty_house[1] * self.width + empty_house[0]] = agent
+        self.houses[agent_house[1] * self.width + agent_house[0]] = None
+
+    def surroundings(self, x, y):
+        """
+        Lists house (x, y) and its neighbours.
 
-    def run(self, num_iterations):
+        :param x, y: int, the coordinates of the house
+        :return: list of ints, the indices (y * width + x) of the houses
+        """
+
+        house = y * self.width + x
+        return [house] + self.table[house].tolist()
+
+    def sweep(self, trace=None):
+        """
+        Checks every Agent in order and moves the unhappy ones.
+
+        :param trace: profiling.RunTrace, to time neighbours, is_happy and move_agent, or None
+        :return: int, the number of unhappy Agents moved
+        """
+
+        neighbours, is_happy, move_agent = self.neighbours, Agent.is_happy, self.move_agent
+        if trace is not None:
+            neighbours = trace.timed('neighbours', neighbours)
+            is_happy = trace.timed('is_happy', is_happy)
+            move_agent = trace.timed('move_agent', move_agent)
+
+        unhappy = 0
+        for agent in self.houses:
+            if agent is not None:
+                happy = is_happy(agent, neighbours(agent))
+                if not happy:
+                    unhappy += 1
+                    move_agent(agent)
+        return unhappy
+
+    def sweep_dirty(self, dirty, trace=None):
+        """
+        Checks the Agents of the dirty houses in order and moves the unhappy ones,
+        making dirty the origin and destination of every move together with their neighbours.
+        Houses made dirty ahead of the current house are checked in this sweep,
+        the ones behind it are left for the next.
+
+        :param dirty: list of ints, the indices (y * width + x) of the dirty houses
+        :param trace: profiling.RunTrace, to time neighbours, is_happy and move_agent, or None
+        :return: tuple, the number of unhappy Agents moved and the list of dirty houses left
+        """
+
+        neighbours, is_happy, move_agent = self.neighbours, Agent.is_happy, self.move_agent
+        if trace is not None:
+            neighbours = trace.timed('neighbours', neighbours)
+            is_happy = trace.timed('is_happy', is_happy)
+            move_agent = trace.timed('move_agent', move_agent)
+
+        queue = sorted(dirty)
+        queued = bytearray(self.width * self.height)
+        for house in queue:
+            queued[house] = 1
+        following = bytearray(self.width * self.height)
+        unhappy = 0
+        while queue:
+            house = heapq.heappop(queue)
+            y, x = divmod(house, self.width)
+            agent = self.houses[house]
+            if agent is not None and not is_happy(agent, neighbours(agent)):
+                unhappy += 1
+                move_agent(agent)
+                for near in self.surroundings(x, y) + self.surroundings(agent.x, agent.y):
+                    if near <= house:
+                        following[near] = 1
+                    elif not queued[near]:
+                        queued[near] = 1
+                        heapq.heappush(queue, near)
+        return unhappy, np.flatnonzero(np.frombuffer(following, dtype=np.uint8)).tolist()
+
+    def sweep_synchronous(self, trace=None):
+        """
+        Finds every unhappy Agent on the board as it is, and then moves them all together,
+        see match_movers. No Agent sees the moves of the others until the next iteration.
+
+        :param trace: profiling.RunTrace, to count an is_happy call for every Agent and an empty_house_pick
+            and move_agent call for every Agent moved, see profiling.RunTrace.add, or None
+        :return: int, the number of unhappy Agents moved
+        """
+
+        start = time.perf_counter()
+        unhappy = self.unhappy()
+        if trace is not None:
+            trace.add('is_happy', len(self.houses) - self.houses.count(None), time.perf_counter() - start)
+        ys, xs = np.nonzero(unhappy)
+        start = time.perf_counter()
+        moves = match_movers(list(zip(xs.tolist(), ys.tolist())), self.empty_houses, self.random)
+        picked = time.perf_counter()
+        for (x, y), (empty_x, empty_y) in moves:
+            agent = self.houses[y * self.width + x]
+            agent.x = empty_x
+            agent.y = empty_y
+            self.houses[empty_y * self.width + empty_x] = agent
+            self.houses[y * self.width + x] = None
+        if trace is not None:
+            trace.add('empty_house_pick', len(moves), picked - start)
+            trace.add('move_agent', len(moves), time.perf_counter() - start)
+        return len(moves)
+
+    def run(self, num_iterations, incremental=False, trace=None, frames=None, checkpoints=None, synchronous=False):
         """
         Runs across the board checking if each Agent is unhappy.
         If an Agent is unhappy, move it to an empty house.
         Stops when every Agent is happy after running the allowed iterations.
 
         :param num_iterations: int, number of iterations to run this function
-        :return: nothing
+        :param incremental: Boolean, only check the Agents whose neighbourhood changed,
+            see run_incremental
+        :param trace: profiling.RunTrace, to record the counters and timings of every iteration,
+            or None to run without recording anything
+        :param frames: frames.FrameWriter, to record the board's state every few iterations, or None
+        :param checkpoints: checkpoint.Checkpointer, to save the board every few iterations, or None
+        :param synchronous: Boolean, move every unhappy Agent of an iteration together,
+            see sweep_synchronous, instead of one by one (incremental is then ignored)
+        :return: int, the number of iterations run
+        """
+
+        with profiling.instrument(trace, self.random, 'index', 'empty_house_pick'):
+            if incremental and not synchronous:
+                return self.run_incremental(num_iterations, trace, frames, checkpoints)
+
+            if frames is not None:
+                frames.record(self, self.iteration)
+            total_iterations = 0
+            for iteration in range(num_iterations):
+                if trace is not None:
+                    trace.begin_iteration()
+                unhappy = self.sweep_synchronous(trace) if synchronous else self.sweep(trace)
+                if trace is not None:
+                    trace.end_iteration(unhappy)
+                total_iterations += 1
+                self.iteration += 1
+                if frames is not None:
+                    frames.record(self, self.iteration, final=unhappy == 0)
+                if checkpoints is not None:
+                    checkpoints.record(self, final=unhappy == 0)
+                if unhappy == 0:
+                    break
+
+            if frames is not None:
+                frames.record(self, self.iteration, final=True)
+            if checkpoints is not None:
+                checkpoints.record(self, final=True)
+            return total_iterations
+
+    def run_incremental(self, num_iterations, trace=None, frames=None, checkpoints=None):
+        """
+        Runs the same iterations as run, but only checks the houses that are dirty:
+        the unhappy Agents at the start, and afterwards the origin and destination of
+        every move together with their neighbours. The other Agents were happy when last
+        checked and nothing around them changed since, so they are skipped.
+        While most of the board is dirty it is cheaper to check every house,
+        and the unhappy Agents left after such an iteration are the new dirty houses.
+        Either way the moves are exactly those of run.
+        Stops when no house is dirty or after running the allowed iterations.
+
+        :param num_iterations: int, number of iterations to run this function
+        :param trace: profiling.RunTrace, to record the counters and timings of every iteration, or None
+        :param frames: frames.FrameWriter, to record the board's state every few iterations, or None
+        :param checkpoints: checkpoint.Checkpointer, to save the board every few iterations, or None
+        :return: int, the number of iterations run
         """
 
+        if frames is not None:
+            frames.record(self, self.iteration)
+        dirty = np.flatnonzero(self.unhappy()).tolist()
         total_iterations = 0
         for iteration in range(num_iterations):
-            unhappy = 0
-            for y in range(self.height):
-                for x in range(self.width):
-                    agent = self.matrix[y][x]
-                    if agent is not None:
-                        neighbours = self.neighbours(agent)
-                        happy = agent.is_happy(neighbours)
-                        if not happy:
-                            unhappy += 1
-                            self.move_agent(agent)
             total_iterations += 1
+            self.iteration += 1
+            if not dirty:
+                break
+            if trace is not None:
+                trace.begin_iteration()
+            if len(dirty) > self.width * self.height * FULL_SWEEP_RATIO:
+                unhappy = self.sweep(trace)
+                dirty = np.flatnonzero(self.unhappy()).tolist()
+            else:
+                unhappy, dirty = self.sweep_dirty(dirty, trace)
+            if trace is not None:
+                trace.end_iteration(unhappy)
+            if frames is not None:
+                frames.record(self, self.iteration)
+            if checkpoints is not None:
+                checkpoints.record(self, final=unhappy == 0)
             if unhappy == 0:
                 break
-        
+
+        if frames is not None:
+            frames.record(self, self.iteration, final=True)
+        if checkpoints is not None:
+            checkpoints.record(self, final=True)
         return total_iterations
 
-    def calculate_happiness(self):
-        happy = 0
-        total = 0
-        for y in range(self.height):
-            for x in range(self.width):
-                agent = self.matrix[y][x]
-                if agent is not None:
-                    total += 1
-                    neighbours = self.neighbours(agent)
-                    if agent.is_happy(neighbours):
-                        happy += 1
+    def unhappy(self):
+        """
+        Checks the happiness of every Agent at once.
+
+        :return: 2 dimensional numpy array of bool, True where an unhappy Agent lives
+        """
 
-        return round(happy / total, 2)
+        races, intolerance = self.to_arrays()
+        unhappy, _similarity = happiness.evaluate(races, intolerance,
+                                                  similarity_table(int(races.max()) + 1), self.neighbourhood)
+        return unhappy
+
+    def calculate_happiness(self):
+        races, intolerance = self.to_arrays()
+        return happiness.calculate_happiness(races, intolerance,
+                                             similarity_table(int(races.max()) + 1), self.neighbourhood)
 
     def calculate_segregation_happiness(self):
-        happy = 0
-        neighbours_similarity = []
-        for y in range(self.height):
-            for x in range(self.width):
-                agent = self.matrix[y][x]
-                if agent is not None:
-                    neighbours = self.neighbours(agent)
-                    total = 0
-                    happy_with_neighbour = 0
-                    for neighbour in neighbours:
-                        total += 1
-                        if agent.rank_diff(neighbour) == 0:
-                            happy_with_neighbour += 1
-
-                    if total == 0:
-                        neighbours_similarity.append(total)
-                        happy += 1
-                    else:
-                        neighbours_similarity.append(happy_with_neighbour / total)
-                        if happy_with_neighbour / total >= agent.intolerance:
-                            happy += 1
-
-        return round(sum(neighbours_similarity) / len(neighbours_similarity) * 100, 2), \
-            round(happy / len(neighbours_similarity) * 100, 2)
+        races, intolerance = self.to_arrays()
+        return happiness.calculate_segregation_happiness(races, intolerance,
+                                                         similarity_table(int(races.max()) + 1),
+                                                         self.neighbourhood)
 
     def plot(self, num_races, title, file_name):
         """
@@ -284,12 +629,18 @@ class Board:
         :return: nothing
         """
 
-        data = self.to_ints()
-        available_colors = ['w', 'r', 'b', 'g', 'c', 'm', 'y', 'k']
-        c_map = matplotlib.colors.ListedColormap(available_colors[:num_races + 1])
-        plt.title(title)
-        plt.imshow(data, cmap=c_map)
-        plt.savefig(file_name)
+        plot_matrix(self.to_ints(), num_races, title, file_name)
+
+    def snapshot(self, file_name, scale=1):
+        """
+        Saves the current matrix as a PNG, without title or axes, see raster.write_png.
+
+        :param file_name: string, to name the file
+        :param scale: int, the side in pixels of the block drawn for each house
+        :return: nothing
+        """
+
+        raster.write_png(self.frame(), file_name, scale)
 
     def to_ints(self):
         """
@@ -299,12 +650,58 @@ class Board:
             that has -1 for empty houses and the race (int) of the Agent occupying it otherwise
         """
 
-        int_matrix = [[-1 for _x in range(self.width)] for _y in range(self.height)]
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.matrix[y][x] is not None:
-                    int_matrix[y][x] = self.matrix[y][x].race
-        return int_matrix
+        races = [-1 if agent is None else agent.race for agent in self.houses]
+        return [races[y * self.width:(y + 1) * self.width] for y in range(self.height)]
+
+    def to_arrays(self):
+        """
+        Takes the current matrix and generates numpy arrays with the races and intolerances.
+
+        :return: tuple of 2 dimensional numpy arrays, the race (int8) of the Agent occupying
+            each house or -1 if empty, and its intolerance (float64) or 0 if empty
+        """
+
+        races = np.fromiter((-1 if agent is None else agent.race for agent in self.houses),
+                            dtype=np.int8, count=len(self.houses)).reshape(self.height, self.width)
+        intolerance = np.array([0 if agent is None else agent.intolerance for agent in self.houses],
+                               dtype=np.float64).reshape(self.height, self.width)
+        return races, intolerance
+
+    def frame(self):
+        """
+        Takes the current matrix as a frame for a frames.FrameWriter.
+
+        :return: 2 dimensional numpy array of uint8, 0 for empty houses and the race plus one otherwise
+        """
+
+        return np.fromiter((0 if agent is None else agent.race + 1 for agent in self.houses),
+                           dtype=np.uint8, count=len(self.houses)).reshape(self.height, self.width)
+
+
+ENGINES = ['agents', 'array', 'queue', 'compiled']
+
+# Engines that move the unhappy Agents by any relocation policy (vacancies.POLICIES), the others only at random
+RELOCATION_ENGINES = ['array', 'queue', 'compiled']
+
+
+def board_class(engine):
+    """
+    Finds the class implementing a board's engine.
+
+    :param engine: string, one of ENGINES
+    :return: the Board class, or an equivalent one
+    """
+
+    if engine == 'array':
+        from schelling_array import ArrayBoard
+        return ArrayBoard
+    if engine == 'queue':
+        from schelling_queue import QueueBoard
+        return QueueBoard
+    if engine == 'compiled':
+        from schelling_compiled import CompiledBoard
+        return CompiledBoard
+    return Board
 
 
 def main():
@@ -315,6 +712,10 @@ def main():
     :return: nothing
     """
 
+    # Only the command line needs these, importing the module to simulate does not
+    import argparse
+    import os
+
     parser = argparse.ArgumentParser(description='Simulate Schelling\'s segregation model.')
     parser.add_argument('-wi', '--width', dest='width',
                         default=100, nargs='?', type=int,
@@ -329,55 +730,238 @@ def main():
                         default=2, nargs='?', type=int,
                         help='number of races')
     parser.add_argument('-a', '--agents', dest='agent_prob',
-                        default=[0.5, 1], nargs='*', type=float,
-                        help='list of size equal to the number of races'
-                             'where it\'s the accumulative probability'
-                             'of spawning an agent of that race (their index)')
+                        default=None, nargs='+', type=float, action='extend',
+                        help='list of size equal to the number of races '
+                             'where it\'s the accumulative probability '
+                             'of spawning an agent of that race (their index), 0.5 1 by default. '
+                             'The list takes every number after it, so before a command end it '
+                             'with another option or give each number its own -a (-a 0.3 -a 1 sweep)')
     parser.add_argument('-t', '--intolerance', dest='intolerance_threshold',
-                        default=[0.5, 0.5], nargs='*', type=float,
-                        help='list of size equal to the number of races'
-                             'where it\'s the intolerance threshold'
-                             'of an agent of that race (their index)')
+                        default=None, nargs='+', type=float, action='extend',
+                        help='list of size equal to the number of races '
+                             'where it\'s the intolerance threshold '
+                             'of an agent of that race (their index), 0.5 0.5 by default. '
+                             'The list takes every number after it, so before a command end it '
+                             'with another option or give each number its own -t (-t 0.6 -t 0.6 sweep)')
     parser.add_argument('-i', '--num_iterations', dest='num_iterations',
                         default=500, nargs='?', type=int,
                         help='number of iterations')
+    parser.add_argument('-g', '--engine', dest='engine',
+                        default=None, choices=ENGINES,
+                        help='board\'s implementation, a matrix of Agent objects (agents, the default, '
+                             'or the engine of the checkpoint with --resume), '
+                             'numpy arrays of races and intolerances (array), '
+                             'a queue of the unhappy agents, moved in random order (queue), '
+                             'or the arrays swept by code compiled with numba, if it is installed (compiled)')
+    parser.add_argument('-n', '--incremental', dest='incremental', action='store_true',
+                        help='only check the agents whose neighbourhood changed since they were '
+                             'last checked, which gives the same moves as checking them all')
+    parser.add_argument('-u', '--update', dest='update',
+                        default='sequential', choices=['sequential', 'synchronous'],
+                        help='move the unhappy agents one by one, each seeing the moves before it (sequential), '
+                             'or find them all on the same board and move them together (synchronous), '
+                             'which is much faster but changes the dynamics')
+    parser.add_argument('--neighbourhood', dest='neighbourhood',
+                        default='moore', choices=KINDS,
+                        help='the neighbours of a house, the square around it (moore) '
+                             'or the diamond around it (von_neumann)')
+    parser.add_argument('--radius', dest='radius',
+                        default=1, type=int,
+                        help='how far the neighbours of a house reach')
+    parser.add_argument('--torus', dest='torus', action='store_true',
+                        help='wrap the board around its edges, so every house has the same number of neighbours')
+    parser.add_argument('--relocation', dest='relocation',
+                        default='random', choices=POLICIES,
+                        help='where the unhappy agents move to, a random empty house (random), the nearest one '
+                             'where they would be happy (nearest) or the best of a few drawn at random (best_of_k), '
+                             'with every engine but agents and sequential updates')
+    parser.add_argument('--candidates', dest='candidates',
+                        default=8, type=int,
+                        help='number of empty houses drawn by the best_of_k relocation')
+    parser.add_argument('-s', '--seed', dest='seed',
+                        default=None, type=int,
+                        help='seed of the random numbers, to reproduce a previous run')
+    parser.add_argument('--no-plot', dest='plot', action='store_false',
+                        help='do not plot the initial and final states (nor import matplotlib), '
+                             'only print their segregation and happiness')
+    parser.add_argument('--trace', dest='trace',
+                        default=None,
+                        help='file to save the counters and timings of every iteration to, '
+                             'as JSON if it ends in .json and as csv otherwise')
+    parser.add_argument('--frames', dest='frames',
+                        default=None,
+                        help='.npy file to save the board\'s state to every few iterations, '
+                             'see the render command. With --resume, the frames recorded after the checkpoint '
+                             'are dropped, and the file starts over if the checkpoint was saved without --frames')
+    parser.add_argument('--frame_every', dest='frame_every',
+                        default=1, type=int,
+                        help='number of iterations between the frames saved with --frames')
+    parser.add_argument('--checkpoint', dest='checkpoint',
+                        default=None,
+                        help='file to save the board to every few iterations, to resume the run with --resume')
+    parser.add_argument('--checkpoint_every', dest='checkpoint_every',
+                        default=10, type=int,
+                        help='number of iterations between the checkpoints saved with --checkpoint')
+    parser.add_argument('--packed', dest='packed',
+                        default=None,
+                        help='file to save the final board to bit-packed, 2 or 4 bits per house, '
+                             'see the measure command')
+    parser.add_argument('--resume', dest='resume',
+                        default=None,
+                        help='checkpoint to load the board from instead of populating a new one, '
+                             'running until the board reaches the number of iterations')
+
+    import benchmark
+    import checkpoint
+    import equivalence
+    import frames
+    import packing
+    import sweep
+    commands = parser.add_subparsers(dest='command', title='commands')
+    sweep.add_arguments(commands.add_parser('sweep', help='run a parameter sweep over a pool of processes'))
+    benchmark.add_arguments(commands.add_parser('benchmark', help='time the engines on boards of several sizes'))
+    frames.add_arguments(commands.add_parser('render', help='plot the frames saved with --frames'))
+    equivalence.add_arguments(commands.add_parser('equivalence', help='check that the engines give the same results'))
+    packing.add_arguments(commands.add_parser('measure', help='print the segregation and happiness of packed boards'))
 
     args = parser.parse_args()
+    args.agent_prob = args.agent_prob or [0.5, 1]
+    args.intolerance_threshold = args.intolerance_threshold or [0.5, 0.5]
+    args.neighbourhood = Neighbourhood(args.neighbourhood, args.radius, args.torus)
+
+    if args.command == 'sweep':
+        error = sweep.arguments_error(args)
+        if error:
+            parser.error(error)
+        sweep.main(args)
+        return
+    if args.command == 'benchmark':
+        error = benchmark.arguments_error(args)
+        if error:
+            parser.error(error)
+        benchmark.main(args)
+        return
+    if args.command == 'render':
+        frames.main(args)
+        return
+    if args.command == 'equivalence':
+        equivalence.main(args)
+        return
+    if args.command == 'measure':
+        packing.main(args)
+        return
+
+    # A resumed board runs on the engine it was saved with, unless another one is given
+    given_engine = args.engine
+    if args.resume:
+        description, _start = checkpoint.read_header(args.resume)
+        args.engine = args.engine or description['engine']
+        if args.relocation not in ('random', description['relocation']):
+            parser.error('the board of {} moves its agents by the {} relocation, not {}'
+                         .format(args.resume, description['relocation'], args.relocation))
+        args.relocation = description['relocation']
+    else:
+        args.engine = args.engine or 'agents'
+    if args.relocation != 'random' and args.engine not in RELOCATION_ENGINES:
+        parser.error('the {} relocation needs the neighbour counts kept by the {} engines'
+                     .format(args.relocation, ', '.join(RELOCATION_ENGINES)))
+    if args.relocation != 'random' and args.update == 'synchronous':
+        parser.error('the agents moving together with --update synchronous go to random empty houses, '
+                     'not by the {} relocation'.format(args.relocation))
+
+    import pendulum
 
     time_initialization_start = pendulum.now()
-    board = Board(args.width, args.height, args.empty_ratio)
-    board.populate(args.agent_prob, args.intolerance_threshold)
+    if args.resume:
+        board = checkpoint.load(args.resume, given_engine)
+        args.width, args.height = board.width, board.height
+        print('Resuming from iteration {}'.format(board.iteration))
+    else:
+        relocation = {}
+        if args.relocation != 'random':
+            relocation = {'relocation': args.relocation, 'candidates': args.candidates}
+        board = board_class(args.engine)(args.width, args.height, args.empty_ratio, args.seed, args.neighbourhood,
+                                         **relocation)
+        board.populate(args.agent_prob, args.intolerance_threshold)
     time_initialization_end = pendulum.now()
+    print('The seed was {}'.format(board.random.seed))
 
     initialization_delta = time_initialization_end - time_initialization_start
     print('The initialization time was {}'.format(initialization_delta.as_timedelta()))
 
     segregation, happiness = board.calculate_segregation_happiness()
-    board.plot(args.num_races,
-               'Initial State: {}% segregation, {}% happiness'
-               .format(segregation, happiness),
-               'board_{}x{}_beginning.png'.format(args.width, args.height))
-
+    if args.plot:
+        board.plot(args.num_races,
+                   'Initial State: {}% segregation, {}% happiness'
+                   .format(segregation, happiness),
+                   'board_{}x{}_beginning.png'.format(args.width, args.height))
+    else:
+        print('Initial State: {}% segregation, {}% happiness'.format(segregation, happiness))
+
+    trace = profiling.RunTrace() if args.trace else None
+    frame_writer = None
+    if args.frames:
+        keep = None
+        if args.resume and os.path.exists(args.frames):
+            # The frames recorded up to the checkpoint, if it was saved with them
+            keep = checkpoint.read_header(args.resume)[0]['frames']
+        frame_writer = frames.FrameWriter(args.frames, args.height, args.width, args.frame_every, keep)
+        if frame_writer.frames:
+            # The resumed board's state is the last frame of the stream
+            frame_writer.last = board.iteration
+    checkpoints = None
+    if args.checkpoint:
+        checkpoints = checkpoint.Checkpointer(args.checkpoint, args.checkpoint_every, frame_writer)
     time_run_start = pendulum.now()
-    total_iterations = board.run(args.num_iterations)
+    total_iterations = board.run(max(args.num_iterations - board.iteration, 0), args.incremental,
+                                 trace, frame_writer, checkpoints, args.update == 'synchronous')
     time_run_end = pendulum.now()
 
     run_delta = time_run_end - time_run_start
     print('The run time was {}'.format(run_delta.as_timedelta()))
 
-    time_cycle = run_delta.as_timedelta() / total_iterations
+    time_cycle = run_delta.as_timedelta() / max(total_iterations, 1)
     print('Average time per run iteration was {}'.format(time_cycle))
+    if args.engine == 'queue' and args.update == 'sequential':
+        print('{} moves in {} iteration-equivalents'.format(board.moves, total_iterations))
+    if checkpoints is not None:
+        print('The board was saved to {} at iteration {}'.format(args.checkpoint, checkpoints.last))
+    if args.packed:
+        races, intolerance = board.to_arrays()
+        packed = packing.pack(races, intolerance, neighbourhood=board.neighbourhood)
+        packing.save(packed, args.packed)
+        print('The final board was saved to {}, {} bits per house'.format(args.packed, packed.bits))
+
+    if trace is not None:
+        trace.save(args.trace)
+        totals = trace.totals()
+        print('{} happiness evaluations, {} moves, {:.3f}s in neighbours, {:.3f}s in is_happy, '
+              '{:.3f}s in move_agent'.format(totals['is_happy_calls'], totals['move_agent_calls'],
+                                             totals['neighbours_time'], totals['is_happy_time'],
+                                             totals['move_agent_time']))
+        print('The trace was saved to {}'.format(args.trace))
+
+    if frame_writer is not None:
+        frame_writer.close()
+        print('{} frames were saved to {}'.format(frame_writer.frames, args.frames))
 
     segregation, happiness = board.calculate_segregation_happiness()
-    board.plot(args.num_races,
-               'Final State: {}% segregation, {}% happiness'
-               .format(segregation, happiness),
-               'board_{}x{}_end.png'.format(args.width, args.height))
+    if args.plot:
+        board.plot(args.num_races,
+                   'Final State: {}% segregation, {}% happiness'
+                   .format(segregation, happiness),
+                   'board_{}x{}_end.png'.format(args.width, args.height))
+    else:
+        print('Final State: {}% segregation, {}% happiness'.format(segregation, happiness))
 
 
 if __name__ == "__main__":
-    time_main_start = pendulum.now()
+    # perf_counter and timedelta print the same as pendulum, without importing it before main needs it
+    import datetime
+    import time
+
+    time_main_start = time.perf_counter()
     main()
-    time_main_end = pendulum.now()
-    main_delta = time_main_end - time_main_start
-    print('The total execution time was {}'.format(main_delta.as_timedelta()))
+    time_main_end = time.perf_counter()
+    main_delta = datetime.timedelta(seconds=time_main_end - time_main_start)
+    print('The total execution time was {}'.format(main_delta))
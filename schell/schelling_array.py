@@ -0,0 +1,571 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+An array-backed Board for the Schelling's segregation model.
+
+Instead of a matrix of Agent objects the board is kept in numpy arrays,
+one byte per house for the race and one float per house for the intolerance,
+together with the number of neighbours of each race around every house.
+Given the same seed it produces the same boards as schelling.Board.
+"""
+
+# Python Modules
+import heapq
+import math
+import time
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+import happiness
+import profiling
+import randomness
+import raster
+import schelling
+from happiness import EMPTY
+from neighbourhood import MOORE
+from schelling import FULL_SWEEP_RATIO
+from vacancies import EmptyHouses, VacancyIndex, best_of
+
+
+# Number of neighbours from which update_neighbours changes the counts with numpy instead of one by one
+VECTOR_NEIGHBOURS = 24
+
+
+class ArrayBoard:
+    """
+    Class ArrayBoard has 18 attributes:
+        width, height: int, the size of the Board
+        empty_ratio: float, percentage (from 0 to 1) of empty houses on the Board
+        empty_houses: vacancies.EmptyHouses, the coordinates of the empty houses
+        num_empty: int, the number of empty houses on the Board (size of the empty_houses list)
+        random: RandomStream, where every random number of the Board comes from
+        iteration: int, the number of iterations run so far, across runs and resumes
+        grid: 2 dimensional numpy array of int8, the race of the Agent living in each house,
+            EMPTY if the house is empty
+        intolerance: 2 dimensional numpy array of float64, the intolerance of the Agent
+            living in each house, 0 if the house is empty
+        similar: 2 dimensional numpy array of bool, where entry [a][b] is True
+            if an Agent of race a ranks an Agent of race b as similar
+        liked: 3 dimensional numpy array of ints, where entry [r][y][x] is the number of
+            neighbours of house (x, y) that an Agent of race r ranks as similar
+        occupied: 2 dimensional numpy array of ints, the number of neighbours of each house
+        counts: 3 dimensional numpy array of ints (int8 unless the neighbourhood is bigger),
+            liked and occupied stacked, of which liked and occupied are views
+        planes: list of lists of ints, the offsets of the planes of counts that change
+            when an Agent of each race (list index) arrives or leaves
+        neighbourhood: neighbourhood.Neighbourhood, the neighbours of every house
+        table: neighbourhood.NeighbourTable, the neighbours of every house of the Board,
+            where the neighbours of house h are table[h]
+        relocation: string, one of vacancies.POLICIES, where the unhappy Agents move to
+        candidates: int, the number of empty houses drawn by the best_of_k relocation policy
+        vacancies: vacancies.VacancyIndex, the empty houses welcoming each race,
+            kept for the nearest relocation policy, None otherwise
+    """
+
+    def __init__(self, width, height, empty_ratio, seed=None, neighbourhood=None, relocation='random', candidates=8):
+        self.width = width
+        self.height = height
+        self.empty_ratio = empty_ratio
+        self.empty_houses = EmptyHouses(width, height)
+        self.num_empty = int(math.ceil(width * height * empty_ratio))
+        self.random = randomness.RandomStream(seed)
+        self.iteration = 0
+        self.grid = np.full((height, width), EMPTY, dtype=np.int8)
+        self.intolerance = np.zeros((height, width), dtype=np.float64)
+        self.similar = np.ones((0, 0), dtype=bool)
+        self.counts = np.zeros((1, height, width), dtype=np.int8)
+        self.liked = self.counts[:0]
+        self.occupied = self.counts[0]
+        self.planes = []
+        self.neighbourhood = neighbourhood or MOORE
+        self.table = self.neighbourhood.table(width, height)
+        self.relocation = relocation
+        self.candidates = candidates
+        self.vacancies = None
+
+    def create_empty_houses(self):
+        """
+        Generates the list of empty houses, in random order,
+        from a random sample of the houses' indices (y * width + x).
+
+        :return: nothing
+        """
+
+        houses = self.random.sample(self.width * self.height, self.num_empty)
+        self.empty_houses = EmptyHouses(self.width, self.height,
+                                        [(house % self.width, house // self.width) for house in houses])
+
+    def populate(self, agent_prob, intolerance_threshold):
+        """
+        Populates the Board with Agents.
+
+        :param agent_prob: list of floats, cumulative probability,
+            with the probability of creation of an Agent of that or previous race (list index)
+        :param intolerance_threshold: list of floats,
+            with the threshold of intolerance for each race (list index)
+        :return: nothing
+        """
+
+        self.create_empty_houses()
+        empty = np.zeros(self.width * self.height, dtype=bool)
+        empty[[x + y * self.width for x, y in self.empty_houses]] = True
+        houses = np.flatnonzero(~empty)
+        race_gen = self.random.uniform(len(houses))
+        races = np.searchsorted(agent_prob, race_gen)
+        self.grid.reshape(-1)[houses] = races
+        self.intolerance.reshape(-1)[houses] = np.asarray(intolerance_threshold, dtype=np.float64)[races]
+
+        self.similar = np.array(schelling.similarity_table(len(agent_prob)), dtype=bool)
+        self.count_neighbours()
+
+    def restore(self, races, intolerance, empty_houses):
+        """
+        Populates the Board with the Agents of a saved board, see checkpoint.load.
+        The arrays are kept as the grid and intolerance, so memory-mapped ones are not read up front.
+
+        :param races: 2 dimensional numpy array of int8, the race of the Agent living in each house,
+            EMPTY if the house is empty
+        :param intolerance: 2 dimensional numpy array of float64, the intolerance of the Agent
+            living in each house, 0 if the house is empty
+        :param empty_houses: 2 dimensional numpy array of ints, the coordinates (x, y)
+            of the empty houses, in the order of empty_houses
+        :return: nothing
+        """
+
+        self.empty_houses = EmptyHouses(self.width, self.height, [tuple(house) for house in empty_houses.tolist()])
+        self.num_empty = len(self.empty_houses)
+        self.grid = races
+        self.intolerance = intolerance
+        self.similar = np.array(schelling.similarity_table(int(races.max()) + 1), dtype=bool)
+        self.count_neighbours()
+
+    def count_neighbours(self):
+        """
+        Recomputes the liked and occupied neighbour counts of every house from the grid.
+
+        :return: nothing
+        """
+
+        num_races = len(self.similar)
+        races = happiness.neighbour_counts(self.grid, num_races, self.neighbourhood)
+        likes = np.identity(num_races + 1, dtype=np.int8)
+        likes[:num_races, :num_races] = self.similar
+        self.counts = np.tensordot(likes, races, axes=1).astype(races.dtype)
+        self.liked = self.counts[:num_races]
+        self.occupied = self.counts[num_races]
+
+        plane = self.grid.size
+        self.planes = [[liker * plane for liker in np.flatnonzero(likes[:, race])] + [num_races * plane]
+                       for race in range(num_races)]
+        self._cells = memoryview(self.grid).cast('B').cast('b')
+        self._tolerance = memoryview(self.intolerance).cast('B').cast('d')
+        self._counts = memoryview(self.counts).cast('B').cast(self.counts.dtype.char)
+        self._flat_counts = self.counts.reshape(-1)
+        self._planes = [np.array(planes)[:, np.newaxis] for planes in self.planes]
+        self.vacancies = VacancyIndex(self) if self.relocation == 'nearest' else None
+
+    def update_neighbours(self, x, y, race, delta):
+        """
+        Adds delta to the neighbour counts around house (x, y) for an Agent of the given race.
+        Big neighbourhoods are changed with one numpy operation, so the cost of a move hardly grows with the radius.
+
+        :param x, y: int, the coordinates of the house
+        :param race: int, the race of the Agent arriving (delta 1) or leaving (delta -1)
+        :param delta: int, 1 or -1
+        :return: nothing
+        """
+
+        house = y * self.width + x
+        if self.neighbourhood.size >= VECTOR_NEIGHBOURS:
+            # The neighbours of a house are all different, so no count is changed twice
+            self._flat_counts[self._planes[race] + np.asarray(self.table[house])] += delta
+            return
+
+        counts = self._counts
+        neighbours = self.table[house].tolist()
+        for plane in self.planes[race]:
+            for near in neighbours:
+                counts[plane + near] += delta
+
+    def is_happy(self, x, y):
+        """
+        Checks if the Agent living in house (x, y) is happy.
+
+        :param x, y: int, the coordinates of an occupied house
+        :return: Boolean, happy or not
+        """
+
+        total = self.occupied[y, x]
+        return total == 0 or self.liked[self.grid[y, x], y, x] / total >= self.intolerance[y, x]
+
+    def pick_house(self, x, y, race, house):
+        """
+        Picks the empty house the Agent of house (x, y) moves to, by the relocation policy,
+        at random if the nearest policy finds none, and swaps the two in the empty houses.
+
+        :param x, y: int, the coordinates of the Agent's house
+        :param race: int, the Agent's race
+        :param house: int, the flat index of the Agent's house
+        :return: tuple of ints, the coordinates of the picked empty house
+        """
+
+        picked = None
+        if self.relocation != 'random':
+            near = set(self.table[house].tolist())
+            if self.relocation == 'nearest':
+                picked = self.vacancies.nearest(race, self._tolerance[house], x, y, near)
+            else:
+                picked = best_of(self, race, house, self.candidates, near)
+        if picked is None:
+            return schelling.relocate(self.empty_houses, self.random, (x, y))
+
+        self.empty_houses.remove(picked)
+        self.empty_houses.add((x, y))
+        return picked
+
+    def move_agent(self, x, y):
+        """
+        Moves the (unhappy) Agent of house (x, y) to an empty house and vacates the Agent's house.
+        The empty house is picked by the relocation policy, see pick_house.
+
+        :param x, y: int, the coordinates of the Agent's house
+        :return: tuple of ints, the coordinates of the Agent's new house
+        """
+
+        cells = self._cells
+        tolerance = self._tolerance
+        house = y * self.width + x
+        race = cells[house]
+        empty_x, empty_y = self.pick_house(x, y, race, house)
+        empty_house = empty_y * self.width + empty_x
+        cells[empty_house] = race
+        tolerance[empty_house] = tolerance[house]
+        cells[house] = EMPTY
+        tolerance[house] = 0
+        self.update_neighbours(x, y, race, -1)
+        self.update_neighbours(empty_x, empty_y, race, 1)
+        if self.vacancies is not None:
+            self.vacancies.refresh([house] + self.table[house].tolist()
+                                   + [empty_house] + self.table[empty_house].tolist())
+        return empty_x, empty_y
+
+    def sweep(self, trace=None):
+        """
+        Checks every house in order and moves the unhappy Agents found.
+
+        :param trace: profiling.RunTrace, to time is_happy and move_agent, see sweep_traced, or None
+        :return: int, the number of unhappy Agents moved
+        """
+
+        if trace is not None:
+            return self.sweep_traced(trace)
+
+        cells = self._cells
+        tolerance = self._tolerance
+        counts = self._counts
+        occupied = self.planes[0][-1]
+        liked = self.grid.size
+
+        unhappy = 0
+        house = 0
+        for y in range(self.height):
+            for x in range(self.width):
+                race = cells[house]
+                if race != EMPTY:
+                    total = counts[occupied + house]
+                    if total and counts[race * liked + house] / total < tolerance[house]:
+                        unhappy += 1
+                        self.move_agent(x, y)
+                house += 1
+        return unhappy
+
+    def sweep_traced(self, trace):
+        """
+        Makes the same moves as sweep, but checking every Agent with is_happy,
+        so that the checks can be timed.
+
+        :param trace: profiling.RunTrace, to time is_happy and move_agent
+        :return: int, the number of unhappy Agents moved
+        """
+
+        is_happy = trace.timed('is_happy', self.is_happy)
+        move_agent = trace.timed('move_agent', self.move_agent)
+        cells = self._cells
+
+        unhappy = 0
+        for y in range(self.height):
+            for x in range(self.width):
+                if cells[y * self.width + x] != EMPTY and not is_happy(x, y):
+                    unhappy += 1
+                    move_agent(x, y)
+        return unhappy
+
+    def sweep_dirty(self, dirty, trace=None):
+        """
+        Checks the dirty houses in order and moves the unhappy Agents found,
+        making dirty the origin and destination of every move together with their neighbours.
+        Houses made dirty ahead of the current house are checked in this sweep,
+        the ones behind it are left for the next.
+
+        :param dirty: list of ints, the indices (y * width + x) of the dirty houses
+        :param trace: profiling.RunTrace, to time is_happy and move_agent, or None
+        :return: tuple, the number of unhappy Agents moved and the list of dirty houses left
+        """
+
+        is_happy, move_agent = self.is_happy, self.move_agent
+        if trace is not None:
+            is_happy = trace.timed('is_happy', is_happy)
+            move_agent = trace.timed('move_agent', move_agent)
+
+        cells = self._cells
+        tolerance = self._tolerance
+        counts = self._counts
+        occupied = self.planes[0][-1]
+        liked = self.grid.size
+        table = self.table
+        width = self.width
+
+        queue = sorted(dirty)
+        queued = bytearray(self.grid.size)
+        for house in queue:
+            queued[house] = 1
+        following = bytearray(self.grid.size)
+        unhappy = 0
+        while queue:
+            house = heapq.heappop(queue)
+            race = cells[house]
+            if race == EMPTY:
+                continue
+            y, x = divmod(house, width)
+            if trace is None:
+                total = counts[occupied + house]
+                happy = not total or counts[race * liked + house] / total >= tolerance[house]
+            else:
+                happy = is_happy(x, y)
+            if not happy:
+                unhappy += 1
+                empty_x, empty_y = move_agent(x, y)
+                empty_house = empty_y * width + empty_x
+                for near in [house] + table[house].tolist() + [empty_house] + table[empty_house].tolist():
+                    if near <= house:
+                        following[near] = 1
+                    elif not queued[near]:
+                        queued[near] = 1
+                        heapq.heappush(queue, near)
+
+        return unhappy, np.flatnonzero(np.frombuffer(following, dtype=np.uint8)).tolist()
+
+    def sweep_synchronous(self, trace=None):
+        """
+        Finds every unhappy Agent on the board as it is, and then moves them all together,
+        see schelling.match_movers. The neighbour counts are recomputed once, after every move.
+
+        :param trace: profiling.RunTrace, to count an is_happy call for every Agent, an empty_house_pick
+            and move_agent call for every Agent moved and a neighbours call for the recount,
+            see profiling.RunTrace.add, or None
+        :return: int, the number of unhappy Agents moved
+        """
+
+        start = time.perf_counter()
+        unhappy = self.unhappy()
+        if trace is not None:
+            trace.add('is_happy', int(np.count_nonzero(self.grid != EMPTY)), time.perf_counter() - start)
+        ys, xs = np.nonzero(unhappy)
+        start = time.perf_counter()
+        moves = schelling.match_movers(list(zip(xs.tolist(), ys.tolist())), self.empty_houses, self.random)
+        picked = time.perf_counter()
+        if moves:
+            (x, y), (empty_x, empty_y) = np.array(moves).transpose(1, 2, 0)
+            self.grid[empty_y, empty_x] = self.grid[y, x]
+            self.intolerance[empty_y, empty_x] = self.intolerance[y, x]
+            self.grid[y, x] = EMPTY
+            self.intolerance[y, x] = 0
+            moved = time.perf_counter()
+            self.count_neighbours()
+            if trace is not None:
+                trace.add('neighbours', 1, time.perf_counter() - moved)
+        if trace is not None:
+            trace.add('empty_house_pick', len(moves), picked - start)
+            trace.add('move_agent', len(moves), time.perf_counter() - start)
+        return len(moves)
+
+    def run(self, num_iterations, incremental=False, trace=None, frames=None, checkpoints=None, synchronous=False):
+        """
+        Runs across the board checking if each Agent is unhappy.
+        If an Agent is unhappy, move it to an empty house.
+        Stops when every Agent is happy after running the allowed iterations.
+
+        :param num_iterations: int, number of iterations to run this function
+        :param incremental: Boolean, only check the Agents whose neighbourhood changed,
+            see run_incremental
+        :param trace: profiling.RunTrace, to record the counters and timings of every iteration,
+            or None to run without recording anything. The neighbours timings are those of
+            update_neighbours, as the neighbour counts are kept up to date by the moves
+        :param frames: frames.FrameWriter, to record the board's state every few iterations, or None
+        :param checkpoints: checkpoint.Checkpointer, to save the board every few iterations, or None
+        :param synchronous: Boolean, move every unhappy Agent of an iteration together,
+            see sweep_synchronous, instead of one by one (incremental is then ignored).
+            The Agents moving together go to random empty houses, so only with the random relocation
+        :return: int, the number of iterations run
+        """
+
+        if synchronous and self.relocation != 'random':
+            raise ValueError('the Agents moving together go to random empty houses, not by the {} relocation'
+                             .format(self.relocation))
+        with profiling.instrument(trace, self, 'pick_house', 'empty_house_pick'), \
+                profiling.instrument(trace, self, 'update_neighbours', 'neighbours'):
+            if incremental and not synchronous:
+                return self.run_incremental(num_iterations, trace, frames, checkpoints)
+
+            if frames is not None:
+                frames.record(self, self.iteration)
+            total_iterations = 0
+            for _iteration in range(num_iterations):
+                total_iterations += 1
+                self.iteration += 1
+                if trace is not None:
+                    trace.begin_iteration()
+                if synchronous:
+                    unhappy = self.sweep_synchronous(trace)
+                else:
+                    unhappy = self.sweep(trace) if self.unhappy().any() else 0
+                if trace is not None:
+                    trace.end_iteration(unhappy)
+                if frames is not None:
+                    frames.record(self, self.iteration, final=unhappy == 0)
+                if checkpoints is not None:
+                    checkpoints.record(self, final=unhappy == 0)
+                if unhappy == 0:
+                    break
+
+            if frames is not None:
+                frames.record(self, self.iteration, final=True)
+            if checkpoints is not None:
+                checkpoints.record(self, final=True)
+            return total_iterations
+
+    def run_incremental(self, num_iterations, trace=None, frames=None, checkpoints=None):
+        """
+        Runs the same iterations as run, but only checks the houses that are dirty:
+        the unhappy Agents at the start, and afterwards the origin and destination of
+        every move together with their neighbours. The other Agents were happy when last
+        checked and nothing around them changed since, so they are skipped.
+        While most of the board is dirty it is cheaper to check every house,
+        and the unhappy Agents left after such an iteration are the new dirty houses.
+        Either way the moves are exactly those of run.
+        Stops when no house is dirty or after running the allowed iterations.
+
+        :param num_iterations: int, number of iterations to run this function
+        :param trace: profiling.RunTrace, to record the counters and timings of every iteration, or None
+        :param frames: frames.FrameWriter, to record the board's state every few iterations, or None
+        :param checkpoints: checkpoint.Checkpointer, to save the board every few iterations, or None
+        :return: int, the number of iterations run
+        """
+
+        if frames is not None:
+            frames.record(self, self.iteration)
+        dirty = np.flatnonzero(self.unhappy()).tolist()
+        total_iterations = 0
+        for _iteration in range(num_iterations):
+            total_iterations += 1
+            self.iteration += 1
+            if not dirty:
+                break
+            if trace is not None:
+                trace.begin_iteration()
+            if len(dirty) > self.grid.size * FULL_SWEEP_RATIO:
+                unhappy = self.sweep(trace)
+                dirty = np.flatnonzero(self.unhappy()).tolist()
+            else:
+                unhappy, dirty = self.sweep_dirty(dirty, trace)
+            if trace is not None:
+                trace.end_iteration(unhappy)
+            if frames is not None:
+                frames.record(self, self.iteration)
+            if checkpoints is not None:
+                checkpoints.record(self, final=unhappy == 0)
+            if unhappy == 0:
+                break
+
+        if frames is not None:
+            frames.record(self, self.iteration, final=True)
+        if checkpoints is not None:
+            checkpoints.record(self, final=True)
+        return total_iterations
+
+    def unhappy(self):
+        """
+        Checks the happiness of every Agent from the neighbour counts.
+
+        :return: 2 dimensional numpy array of bool, True where an unhappy Agent lives
+        """
+
+        total = self.occupied
+        same = np.take_along_axis(self.liked, np.maximum(self.grid, 0)[np.newaxis].astype(np.intp), axis=0)[0]
+        neighboured = (self.grid != EMPTY) & (total > 0)
+        similarity = np.divide(same, total, out=np.zeros(self.grid.shape), where=neighboured)
+        return neighboured & (similarity < self.intolerance)
+
+    def calculate_happiness(self):
+        return happiness.calculate_happiness(self.grid, self.intolerance, self.similar, self.neighbourhood)
+
+    def calculate_segregation_happiness(self):
+        return happiness.calculate_segregation_happiness(self.grid, self.intolerance, self.similar,
+                                                         self.neighbourhood)
+
+    def plot(self, num_races, title, file_name):
+        """
+        Creates a plot with the current grid and saves it in the current directory.
+
+        :param num_races: int, to know how many colors to use
+        :param title: string, to be the plot title
+        :param file_name: string, to name the file
+        :return: nothing
+        """
+
+        schelling.plot_matrix(self.grid, num_races, title, file_name)
+
+    def snapshot(self, file_name, scale=1):
+        """
+        Saves the current grid as a PNG, without title or axes, see raster.write_png.
+
+        :param file_name: string, to name the file
+        :param scale: int, the side in pixels of the block drawn for each house
+        :return: nothing
+        """
+
+        raster.write_png(self.frame(), file_name, scale)
+
+    def to_ints(self):
+        """
+        Generates a matrix with the race of the Agent occupying each house.
+
+        :return: 2 dimensional list of ints, that has -1 for empty houses
+            and the race (int) of the Agent occupying it otherwise
+        """
+
+        return self.grid.tolist()
+
+    def to_arrays(self):
+        """
+        Generates numpy arrays with the races and intolerances.
+
+        :return: tuple of 2 dimensional numpy arrays, the race (int8) of the Agent occupying
+            each house or -1 if empty, and its intolerance (float64) or 0 if empty
+        """
+
+        return self.grid.copy(), self.intolerance.copy()
+
+    def frame(self):
+        """
+        Takes the current grid as a frame for a frames.FrameWriter.
+
+        :return: 2 dimensional numpy array of uint8, 0 for empty houses and the race plus one otherwise
+        """
+
+        return (self.grid + 1).astype(np.uint8)
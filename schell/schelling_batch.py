@@ -0,0 +1,249 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+A batch of replicates of the Schelling's segregation model, run together.
+
+The replicates are boards of the same size kept side by side, each house of every replicate
+next to each other in memory. Every iteration the unhappy Agents of all of them are found
+at once, and then a single raster sweep goes over
+the houses where any replicate may have an unhappy Agent, checking that house on every replicate
+at once and moving the unhappy Agents of each replicate with schelling.relocate and its own
+RandomStream. Every replicate makes exactly the moves an ArrayBoard with its seed would,
+while the Python work of the sweep is shared by all of them.
+"""
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+import happiness
+import schelling
+from happiness import EMPTY
+from neighbourhood import MOORE
+from schelling_array import ArrayBoard
+
+
+class BatchBoard:
+    """
+    Class BatchBoard has 13 attributes:
+        replicates: int, the number of boards
+        width, height: int, the size of every board
+        empty_ratio: float, percentage (from 0 to 1) of empty houses on every board
+        seeds: list of ints, the seed of each board
+        randoms: list of RandomStreams, where every random number of each board comes from
+        empty_houses: list of vacancies.EmptyHouses, the coordinates of the empty houses of each board
+        similar: 2 dimensional numpy array of bool, where entry [a][b] is True
+            if an Agent of race a ranks an Agent of race b as similar
+        cells: 2 dimensional numpy array of int8, where entry [h][r] is the race of the Agent
+            living in house h (y * width + x) of board r, EMPTY if the house is empty
+        intolerance: 2 dimensional numpy array of float64, the intolerance of the Agent
+            living in each house of each board, 0 if the house is empty, laid out as cells
+        active: 1 dimensional numpy array of bool, the boards that have not converged
+        iterations: 1 dimensional numpy array of ints, the number of iterations run by each board
+        neighbourhood: neighbourhood.Neighbourhood, the neighbours of every house of every board
+    """
+
+    def __init__(self, replicates, width, height, empty_ratio, seeds=None, neighbourhood=None):
+        if seeds is None:
+            seeds = np.random.SeedSequence().generate_state(replicates).tolist()
+        self.replicates = replicates
+        self.width = width
+        self.height = height
+        self.empty_ratio = empty_ratio
+        self.seeds = list(seeds)
+        self.randoms = []
+        self.empty_houses = []
+        self.similar = np.ones((0, 0), dtype=bool)
+        houses = height * width
+        self.cells = np.full((houses, replicates), EMPTY, dtype=np.int8)
+        self.intolerance = np.zeros((houses, replicates), dtype=np.float64)
+        self.active = np.ones(replicates, dtype=bool)
+        self.iterations = np.zeros(replicates, dtype=np.int64)
+        self.neighbourhood = neighbourhood or MOORE
+
+    def boards(self, houses):
+        """
+        Views an array laid out as cells as a stack of boards.
+
+        :param houses: 2 dimensional numpy array, laid out as cells
+        :return: 3 dimensional numpy array, indexed by board, y and x
+        """
+
+        return houses.reshape(self.height, self.width, self.replicates).transpose(2, 0, 1)
+
+    @property
+    def grid(self):
+        return self.boards(self.cells)
+
+    def populate(self, agent_prob, intolerance_threshold):
+        """
+        Populates every board with Agents, as ArrayBoard.populate does with each seed.
+
+        :param agent_prob: list of floats, cumulative probability,
+            with the probability of creation of an Agent of that or previous race (list index)
+        :param intolerance_threshold: list of floats,
+            with the threshold of intolerance for each race (list index)
+        :return: nothing
+        """
+
+        self.randoms = []
+        self.empty_houses = []
+        for replicate, seed in enumerate(self.seeds):
+            board = ArrayBoard(self.width, self.height, self.empty_ratio, seed, self.neighbourhood)
+            board.populate(agent_prob, intolerance_threshold)
+            self.grid[replicate] = board.grid
+            self.boards(self.intolerance)[replicate] = board.intolerance
+            self.randoms.append(board.random)
+            self.empty_houses.append(board.empty_houses)
+        self.similar = board.similar
+
+    def unhappy(self):
+        """
+        Checks the happiness of every Agent of the active boards at once.
+        The converged boards are not checked again, and have no unhappy Agent.
+
+        :return: 3 dimensional numpy array of bool, indexed by board, y and x, True where an unhappy Agent lives
+        """
+
+        unhappy = np.zeros((self.replicates, self.height, self.width), dtype=bool)
+        active = np.flatnonzero(self.active)
+        if len(active):
+            unhappy[active] = happiness.evaluate(self.grid[active], self.boards(self.intolerance)[active],
+                                                 self.similar, self.neighbourhood)[0]
+        return unhappy
+
+    def move_agent(self, replicate, house):
+        """
+        Moves the (unhappy) Agent of a house of a board to an empty house and vacates the Agent's house.
+
+        :param replicate: int, the index of the board
+        :param house: int, the number of the Agent's house (see cells)
+        :return: int, the number of the Agent's new house
+        """
+
+        replicates = self.replicates
+
+        y, x = divmod(house, self.width)
+        empty_x, empty_y = schelling.relocate(self.empty_houses[replicate], self.randoms[replicate], (x, y))
+        empty_house = empty_y * self.width + empty_x
+        origin = house * replicates + replicate
+        destination = empty_house * replicates + replicate
+
+        self._cells[destination] = self._cells[origin]
+        self._cells[origin] = EMPTY
+        self._intolerance[destination] = self._intolerance[origin]
+        self._intolerance[origin] = 0
+        return empty_house
+
+    def sweep(self, unhappy):
+        """
+        Checks the houses in order on the active boards and moves the unhappy Agents found.
+        Only the houses where some board had an unhappy Agent at the start, or where a move
+        changed the neighbourhood, are checked, as on every other board and house the Agent is happy.
+        Each of those houses is checked on every board at once, gathering its neighbours on all of them.
+
+        :param unhappy: 3 dimensional numpy array of bool, indexed by board, y and x,
+            the unhappy Agents of the active boards at the start, see unhappy
+        :return: 1 dimensional numpy array of ints, the number of unhappy Agents moved on each board
+        """
+
+        table = self.neighbourhood.table(self.width, self.height)
+        cells = self.cells
+        # Entry [a][b] is 1 if an Agent of race a ranks one of race b as similar,
+        # EMPTY (-1) indexes the last row and column, where every entry is 0
+        num_races = len(self.similar)
+        likes = np.zeros((num_races + 1, num_races + 1), dtype=np.int8)
+        likes[:num_races, :num_races] = self.similar
+        # The intolerance of the Agents of the converged boards is out of reach
+        threshold = np.where(self.active, self.intolerance, -1.0)
+        thresholds = memoryview(threshold).cast('B').cast('d')
+        self._cells = memoryview(cells).cast('B').cast('b')
+        self._intolerance = memoryview(self.intolerance).cast('B').cast('d')
+        replicates = self.replicates
+        move_agent = self.move_agent
+        moved = [0] * replicates
+
+        pending = bytearray(unhappy.any(axis=0).astype(np.uint8).tobytes())
+        house = pending.find(1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            while house != -1:
+                neighbours = cells[np.asarray(table[house])]
+                # Agents without neighbours divide 0 by 0, empty houses have an intolerance of 0,
+                # and neither is ever less than the intolerance
+                movers = (likes[cells[house], neighbours].sum(axis=0) / (neighbours != EMPTY).sum(axis=0)
+                          < threshold[house])
+                if movers.any():
+                    for replicate in np.flatnonzero(movers).tolist():
+                        empty_house = move_agent(replicate, house)
+                        origin = house * replicates + replicate
+                        thresholds[empty_house * replicates + replicate] = thresholds[origin]
+                        thresholds[origin] = 0
+                        moved[replicate] += 1
+                        pending[house] = 1
+                        pending[empty_house] = 1
+                        for near in table[house].tolist() + table[empty_house].tolist():
+                            pending[near] = 1
+                house = pending.find(1, house + 1)
+        return np.array(moved)
+
+    def run(self, num_iterations):
+        """
+        Runs every board until it converges or runs the allowed iterations.
+        A board converges, and stops being checked, when it has no unhappy Agent at the start
+        of an iteration or moves none during one, as ArrayBoard.run stops.
+
+        :param num_iterations: int, number of iterations to run this function
+        :return: 1 dimensional numpy array of ints, the number of iterations run by each board
+        """
+
+        for _iteration in range(num_iterations):
+            if not self.active.any():
+                break
+            self.iterations[self.active] += 1
+            unhappy = self.unhappy()
+            self.active &= unhappy.any(axis=(1, 2))
+            if self.active.any():
+                self.active &= self.sweep(unhappy) > 0
+
+        return self.iterations
+
+    def board(self, replicate):
+        """
+        Takes one replicate as an ArrayBoard, sharing nothing with the batch.
+
+        :param replicate: int, the index of the board
+        :return: ArrayBoard
+        """
+
+        board = ArrayBoard(self.width, self.height, self.empty_ratio, self.seeds[replicate], self.neighbourhood)
+        board.restore(self.grid[replicate].copy(), self.boards(self.intolerance)[replicate].copy(),
+                      np.array(self.empty_houses[replicate].houses))
+        board.random = self.randoms[replicate]
+        board.iteration = int(self.iterations[replicate])
+        return board
+
+    def calculate_happiness(self):
+        """
+        Computes the fraction of happy Agents on each board.
+
+        :return: list of floats, rounded to two decimal places
+        """
+
+        return [happiness.calculate_happiness(self.grid[replicate], self.boards(self.intolerance)[replicate],
+                                              self.similar, self.neighbourhood)
+                for replicate in range(self.replicates)]
+
+    def calculate_segregation_happiness(self):
+        """
+        Computes the segregation and happiness percentages of each board.
+
+        :return: list of tuples of floats, segregation and happiness rounded to two decimal places
+        """
+
+        return [happiness.calculate_segregation_happiness(self.grid[replicate],
+                                                          self.boards(self.intolerance)[replicate], self.similar,
+                                                          self.neighbourhood)
+                for replicate in range(self.replicates)]
@@ -6,20 +6,26 @@ Description: Simulations of Schelling's seggregation model
 http://www.binpress.com/tutorial/introduction-to-agentbased-models-an-implementation-of-schelling-model-in-python/144
 '''
 
-import matplotlib.pyplot as plt
 import itertools
-import random
-import copy
+
+import randomness
+
+#offsets of the 8 neighbours of a house
+NEIGHBOURS = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx != 0 or dy != 0]
 
 class Schelling:
-    def __init__(self, width, height, empty_ratio, similarity_threshold, n_iterations, races = 2):
-        self.width = width 
-        self.height = height 
+    def __init__(self, width, height, empty_ratio, similarity_threshold, n_iterations, races = 2, seed = None, neighbourhood = None):
+        self.width = width
+        self.height = height
         self.races = races
         self.empty_ratio = empty_ratio
         self.similarity_threshold = similarity_threshold
         self.n_iterations = n_iterations
-        
+        self.random = randomness.RandomStream(seed)
+        #a neighbourhood.Neighbourhood, the 8 neighbours of a house on a bounded board if None
+        self.neighbours = NEIGHBOURS if neighbourhood is None else neighbourhood.offsets
+        self.torus = neighbourhood is not None and neighbourhood.torus
+
 
 
     def populate(self):
@@ -27,7 +33,7 @@ class Schelling:
         self.agents = {}
 
         self.all_houses = list(itertools.product(range(self.width),range(self.height)))
-        random.shuffle(self.all_houses)
+        self.random.shuffle(self.all_houses)
 
         self.n_empty = int( self.empty_ratio * len(self.all_houses) )
         self.empty_houses = self.all_houses[:self.n_empty]
@@ -36,94 +42,70 @@ class Schelling:
         houses_by_race = [self.remaining_houses[i::self.races] for i in range(self.races)]
         for i in range(self.races):
             #create agents for each race
-            self.agents = dict(
-                                self.agents.items() + 
-                                dict(zip(houses_by_race[i], [i+1]*len(houses_by_race[i]))).items()
-                            )
-
-    def is_unsatisfied(self, x, y):
+            self.agents.update(zip(houses_by_race[i], [i+1]*len(houses_by_race[i])))
 
+    def count_neighbours(self, x, y):
+        #the agents dict is the occupancy of the board: empty houses and houses off the board have no agent
         race = self.agents[(x,y)]
         count_similar = 0
         count_different = 0
-
-        if x > 0 and y > 0 and (x-1, y-1) not in self.empty_houses:
-            if self.agents[(x-1, y-1)] == race:
-                count_similar += 1
-            else:
-                count_different += 1
-        if y > 0 and (x,y-1) not in self.empty_houses:
-            if self.agents[(x,y-1)] == race:
-                count_similar += 1
-            else:
-                count_different += 1
-        if x < (self.width-1) and y > 0 and (x+1,y-1) not in self.empty_houses:
-            if self.agents[(x+1,y-1)] == race:
-                count_similar += 1
-            else:
-                count_different += 1
-        if x > 0 and (x-1,y) not in self.empty_houses:
-            if self.agents[(x-1,y)] == race:
-                count_similar += 1
-            else:
-                count_different += 1        
-        if x < (self.width-1) and (x+1,y) not in self.empty_houses:
-            if self.agents[(x+1,y)] == race:
-                count_similar += 1
-            else:
-                count_different += 1
-        if x > 0 and y < (self.height-1) and (x-1,y+1) not in self.empty_houses:
-            if self.agents[(x-1,y+1)] == race:
-                count_similar += 1
-            else:
-                count_different += 1        
-        if x > 0 and y < (self.height-1) and (x,y+1) not in self.empty_houses:
-            if self.agents[(x,y+1)] == race:
-                count_similar += 1
-            else:
-                count_different += 1        
-        if x < (self.width-1) and y < (self.height-1) and (x+1,y+1) not in self.empty_houses:
-            if self.agents[(x+1,y+1)] == race:
+        for dx, dy in self.neighbours:
+            near_x, near_y = x+dx, y+dy
+            if self.torus:
+                near_x, near_y = near_x % self.width, near_y % self.height
+            neighbour = self.agents.get((near_x, near_y))
+            if neighbour is None:
+                continue
+            if neighbour == race:
                 count_similar += 1
             else:
                 count_different += 1
+        return count_similar, count_different
 
+    def is_unsatisfied(self, x, y):
+        count_similar, count_different = self.count_neighbours(x, y)
         if (count_similar+count_different) == 0:
             return False
         else:
             return float(count_similar)/(count_similar+count_different) < self.similarity_threshold
- 
+
     def update(self):
+        #returns the number of iterations run
+        i = -1
         for i in range(self.n_iterations):
-            self.old_agents = copy.deepcopy(self.agents)
+            #the houses of the agents at the start of the iteration, each agent is checked once
+            old_houses = list(self.agents)
             n_changes = 0
-            for agent in self.old_agents:
+            for agent in old_houses:
                 if self.is_unsatisfied(agent[0], agent[1]):
-                    agent_race = self.agents[agent]
-                    empty_house = random.choice(self.empty_houses)
-                    self.agents[empty_house] = agent_race
-                    del self.agents[agent]
-                    self.empty_houses.remove(empty_house)
-                    self.empty_houses.append(agent)
+                    self.move_to_empty(agent[0], agent[1])
                     n_changes += 1
-            #print 'Iteration: %d , Number of changes: %d' %(i+1, n_changes)
+            #print('Iteration: %d , Number of changes: %d' %(i+1, n_changes))
             if n_changes == 0:
                 break
+        return i + 1
 
     def move_to_empty(self, x, y):
-        race = self.agents[(x,y)]
-        empty_house = random.choice(self.empty_houses)
-        self.updated_agents[empty_house] = race
-        del self.updated_agents[(x, y)]
-        self.empty_houses.remove(empty_house)
-        self.empty_houses.append((x, y))
+        race = self.agents.pop((x, y))
+        #the vacated house takes the place of the empty house picked in the list
+        pick = self.random.index(len(self.empty_houses))
+        empty_house = self.empty_houses[pick]
+        self.empty_houses[pick] = (x, y)
+        self.agents[empty_house] = race
 
     def plot(self, title, file_name):
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots()
         #If you want to run the simulation with more than 7 colors, you should set agent_colors accordingly
         agent_colors = {1:'b', 2:'r', 3:'g', 4:'c', 5:'m', 6:'y', 7:'k'}
-        for agent in self.agents:
-            ax.scatter(agent[0]+0.5, agent[1]+0.5, color=agent_colors[self.agents[agent]])
+        houses_by_race = {}
+        for agent, race in self.agents.items():
+            houses_by_race.setdefault(race, []).append(agent)
+        #one scatter per race, not per agent
+        for race, houses in houses_by_race.items():
+            xs, ys = zip(*houses)
+            ax.scatter([x+0.5 for x in xs], [y+0.5 for y in ys], color=agent_colors[race])
 
         ax.set_title(title, fontsize=10, fontweight='bold')
         ax.set_xlim([0, self.width])
@@ -131,102 +113,61 @@ class Schelling:
         ax.set_xticks([])
         ax.set_yticks([])
         plt.savefig(file_name)
+        plt.close(fig)
 
 
     def calculate_similarity(self):
         similarity = []
         for agent in self.agents:
-            count_similar = 0
-            count_different = 0
-            x = agent[0]
-            y = agent[1]
-            race = self.agents[(x,y)]
-            if x > 0 and y > 0 and (x-1, y-1) not in self.empty_houses:
-                if self.agents[(x-1, y-1)] == race:
-                    count_similar += 1
-                else:
-                    count_different += 1
-            if y > 0 and (x,y-1) not in self.empty_houses:
-                if self.agents[(x,y-1)] == race:
-                    count_similar += 1
-                else:
-                    count_different += 1
-            if x < (self.width-1) and y > 0 and (x+1,y-1) not in self.empty_houses:
-                if self.agents[(x+1,y-1)] == race:
-                    count_similar += 1
-                else:
-                    count_different += 1
-            if x > 0 and (x-1,y) not in self.empty_houses:
-                if self.agents[(x-1,y)] == race:
-                    count_similar += 1
-                else:
-                    count_different += 1        
-            if x < (self.width-1) and (x+1,y) not in self.empty_houses:
-                if self.agents[(x+1,y)] == race:
-                    count_similar += 1
-                else:
-                    count_different += 1
-            if x > 0 and y < (self.height-1) and (x-1,y+1) not in self.empty_houses:
-                if self.agents[(x-1,y+1)] == race:
-                    count_similar += 1
-                else:
-                    count_different += 1        
-            if x > 0 and y < (self.height-1) and (x,y+1) not in self.empty_houses:
-                if self.agents[(x,y+1)] == race:
-                    count_similar += 1
-                else:
-                    count_different += 1        
-            if x < (self.width-1) and y < (self.height-1) and (x+1,y+1) not in self.empty_houses:
-                if self.agents[(x+1,y+1)] == race:
-                    count_similar += 1
-                else:
-                    count_different += 1
-            try:
-                similarity.append(float(count_similar)/(count_similar+count_different))
-            except:
+            count_similar, count_different = self.count_neighbours(agent[0], agent[1])
+            if (count_similar+count_different) == 0:
                 similarity.append(1)
+            else:
+                similarity.append(float(count_similar)/(count_similar+count_different))
         return sum(similarity)/len(similarity)
 
 def main():
+    import matplotlib.pyplot as plt
+
+    ##First Simulation
+    schelling_1 = Schelling(50, 50, 0.3, 0.3, 500, 2)
+    schelling_1.populate()
 
-	##First Simulation
-	schelling_1 = Schelling(50, 50, 0.3, 0.3, 500, 2)
-	schelling_1.populate()
+    schelling_2 = Schelling(50, 50, 0.3, 0.5, 500, 2)
+    schelling_2.populate()
 
-	schelling_2 = Schelling(50, 50, 0.3, 0.5, 500, 2)
-	schelling_2.populate()
+    schelling_3 = Schelling(50, 50, 0.3, 0.8, 500, 2)
+    schelling_3.populate()
 
-	schelling_3 = Schelling(50, 50, 0.3, 0.8, 500, 2)
-	schelling_3.populate()
+    schelling_1.plot('Schelling Model with 2 colors: Initial State', 'schelling_2_initial.png')
 
-	schelling_1.plot('Schelling Model with 2 colors: Initial State', 'schelling_2_initial.png')
+    schelling_1.update()
+    schelling_2.update()
+    schelling_3.update()
 
-	schelling_1.update()
-	schelling_2.update()
-	schelling_3.update()
+    schelling_1.plot('Schelling Model with 2 colors: Final State with Happiness Threshold 30%', 'schelling_2_30_final.png')
+    schelling_2.plot('Schelling Model with 2 colors: Final State with Happiness Threshold 50%', 'schelling_2_50_final.png')
+    schelling_3.plot('Schelling Model with 2 colors: Final State with Happiness Threshold 80%', 'schelling_2_80_final.png')
 
-	schelling_1.plot('Schelling Model with 2 colors: Final State with Happiness Threshold 30%', 'schelling_2_30_final.png')
-	schelling_2.plot('Schelling Model with 2 colors: Final State with Happiness Threshold 50%', 'schelling_2_50_final.png')
-	schelling_3.plot('Schelling Model with 2 colors: Final State with Happiness Threshold 80%', 'schelling_2_80_final.png')
 
+    ##Second Simulation Measuring Seggregation
+    similarity_threshold_ratio = {}
+    for i in [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7]:
+        schelling = Schelling(50, 50, 0.3, i, 500, 2)
+        schelling.populate()
+        schelling.update()
+        similarity_threshold_ratio[i] = schelling.calculate_similarity()
 
-	##Second Simulation Measuring Seggregation
-	similarity_threshold_ratio = {}
-	for i in [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7]:
-		schelling = Schelling(50, 50, 0.3, i, 500, 2)
-		schelling.populate()
-		schelling.update()
-		similarity_threshold_ratio[i] = schelling.calculate_similarity()
+    fig, ax = plt.subplots()
+    plt.plot(list(similarity_threshold_ratio.keys()), list(similarity_threshold_ratio.values()), 'ro')
+    ax.set_title('Similarity Threshold vs. Mean Similarity Ratio', fontsize=15, fontweight='bold')
+    ax.set_xlim([0, 1])
+    ax.set_ylim([0, 1.1])
+    ax.set_xlabel("Similarity Threshold")
+    ax.set_ylabel("Mean Similarity Ratio")
+    plt.savefig('schelling_segregation.png')
+    plt.close(fig)
 
-	fig, ax = plt.subplots()
-	plt.plot(similarity_threshold_ratio.keys(), similarity_threshold_ratio.values(), 'ro')
-	ax.set_title('Similarity Threshold vs. Mean Similarity Ratio', fontsize=15, fontweight='bold')
-	ax.set_xlim([0, 1])
-	ax.set_ylim([0, 1.1])
-	ax.set_xlabel("Similarity Threshold")
-	ax.set_ylabel("Mean Similarity Ratio")
-	plt.savefig('schelling_segregation.png')
- 
 
 if __name__ == "__main__":
     main()
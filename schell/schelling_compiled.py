@@ -0,0 +1,206 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+An ArrayBoard of the Schelling's segregation model whose sequential sweep is compiled with numba.
+
+The sweep checks the houses in raster order and moves every unhappy Agent it finds right away,
+so each Agent sees the moves made before it in the same sweep, which no vectorised evaluation
+can reproduce. sweep_houses does exactly that over the flat arrays of an ArrayBoard: the races,
+intolerances and neighbour counts and the empty houses, as flat indices, finding the neighbours
+of the houses from the offsets of the neighbourhood, so no neighbour table is needed.
+
+The random numbers still come from the board's RandomStream: the kernel takes the empty houses
+from its batch of indices and hands the sweep back to Python when the batch is used up, to draw
+the next one, so the moves are exactly those of schelling.Board and ArrayBoard with the same seed.
+
+numba is optional. Without it (JIT is False) the board sweeps with ArrayBoard's pure Python code,
+as it does when the run is traced or the Agents move by another relocation policy than random.
+"""
+
+# Python Packages
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Project Modules
+from happiness import EMPTY
+from schelling_array import ArrayBoard
+
+
+# numba is installed, so sweep_houses is compiled
+JIT = numba is not None
+
+
+def jit(function):
+    """
+    Compiles a function to machine code with numba, if it is installed.
+
+    :param function: function, using only what numba's nopython mode supports
+    :return: function, the compiled function, or the same one without numba
+    """
+
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+@jit
+def shift_counts(counts, offset, house, delta, offsets_x, offsets_y, width, height, torus):
+    """
+    Adds to a plane of counts of every neighbour of a house.
+
+    :param counts: 1 dimensional numpy array of ints, the neighbour counts of the board, plane after plane
+    :param offset: int, the offset of the plane of counts
+    :param house: int, the index of the house (y * width + x)
+    :param delta: int, 1 if an Agent moved into the house, -1 if it moved away
+    :param offsets_x, offsets_y: 1 dimensional numpy arrays of int64, the offsets of the neighbourhood
+    :param width, height: int, the board's size
+    :param torus: Boolean, the board wraps around its edges
+    :return: nothing
+    """
+
+    y, x = divmod(house, width)
+    for index in range(len(offsets_x)):
+        near_x, near_y = x + offsets_x[index], y + offsets_y[index]
+        if torus:
+            near_x, near_y = near_x % width, near_y % height
+        elif near_x < 0 or near_x >= width or near_y < 0 or near_y >= height:
+            continue
+        counts[offset + near_y * width + near_x] += delta
+
+
+@jit
+def sweep_houses(cells, tolerance, counts, plane, occupied, plane_starts, plane_offsets, offsets_x, offsets_y,
+                 width, height, torus, empty_houses, slots, batch, position, first):
+    """
+    Checks the houses from first on in order and moves the unhappy Agents found,
+    as ArrayBoard.sweep does, until the last house or until the batch of random indices is used up.
+
+    :param cells: 1 dimensional numpy array of int8, the race of the Agent living in each house
+    :param tolerance: 1 dimensional numpy array of float64, the intolerance of the Agent living in each house
+    :param counts: 1 dimensional numpy array of ints, the neighbour counts of the board, plane after plane
+    :param plane: int, the number of houses, the size of a plane of counts
+    :param occupied: int, the offset of the plane of counts of occupied neighbours
+    :param plane_starts, plane_offsets: 1 dimensional numpy arrays of int64, where the offsets of the planes
+        of counts that change when an Agent of race r moves are plane_offsets[plane_starts[r]:plane_starts[r + 1]]
+    :param offsets_x, offsets_y: 1 dimensional numpy arrays of int64, the offsets of the neighbourhood
+    :param width, height: int, the board's size
+    :param torus: Boolean, the board wraps around its edges
+    :param empty_houses: 1 dimensional numpy array of int64, the indices of the empty houses, in their order
+    :param slots: 1 dimensional numpy array of int32, the position in empty_houses of each house, -1 if occupied
+    :param batch: 1 dimensional numpy array of int64, random indices below the number of empty houses
+    :param position: int, the position in batch of the next index
+    :param first: int, the index of the house to check first
+    :return: tuple of ints, the index of the house where the sweep stopped (the number of houses
+        if it reached the end), the position of the next index in batch and the number of Agents moved
+    """
+
+    unhappy = 0
+    for house in range(first, plane):
+        race = int(cells[house])
+        if race == EMPTY:
+            continue
+        total = counts[occupied + house]
+        if total == 0 or counts[race * plane + house] / total >= tolerance[house]:
+            continue
+        if position == len(batch):
+            return house, position, unhappy
+
+        # The vacated house takes the slot of the empty house picked, see schelling.relocate
+        slot = batch[position]
+        position += 1
+        empty_house = empty_houses[slot]
+        empty_houses[slot] = house
+        slots[empty_house] = -1
+        slots[house] = slot
+        cells[empty_house] = race
+        tolerance[empty_house] = tolerance[house]
+        cells[house] = EMPTY
+        tolerance[house] = 0
+        for offset in plane_offsets[plane_starts[race]:plane_starts[race + 1]]:
+            shift_counts(counts, offset, house, -1, offsets_x, offsets_y, width, height, torus)
+            shift_counts(counts, offset, empty_house, 1, offsets_x, offsets_y, width, height, torus)
+        unhappy += 1
+    return plane, position, unhappy
+
+
+class CompiledBoard(ArrayBoard):
+    """
+    Class CompiledBoard has the attributes of ArrayBoard and 4 more:
+        plane_starts: 1 dimensional numpy array of int64, where the offsets of the planes
+            of race r are plane_offsets[plane_starts[r]:plane_starts[r + 1]]
+        plane_offsets: 1 dimensional numpy array of int64, the planes of ArrayBoard, one race after another
+        offsets_x, offsets_y: 1 dimensional numpy arrays of int64, the offsets of the neighbourhood
+    """
+
+    def __init__(self, width, height, empty_ratio, seed=None, neighbourhood=None, relocation='random', candidates=8):
+        super().__init__(width, height, empty_ratio, seed, neighbourhood, relocation, candidates)
+        self.plane_starts = np.zeros(1, dtype=np.int64)
+        self.plane_offsets = np.zeros(0, dtype=np.int64)
+        offsets = np.array(self.neighbourhood.offsets, dtype=np.int64).reshape(-1, 2)
+        self.offsets_x, self.offsets_y = offsets[:, 0].copy(), offsets[:, 1].copy()
+
+    def count_neighbours(self):
+        """
+        Recomputes the neighbour counts of every house from the grid, see ArrayBoard.count_neighbours,
+        and the planes that change with each race as arrays for sweep_houses.
+
+        :return: nothing
+        """
+
+        super().count_neighbours()
+        self.plane_starts = np.cumsum([0] + [len(planes) for planes in self.planes], dtype=np.int64)
+        self.plane_offsets = np.array([offset for planes in self.planes for offset in planes], dtype=np.int64)
+
+    def sweep(self, trace=None):
+        """
+        Checks every house in order and moves the unhappy Agents found, with sweep_houses.
+
+        :param trace: profiling.RunTrace, to time is_happy and move_agent, or None.
+            A traced sweep is ArrayBoard's, which times every call
+        :return: int, the number of unhappy Agents moved
+        """
+
+        if not JIT or trace is not None or self.relocation != 'random':
+            return super().sweep(trace)
+
+        width = self.width
+        random = self.random
+        # The empty houses in their order, from the slot of every empty house
+        slots = self.empty_houses.slots
+        empty = np.flatnonzero(slots >= 0)
+        houses = np.empty(len(empty), dtype=np.int64)
+        houses[slots[empty]] = empty
+        before = houses.copy()
+        high = len(houses)
+        cells, tolerance = np.asarray(self._cells), np.asarray(self._tolerance)
+
+        unhappy = 0
+        house = 0
+        while house < self.grid.size:
+            # A batch drawn for another number of empty houses is not used, as in RandomStream.index
+            current = random.batch_high == high
+            batch = np.array(random.batch if current else [], dtype=np.int64)
+            house, position, moved = sweep_houses(cells, tolerance, self._flat_counts, self.grid.size,
+                                                  self.planes[0][-1], self.plane_starts, self.plane_offsets,
+                                                  self.offsets_x, self.offsets_y, width, self.height,
+                                                  self.neighbourhood.torus, houses, slots,
+                                                  batch, random.position if current else 0, house)
+            unhappy += moved
+            if current:
+                random.position = position
+            if house < self.grid.size:
+                random.refill(high)
+
+        # Only the slots of the empty houses picked changed
+        changed = np.flatnonzero(houses != before)
+        ys, xs = np.divmod(houses[changed], width)
+        for slot, x, y in zip(changed.tolist(), xs.tolist(), ys.tolist()):
+            self.empty_houses.houses[slot] = (x, y)
+        return unhappy
@@ -0,0 +1,209 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+An event-driven ArrayBoard of the Schelling's segregation model.
+
+Instead of sweeping the board in raster order, the board keeps a queue of the Agents that are
+unhappy right now, and moves one of them at random, drawn from its RandomStream (index_below,
+as the length of the queue changes with every move), until none is left.
+A move can only change the happiness of the Agents around the two houses it involves, so only
+those are checked again, joining or leaving the queue. The work done is proportional to the moves
+made and the size of the neighbourhood, whatever the size of the board, and no Agent is moved twice
+because the raster order reached it again. In big neighbourhoods the Agents around a move are checked
+with numpy operations, and only those joining or leaving the queue take Python work.
+
+The run is counted in moves and in iteration-equivalents: an iteration-equivalent is as many moves
+as there were unhappy Agents when it started, about the moves of an iteration of the raster sweep.
+Between iteration-equivalents the queue is in raster order, so a board loaded from a checkpoint,
+which rebuilds the queue from the board, goes on exactly as the saved one would have.
+"""
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+import profiling
+from happiness import EMPTY
+from schelling_array import VECTOR_NEIGHBOURS, ArrayBoard
+
+
+class QueueBoard(ArrayBoard):
+    """
+    Class QueueBoard has the attributes of ArrayBoard and 4 more:
+        queue: list of ints, the indices (y * width + x) of the houses of the unhappy Agents
+        slots: dict, from the index of a house in the queue to its position in queue
+        queued: 1 dimensional numpy array of bool, the houses in the queue, to check many at once
+        moves: int, the number of moves made so far, across runs
+    """
+
+    def __init__(self, width, height, empty_ratio, seed=None, neighbourhood=None, relocation='random', candidates=8):
+        super().__init__(width, height, empty_ratio, seed, neighbourhood, relocation, candidates)
+        self.queue = []
+        self.slots = {}
+        self.queued = np.zeros(width * height, dtype=bool)
+        self._queued = memoryview(self.queued).cast('B')
+        self.moves = 0
+
+    def fill_queue(self):
+        """
+        Queues every unhappy Agent, in raster order.
+
+        :return: nothing
+        """
+
+        self.queue = np.flatnonzero(self.unhappy()).tolist()
+        self.slots = {house: slot for slot, house in enumerate(self.queue)}
+        self.queued[:] = False
+        self.queued[self.queue] = True
+
+    def is_unhappy(self, house):
+        """
+        Checks if an unhappy Agent lives in a house, from the neighbour counts.
+
+        :param house: int, the index of the house (y * width + x)
+        :return: Boolean, False if the house is empty
+        """
+
+        race = self._cells[house]
+        if race == EMPTY:
+            return False
+        total = self._counts[self.planes[0][-1] + house]
+        return bool(total) and self._counts[race * self.grid.size + house] / total < self._tolerance[house]
+
+    def around(self, house, empty_house):
+        """
+        Lists the houses whose Agents a move can make happy or unhappy: the two houses and their neighbours.
+
+        :param house, empty_house: int, the indices of the house left and of the house taken
+        :return: list of ints, or 1 dimensional numpy array of ints in big neighbourhoods, see changed_houses
+        """
+
+        table = self.table
+        if self.neighbourhood.size >= VECTOR_NEIGHBOURS:
+            return np.concatenate(([house], table[house], [empty_house], table[empty_house]))
+        return [house] + table[house].tolist() + [empty_house] + table[empty_house].tolist()
+
+    def changed_houses(self, houses):
+        """
+        Checks the Agents of many houses at once, with numpy operations.
+
+        :param houses: list or 1 dimensional numpy array of ints, the indices of the houses
+        :return: list of ints, the houses, each once and in the order of their first appearance,
+            whose Agent is unhappy but not queued, or queued but not unhappy
+        """
+
+        houses = np.asarray(houses)
+        _unique, first = np.unique(houses, return_index=True)
+        houses = houses[np.sort(first)]
+        races = self.grid.reshape(-1)[houses]
+        totals = self._flat_counts[self.planes[0][-1] + houses]
+        liked = self._flat_counts[np.where(races == EMPTY, 0, races).astype(np.intp) * self.grid.size + houses]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            unhappy = (races != EMPTY) & (totals > 0) & (liked / totals < self.intolerance.reshape(-1)[houses])
+        return houses[unhappy != self.queued[houses]].tolist()
+
+    def requeue(self, houses, is_unhappy=None):
+        """
+        Checks the Agents of some houses again, queueing the unhappy ones and taking the happy ones off.
+        A house leaves the queue by taking the place of the last house queued.
+        In big neighbourhoods the houses that neither join nor leave the queue are left out first,
+        see changed_houses, unless the checks are timed.
+
+        :param houses: list or 1 dimensional numpy array of ints, the indices of the houses
+        :param is_unhappy: function, a timed version of is_unhappy, or None to check the counts inline
+        :return: nothing
+        """
+
+        if is_unhappy is None and self.neighbourhood.size >= VECTOR_NEIGHBOURS:
+            houses = self.changed_houses(houses)
+        elif isinstance(houses, np.ndarray):
+            houses = houses.tolist()
+        queue, slots, queued = self.queue, self.slots, self._queued
+        cells, tolerance, counts = self._cells, self._tolerance, self._counts
+        occupied = self.planes[0][-1]
+        liked = self.grid.size
+        for house in houses:
+            if is_unhappy is None:
+                race = cells[house]
+                total = race != EMPTY and counts[occupied + house]
+                unhappy = bool(total) and counts[race * liked + house] / total < tolerance[house]
+            else:
+                unhappy = is_unhappy(house)
+            if unhappy:
+                if house not in slots:
+                    slots[house] = len(queue)
+                    queue.append(house)
+                    queued[house] = 1
+            elif house in slots:
+                slot = slots.pop(house)
+                queued[house] = 0
+                last = queue.pop()
+                if last != house:
+                    queue[slot] = last
+                    slots[last] = slot
+
+    def run(self, num_iterations, incremental=False, trace=None, frames=None, checkpoints=None, synchronous=False):
+        """
+        Moves the unhappy Agents one at a time, picked at random from the queue,
+        until every Agent is happy or after running the allowed iteration-equivalents.
+
+        :param num_iterations: int, number of iteration-equivalents to run this function
+        :param incremental: Boolean, ignored, only the Agents whose neighbourhood changed are ever checked
+        :param trace: profiling.RunTrace, to record the counters and timings of every iteration-equivalent,
+            or None to run without recording anything
+        :param frames: frames.FrameWriter, to record the board's state every few iteration-equivalents, or None
+        :param checkpoints: checkpoint.Checkpointer, to save the board every few iteration-equivalents, or None
+        :param synchronous: Boolean, move every unhappy Agent of an iteration together instead,
+            as ArrayBoard.run does
+        :return: int, the number of iteration-equivalents run
+        """
+
+        if synchronous:
+            return super().run(num_iterations, incremental, trace, frames, checkpoints, synchronous)
+
+        is_unhappy, move_agent = None, self.move_agent
+        if trace is not None:
+            is_unhappy = trace.timed('is_happy', self.is_unhappy)
+            move_agent = trace.timed('move_agent', move_agent)
+        width = self.width
+
+        with profiling.instrument(trace, self, 'pick_house', 'empty_house_pick'), \
+                profiling.instrument(trace, self, 'update_neighbours', 'neighbours'):
+            if frames is not None:
+                frames.record(self, self.iteration)
+            self.fill_queue()
+            total_iterations = 0
+            for _iteration in range(num_iterations):
+                total_iterations += 1
+                self.iteration += 1
+                if trace is not None:
+                    trace.begin_iteration()
+                unhappy = len(self.queue)
+                for _move in range(unhappy):
+                    if not self.queue:
+                        break
+                    house = self.queue[self.random.index_below(len(self.queue))]
+                    y, x = divmod(house, width)
+                    empty_x, empty_y = move_agent(x, y)
+                    empty_house = empty_y * width + empty_x
+                    self.moves += 1
+                    self.requeue(self.around(house, empty_house), is_unhappy)
+                self.queue.sort()
+                self.slots = {house: slot for slot, house in enumerate(self.queue)}
+                if trace is not None:
+                    trace.end_iteration(unhappy)
+                if frames is not None:
+                    frames.record(self, self.iteration, final=not self.queue)
+                if checkpoints is not None:
+                    checkpoints.record(self, final=not self.queue)
+                if not self.queue:
+                    break
+
+            if frames is not None:
+                frames.record(self, self.iteration, final=True)
+            if checkpoints is not None:
+                checkpoints.record(self, final=True)
+            return total_iterations
@@ -0,0 +1,384 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Parameter sweeps of the Schelling's segregation model.
+
+Every combination of board size, empty ratio, agent probabilities and intolerance
+is run for a number of replicates, spread over a pool of processes
+(optionally running the replicates of each combination together as a batch, see schelling_batch),
+and the segregation, happiness and iterations of every run are collected in one table.
+Every run has the same neighbourhood, update mode and relocation policy, those of the main arguments.
+"""
+
+# Python Modules
+import concurrent.futures
+import csv
+import itertools
+import os
+import statistics
+import time
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+import schelling
+from neighbourhood import MOORE, Neighbourhood
+from schelling_batch import BatchBoard
+
+
+FIELDS = ['engine', 'width', 'height', 'empty_ratio', 'agent_prob', 'intolerance', 'replicate', 'seed',
+          'iterations', 'initial_segregation', 'initial_happiness', 'segregation', 'happiness', 'run_time']
+
+
+def configurations(sizes, empty_ratios, agent_probs, intolerances, replicates,
+                   engine='array', num_iterations=500, incremental=False, seed=None,
+                   neighbourhood=None, synchronous=False, relocation='random', candidates=8):
+    """
+    Generates the configuration of every run of a sweep.
+
+    :param sizes: list of ints, the boards' width and height
+    :param empty_ratios: list of floats, the boards' percentage of empty houses
+    :param agent_probs: list of lists of floats, the cumulative probabilities of each race
+    :param intolerances: list of floats, the intolerance threshold shared by every race
+    :param replicates: int, the number of runs of each combination
+    :param engine: string, the board's implementation (see schelling.board_class)
+    :param num_iterations: int, the maximum number of iterations of each run
+    :param incremental: Boolean, only check the agents whose neighbourhood changed
+    :param seed: int, the seed from which the seed of every run is derived
+    :param neighbourhood: neighbourhood.Neighbourhood, the neighbours of every house, MOORE if None
+    :param synchronous: Boolean, move every unhappy agent of an iteration together
+    :param relocation: string, one of vacancies.POLICIES, where the unhappy agents move to
+    :param candidates: int, the number of empty houses drawn by the best_of_k relocation
+    :return: list of dicts, one per run
+    """
+
+    combinations = list(itertools.product(sizes, empty_ratios, agent_probs, intolerances, range(replicates)))
+    seeds = np.random.SeedSequence(seed).generate_state(len(combinations)).tolist()
+    return [{'engine': engine, 'width': size, 'height': size, 'empty_ratio': empty_ratio,
+             'agent_prob': agent_prob, 'intolerance': intolerance, 'replicate': replicate,
+             'seed': run_seed, 'num_iterations': num_iterations, 'incremental': incremental,
+             'neighbourhood': (neighbourhood or MOORE).describe(), 'synchronous': synchronous,
+             'relocation': relocation, 'candidates': candidates}
+            for (size, empty_ratio, agent_prob, intolerance, replicate), run_seed in zip(combinations, seeds)]
+
+
+def result(configuration, iterations, initial, final, run_time):
+    """
+    Builds the row of the results table of a run.
+
+    :param configuration: dict, as generated by configurations
+    :param iterations: int, the number of iterations run
+    :param initial: tuple of floats, the segregation and happiness before the run
+    :param final: tuple of floats, the segregation and happiness after the run
+    :param run_time: float, the seconds taken by the run
+    :return: dict, a row of the results table with the fields in FIELDS
+    """
+
+    row = {field: configuration[field] for field in FIELDS if field in configuration}
+    row.update(agent_prob=' '.join('{:g}'.format(prob) for prob in configuration['agent_prob']),
+               iterations=int(iterations), initial_segregation=initial[0], initial_happiness=initial[1],
+               segregation=final[0], happiness=final[1], run_time=round(run_time, 6))
+    return row
+
+
+def run_configuration(configuration):
+    """
+    Runs a board with the given configuration.
+
+    :param configuration: dict, as generated by configurations
+    :return: dict, a row of the results table with the fields in FIELDS
+    """
+
+    relocation = {}
+    if configuration['relocation'] != 'random':
+        relocation = {'relocation': configuration['relocation'], 'candidates': configuration['candidates']}
+    board_class = schelling.board_class(configuration['engine'])
+    board = board_class(configuration['width'], configuration['height'], configuration['empty_ratio'],
+                        configuration['seed'], Neighbourhood(**configuration['neighbourhood']), **relocation)
+    agent_prob = configuration['agent_prob']
+    board.populate(agent_prob, [configuration['intolerance']] * len(agent_prob))
+    initial = board.calculate_segregation_happiness()
+
+    run_start = time.perf_counter()
+    iterations = board.run(configuration['num_iterations'], configuration['incremental'],
+                           synchronous=configuration['synchronous'])
+    run_time = time.perf_counter() - run_start
+
+    return result(configuration, iterations, initial, board.calculate_segregation_happiness(), run_time)
+
+
+def run_batch(configurations_list):
+    """
+    Runs the replicates of a combination together as a BatchBoard.
+    Every replicate ends exactly as run_configuration would leave it on the array engine,
+    and the time of the batch is split evenly among them. A BatchBoard only runs
+    sequential updates with random relocation, see batch_error.
+
+    :param configurations_list: list of dicts, as generated by configurations,
+        that only differ in the replicate and seed
+    :return: list of dicts, the rows of the results table with the fields in FIELDS
+    """
+
+    configuration = configurations_list[0]
+    batch = BatchBoard(len(configurations_list), configuration['width'], configuration['height'],
+                       configuration['empty_ratio'], [replicate['seed'] for replicate in configurations_list],
+                       Neighbourhood(**configuration['neighbourhood']))
+    agent_prob = configuration['agent_prob']
+    batch.populate(agent_prob, [configuration['intolerance']] * len(agent_prob))
+    initial = batch.calculate_segregation_happiness()
+
+    run_start = time.perf_counter()
+    iterations = batch.run(configuration['num_iterations'])
+    run_time = (time.perf_counter() - run_start) / len(configurations_list)
+
+    return [result(replicate, replicate_iterations, replicate_initial, replicate_final, run_time)
+            for replicate, replicate_iterations, replicate_initial, replicate_final
+            in zip(configurations_list, iterations, initial, batch.calculate_segregation_happiness())]
+
+
+def batch_error(configuration):
+    """
+    Finds why the replicates of a configuration can't run as a batch, see run_batch.
+
+    :param configuration: dict, as generated by configurations
+    :return: string, the reason, or None if they can
+    """
+
+    if configuration['engine'] != 'batch':
+        return 'a batch runs on its own engine, not {}'.format(configuration['engine'])
+    if configuration['incremental']:
+        return 'a batch checks every house an agent may be unhappy in, it has no incremental mode'
+    if configuration['synchronous']:
+        return 'a batch only runs sequential updates'
+    if configuration['relocation'] != 'random':
+        return 'a batch only moves the agents to random empty houses, not by the {} relocation'.format(
+            configuration['relocation'])
+    return None
+
+
+def combination(configuration):
+    """
+    Identifies the combination of parameters of a configuration, that its replicates share.
+
+    :param configuration: dict, as generated by configurations
+    :return: tuple
+    """
+
+    return (configuration['width'], configuration['height'], configuration['empty_ratio'],
+            tuple(configuration['agent_prob']), configuration['intolerance'], configuration['num_iterations'])
+
+
+def sweep(configurations_list, processes=None, batch=False):
+    """
+    Runs every configuration over a pool of processes.
+
+    :param configurations_list: list of dicts, as generated by configurations
+    :param processes: int, the number of processes, all the cores if None
+    :param batch: Boolean, run the replicates of each combination together, see run_batch
+    :return: list of dicts, the rows of the results table in the order of the configurations
+    """
+
+    if batch:
+        errors = {batch_error(configuration) for configuration in configurations_list} - {None}
+        if errors:
+            raise ValueError(', '.join(sorted(errors)))
+        # configurations generates the replicates of each combination one after another
+        work = [list(replicates) for _combination, replicates
+                in itertools.groupby(configurations_list, key=combination)]
+        run = run_batch
+    else:
+        work = configurations_list
+        run = run_configuration
+
+    processes = processes or os.cpu_count()
+    if processes == 1:
+        results = [run(item) for item in work]
+    else:
+        chunk_size = max(1, len(work) // (processes * 4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(run, work, chunksize=chunk_size))
+
+    if batch:
+        return [row for rows in results for row in rows]
+    return results
+
+
+def write_table(rows, file_name):
+    """
+    Saves the results table as a csv file.
+
+    :param rows: list of dicts, the rows of the results table
+    :param file_name: string, to name the file
+    :return: nothing
+    """
+
+    with open(file_name, 'w', newline='') as table:
+        writer = csv.DictWriter(table, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_table(file_name):
+    """
+    Reads a results table saved by write_table.
+
+    :param file_name: string, the name of the file
+    :return: list of dicts, the rows of the results table, with numbers as floats
+    """
+
+    with open(file_name, newline='') as table:
+        rows = list(csv.DictReader(table))
+    for row in rows:
+        for field in FIELDS:
+            if field not in ('engine', 'agent_prob'):
+                row[field] = float(row[field])
+    return rows
+
+
+def curves(rows, measure):
+    """
+    Averages a measure over the replicates, as a curve against intolerance for each kind of board.
+
+    :param rows: list of dicts, the rows of the results table
+    :param measure: string, the field to average
+    :return: dict, from (width, height, empty_ratio, agent_prob) to a list of tuples
+        (intolerance, mean, standard deviation), sorted by intolerance
+    """
+
+    groups = {}
+    for row in rows:
+        board = (int(row['width']), int(row['height']), float(row['empty_ratio']), row['agent_prob'])
+        groups.setdefault(board, {}).setdefault(float(row['intolerance']), []).append(float(row[measure]))
+
+    return {board: [(intolerance, statistics.mean(values), statistics.pstdev(values))
+                    for intolerance, values in sorted(points.items())]
+            for board, points in groups.items()}
+
+
+def plot(rows, measure, title, file_name):
+    """
+    Creates a plot of a measure against intolerance and saves it.
+
+    :param rows: list of dicts, the rows of the results table
+    :param measure: string, the field to plot
+    :param title: string, to be the plot title
+    :param file_name: string, to name the file
+    :return: nothing
+    """
+
+    import matplotlib.pyplot as plt
+
+    figure, axes = plt.subplots()
+    for (width, height, empty_ratio, agent_prob), points in sorted(curves(rows, measure).items()):
+        intolerance, mean, deviation = zip(*points)
+        axes.errorbar(intolerance, mean, yerr=deviation, capsize=2,
+                      label='{}x{}, {} empty, agents {}'.format(width, height, empty_ratio, agent_prob))
+    axes.set_title(title)
+    axes.set_xlabel('Intolerance')
+    axes.legend(fontsize='small')
+    figure.savefig(file_name)
+    plt.close(figure)
+
+
+def add_arguments(parser):
+    """
+    Adds the arguments of the sweep command to a parser.
+
+    :param parser: argparse.ArgumentParser
+    :return: nothing
+    """
+
+    parser.add_argument('--sizes', dest='sizes',
+                        default=[100], nargs='+', type=int,
+                        help='boards\' width and height')
+    parser.add_argument('--empty_ratios', dest='empty_ratios',
+                        default=[0.10], nargs='+', type=float,
+                        help='boards\' percentages of empty houses (zero to one)')
+    parser.add_argument('--agents', dest='agent_probs',
+                        default=None, nargs='+', type=float, action='append',
+                        help='accumulative probabilities of spawning an agent of each race, '
+                             'repeat the option to sweep several (default 0.5 1)')
+    parser.add_argument('--intolerances', dest='intolerances',
+                        default=[round(0.05 * i, 2) for i in range(1, 18)], nargs='+', type=float,
+                        help='intolerance thresholds, the same for every race')
+    parser.add_argument('--replicates', dest='replicates',
+                        default=20, type=int,
+                        help='number of runs of each combination')
+    parser.add_argument('--iterations', dest='sweep_iterations',
+                        default=500, type=int,
+                        help='maximum number of iterations of each run')
+    parser.add_argument('--engine', dest='sweep_engine',
+                        default=None, choices=schelling.ENGINES,
+                        help='board\'s implementation (default array), with the main --update, '
+                             '--neighbourhood, --radius, --torus, --relocation and --candidates')
+    parser.add_argument('--incremental', dest='sweep_incremental', action='store_true',
+                        help='only check the agents whose neighbourhood changed')
+    parser.add_argument('--batch', dest='sweep_batch', action='store_true',
+                        help='run the replicates of each combination together, with the same results '
+                             'as the array engine, only with sequential updates and random relocation, '
+                             'and neither --engine nor --incremental')
+    parser.add_argument('--processes', dest='processes',
+                        default=None, type=int,
+                        help='number of processes (default all the cores)')
+    parser.add_argument('--seed', dest='sweep_seed',
+                        default=None, type=int,
+                        help='seed from which the seed of every run is derived')
+    parser.add_argument('--output', dest='output',
+                        default='sweep.csv',
+                        help='file to save the results table to')
+    parser.add_argument('--plot_prefix', dest='plot_prefix',
+                        default='sweep',
+                        help='prefix of the plots\' file names')
+
+
+def arguments_error(args):
+    """
+    Finds why the parsed command line arguments don't describe a sweep that can run.
+
+    :param args: argparse.Namespace, with the arguments added by add_arguments and the main ones
+    :return: string, the reason, or None if they do
+    """
+
+    engine = args.sweep_engine or 'array'
+    if args.sweep_batch:
+        if args.sweep_engine is not None:
+            return 'a batch runs on its own engine, not {}'.format(args.sweep_engine)
+        return batch_error({'engine': 'batch', 'incremental': args.sweep_incremental,
+                            'synchronous': args.update == 'synchronous', 'relocation': args.relocation})
+    if args.relocation != 'random' and engine not in schelling.RELOCATION_ENGINES:
+        return 'the {} relocation needs the neighbour counts kept by the {} engines'.format(
+            args.relocation, ', '.join(schelling.RELOCATION_ENGINES))
+    if args.relocation != 'random' and args.update == 'synchronous':
+        return 'the agents moving together with --update synchronous go to random empty houses, ' \
+            'not by the {} relocation'.format(args.relocation)
+    return None
+
+
+def main(args):
+    """
+    Runs the sweep described by the parsed command line arguments,
+    saves the results table and plots segregation, happiness and iterations against intolerance.
+
+    :param args: argparse.Namespace, with the arguments added by add_arguments and the main ones,
+        which arguments_error finds no fault with
+    :return: nothing
+    """
+
+    engine = 'batch' if args.sweep_batch else args.sweep_engine or 'array'
+    configurations_list = configurations(args.sizes, args.empty_ratios, args.agent_probs or [[0.5, 1]],
+                                         args.intolerances, args.replicates, engine,
+                                         args.sweep_iterations, args.sweep_incremental, args.sweep_seed,
+                                         args.neighbourhood, args.update == 'synchronous',
+                                         args.relocation, args.candidates)
+    print('Running {} boards'.format(len(configurations_list)))
+    rows = sweep(configurations_list, args.processes, args.sweep_batch)
+    write_table(rows, args.output)
+    print('The results were saved to {}'.format(args.output))
+
+    plot(rows, 'segregation', 'Segregation vs Intolerance', '{}_segregation.png'.format(args.plot_prefix))
+    plot(rows, 'happiness', 'Happiness vs Intolerance', '{}_happiness.png'.format(args.plot_prefix))
+    plot(rows, 'iterations', 'Iterations vs Intolerance', '{}_iterations.png'.format(args.plot_prefix))
@@ -0,0 +1,18 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Configuration of the tests of the Schelling's segregation model.
+
+The modules of the model import each other by name, as when schelling.py is run,
+so the directory above is put on the path before the tests import them.
+"""
+
+# Python Modules
+import os
+import sys
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
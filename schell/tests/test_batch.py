@@ -0,0 +1,54 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the batches of replicates: every replicate ends as an ArrayBoard with its seed,
+run on its own, would, and stops being checked once it converges.
+"""
+
+# Python Packages
+import numpy as np
+import pytest
+
+# Project Modules
+from neighbourhood import MOORE, Neighbourhood
+from schelling_array import ArrayBoard
+from schelling_batch import BatchBoard
+
+
+SEEDS = [3, 11, 12, 40, 41]
+
+
+@pytest.mark.parametrize('neighbourhood', [MOORE, Neighbourhood('von_neumann', 2, True)], ids=repr)
+@pytest.mark.parametrize('intolerance', [0.3, 0.6])
+def test_independent_boards(neighbourhood, intolerance):
+    batch = BatchBoard(len(SEEDS), 20, 16, 0.2, SEEDS, neighbourhood)
+    batch.populate([0.4, 1], [intolerance, intolerance])
+    iterations = batch.run(40).tolist()
+    metrics = batch.calculate_segregation_happiness()
+    for replicate, seed in enumerate(SEEDS):
+        board = ArrayBoard(20, 16, 0.2, seed, neighbourhood)
+        board.populate([0.4, 1], [intolerance, intolerance])
+        assert iterations[replicate] == board.run(40)
+        assert np.array_equal(batch.grid[replicate], board.grid)
+        assert list(batch.empty_houses[replicate]) == list(board.empty_houses)
+        assert metrics[replicate] == board.calculate_segregation_happiness()
+
+        taken = batch.board(replicate)
+        assert np.array_equal(taken.grid, board.grid)
+        assert np.array_equal(taken.counts, board.counts)
+        assert taken.iteration == iterations[replicate]
+
+
+def test_converged_boards():
+    batch = BatchBoard(len(SEEDS), 20, 16, 0.2, SEEDS)
+    batch.populate([0.5, 1], [0.3, 0.3])
+    iterations = batch.run(100)
+    assert not batch.active.any()
+    assert iterations.max() < 100
+    assert not batch.unhappy().any()
+    grid = batch.grid.copy()
+    assert np.array_equal(batch.run(5), iterations)
+    assert np.array_equal(batch.grid, grid)
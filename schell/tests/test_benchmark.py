@@ -0,0 +1,77 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the benchmarks: every engine and size is timed, the boards follow the main options,
+and the reports are saved and read back for the plots.
+"""
+
+# Python Modules
+import argparse
+
+# Python Packages
+import pytest
+
+# Project Modules
+import benchmark
+import schelling
+from neighbourhood import Neighbourhood
+
+
+def small_report(engines, **options):
+    """
+    Benchmarks a few small boards.
+
+    :param engines: list of strings, the boards' implementations
+    :param options: the neighbourhood, update mode and relocation, see benchmark.benchmark
+    :return: dict, the report
+    """
+
+    return benchmark.benchmark(engines, [12, 16], warmup=0, repeats=2, num_iterations=30, seed=4, **options)
+
+
+def test_report(tmp_path):
+    report = small_report(['agents', 'array'])
+    assert [(result['engine'], result['size']) for result in report['results']] == \
+        [('agents', 12), ('agents', 16), ('array', 12), ('array', 16)]
+    for result in report['results']:
+        for clock in ('wall', 'cpu'):
+            assert set(result[clock]) == set(benchmark.PHASES)
+            assert len(result[clock]['total']['samples']) == 2
+            assert result[clock]['total']['min'] <= result[clock]['total']['median'] <= result[clock]['total']['max']
+    # The exact engines run the same boards
+    assert report['results'][0]['iterations'] == report['results'][2]['iterations']
+
+    benchmark.save(report, str(tmp_path / 'benchmark.json'))
+    loaded = benchmark.load(str(tmp_path / 'benchmark.json'))
+    assert loaded == report
+    houses, seconds = benchmark.series(loaded, 'run')['array']
+    assert houses == [144, 256]
+    assert seconds == [result['wall']['run']['median'] for result in report['results'][2:]]
+
+
+@pytest.mark.parametrize('options', [{'neighbourhood': Neighbourhood('von_neumann', 2, True)},
+                                     {'synchronous': True}, {'relocation': 'best_of_k', 'candidates': 3}])
+def test_options_are_followed(options):
+    report = small_report(['array'], **options)
+    for key, value in options.items():
+        assert report['configuration'][key] == (value.describe() if key == 'neighbourhood' else value)
+
+    board = schelling.board_class('array')(16, 16, 0.1, 4, options.get('neighbourhood'),
+                                           options.get('relocation', 'random'), options.get('candidates', 8))
+    board.populate([0.5, 1], [0.5, 0.5])
+    assert report['results'][1]['iterations'] == board.run(30, synchronous=options.get('synchronous', False))
+
+
+@pytest.mark.parametrize('options, error', [
+    ({'relocation': 'nearest'}, True),
+    ({'relocation': 'nearest', 'engines': ['array', 'queue'], 'update': 'synchronous'}, True),
+    ({'relocation': 'nearest', 'engines': ['array', 'queue']}, False),
+    ({'update': 'synchronous'}, False),
+])
+def test_arguments_error(options, error):
+    args = argparse.Namespace(**dict({'engines': schelling.ENGINES,
+                                      'update': 'sequential', 'relocation': 'random'}, **options))
+    assert (benchmark.arguments_error(args) is not None) == error
@@ -0,0 +1,48 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the boards of Agent objects: the matrix of schelling.Board reads and writes its houses,
+and the legacy my_schelling.Board finds the same neighbours in every neighbourhood.
+"""
+
+# Python Packages
+import pytest
+
+# Project Modules
+import my_schelling
+import schelling
+from neighbourhood import MOORE, Neighbourhood
+
+
+def test_matrix():
+    board = schelling.Board(6, 4, 0.25, 2)
+    board.populate([0.5, 1], [0.5, 0.5])
+    matrix = board.matrix
+    assert [list(row) for row in matrix] == [board.houses[y * 6:(y + 1) * 6] for y in range(4)]
+    assert matrix[2][-1] is board.houses[17]
+    assert matrix[1][1:3] == board.houses[7:9]
+
+    agent = schelling.Agent(1, 0.5, 4, 3)
+    board.matrix[3][4] = agent
+    assert board.houses[22] is agent
+    matrix[0][::2] = [None, None, None]
+    assert board.houses[0:6:2] == [None, None, None]
+    with pytest.raises(ValueError):
+        matrix[0][:2] = [None]
+    with pytest.raises(IndexError):
+        matrix[0][6] = agent
+
+
+@pytest.mark.parametrize('neighbourhood', [MOORE, Neighbourhood('von_neumann', 2, True),
+                                           Neighbourhood('moore', 3, False)], ids=repr)
+def test_legacy_neighbours(neighbourhood):
+    board = schelling.Board(9, 7, 0.2, 4, neighbourhood)
+    board.populate([0.5, 1], [0.5, 0.5])
+    legacy = my_schelling.Board(9, 7, 0.2, neighbourhood)
+    legacy.matrix = [list(row) for row in board.matrix]
+    for agent in board.houses:
+        if agent is not None:
+            assert legacy.neighbours(agent) == board.neighbours(agent)
@@ -0,0 +1,99 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the checkpoints: every engine and relocation policy saves and loads its boards,
+and a loaded board runs exactly as the saved one would have.
+"""
+
+# Python Packages
+import pytest
+
+# Project Modules
+import checkpoint
+import schelling
+from neighbourhood import Neighbourhood
+from vacancies import POLICIES
+
+
+CASES = [(engine, 'random') for engine in schelling.ENGINES] + \
+    [(engine, policy) for engine in schelling.RELOCATION_ENGINES for policy in POLICIES if policy != 'random']
+
+
+def new_board(engine, relocation='random', seed=11):
+    """
+    Creates and populates a small board with three races.
+
+    :param engine: string, one of schelling.ENGINES
+    :param relocation: string, one of vacancies.POLICIES
+    :param seed: int, the seed of the board
+    :return: Board, ArrayBoard or one of its subclasses
+    """
+
+    options = {} if relocation == 'random' else {'relocation': relocation, 'candidates': 4}
+    board = schelling.board_class(engine)(24, 20, 0.25, seed, Neighbourhood('von_neumann', 2, True), **options)
+    board.populate([0.3, 0.7, 1], [0.6, 0.5, 0.7])
+    return board
+
+
+def state(board):
+    """
+    Gathers everything a run of a board depends on.
+
+    :param board: Board, ArrayBoard or one of its subclasses
+    :return: tuple
+    """
+
+    return (board.to_ints(), list(board.empty_houses), board.iteration, board.random.state(),
+            board.neighbourhood, getattr(board, 'relocation', 'random'), getattr(board, 'moves', None))
+
+
+@pytest.mark.parametrize('engine, relocation', CASES)
+def test_round_trip(tmp_path, engine, relocation):
+    board = new_board(engine, relocation)
+    board.run(2)
+    checkpoint.save(board, str(tmp_path / 'board.ck'))
+    loaded = checkpoint.load(str(tmp_path / 'board.ck'))
+
+    assert type(loaded) is type(board)
+    assert state(loaded) == state(board)
+    assert getattr(loaded, 'candidates', None) == getattr(board, 'candidates', None)
+
+
+@pytest.mark.parametrize('engine, relocation', CASES)
+def test_resume(tmp_path, engine, relocation):
+    reference = new_board(engine, relocation)
+    reference.run(30)
+    board = new_board(engine, relocation)
+    board.run(3, checkpoints=checkpoint.Checkpointer(str(tmp_path / 'board.ck'), 2))
+
+    resumed = checkpoint.load(str(tmp_path / 'board.ck'))
+    assert resumed.iteration == 3
+    resumed.run(30 - resumed.iteration)
+    assert state(resumed) == state(reference)
+
+
+@pytest.mark.parametrize('engine', schelling.ENGINES)
+def test_load_other_engine(tmp_path, engine):
+    reference = new_board('array')
+    reference.run(30)
+    board = new_board('array')
+    board.run(3)
+    checkpoint.save(board, str(tmp_path / 'board.ck'))
+
+    resumed = checkpoint.load(str(tmp_path / 'board.ck'), engine)
+    assert type(resumed) is schelling.board_class(engine)
+    if engine != 'queue':
+        # The queue engine moves the unhappy Agents in another order
+        resumed.run(30 - resumed.iteration)
+        assert state(resumed)[:4] == state(reference)[:4]
+
+
+def test_load_without_relocation(tmp_path):
+    board = new_board('array', 'nearest')
+    checkpoint.save(board, str(tmp_path / 'board.ck'))
+
+    with pytest.raises(ValueError):
+        checkpoint.load(str(tmp_path / 'board.ck'), 'agents')
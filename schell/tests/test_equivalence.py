@@ -0,0 +1,61 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the exact engines: with the same seed they end every run with the same board,
+the same order of empty houses and the same number of iterations (see equivalence.EXACT).
+"""
+
+# Python Packages
+import numpy as np
+import pytest
+
+# Project Modules
+import equivalence
+from neighbourhood import MOORE, Neighbourhood
+
+
+NEIGHBOURHOODS = [MOORE, Neighbourhood('von_neumann', 2, True)]
+
+
+def run(engine, seed, neighbourhood, incremental=False, synchronous=False):
+    """
+    Runs a small seeded board with an engine.
+
+    :param engine: string, one of equivalence.ENGINES
+    :param seed: int, the seed of the board
+    :param neighbourhood: neighbourhood.Neighbourhood
+    :param incremental: Boolean, only check the agents whose neighbourhood changed
+    :param synchronous: Boolean, move the unhappy agents together
+    :return: tuple, the final grid as a list of lists, the empty houses in order and the iterations run
+    """
+
+    result = equivalence.run_engine(engine, 16, 0.2, [0.3, 0.7, 1], 0.55, 60, seed, incremental, synchronous,
+                                    neighbourhood)
+    return result['grid'].tolist(), result['empty_houses'], result['iterations']
+
+
+@pytest.mark.parametrize('neighbourhood', NEIGHBOURHOODS, ids=repr)
+@pytest.mark.parametrize('seed', [1, 2])
+@pytest.mark.parametrize('engine', equivalence.EXACT['sequential'][1:])
+def test_sequential(engine, seed, neighbourhood):
+    assert run(engine, seed, neighbourhood) == run('agents', seed, neighbourhood)
+
+
+@pytest.mark.parametrize('neighbourhood', NEIGHBOURHOODS, ids=repr)
+@pytest.mark.parametrize('engine', ['agents', 'array', 'compiled'])
+def test_incremental(engine, neighbourhood):
+    assert run(engine, 3, neighbourhood, incremental=True) == run('agents', 3, neighbourhood)
+
+
+@pytest.mark.parametrize('neighbourhood', NEIGHBOURHOODS, ids=repr)
+@pytest.mark.parametrize('engine', equivalence.EXACT['synchronous'][1:])
+def test_synchronous(engine, neighbourhood):
+    assert run(engine, 4, neighbourhood, synchronous=True) == run('agents', 4, neighbourhood, synchronous=True)
+
+
+def test_runs_differ_by_seed():
+    first, second = run('array', 1, MOORE), run('array', 2, MOORE)
+    assert not np.array_equal(first[0], second[0])
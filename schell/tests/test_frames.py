@@ -0,0 +1,82 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the frame streams: a run resumed from a checkpoint after a crash records
+the same frames as a run that was never interrupted.
+"""
+
+# Python Packages
+import numpy as np
+import pytest
+
+# Project Modules
+import checkpoint
+import frames
+from schelling_array import ArrayBoard
+
+
+class Crash(Exception):
+    """
+    The crash of a run, while recording a frame.
+    """
+
+
+class CrashingWriter(frames.FrameWriter):
+    """
+    Class CrashingWriter has the attributes of frames.FrameWriter and 1 more:
+        crash: int, the iteration whose frame is never recorded, as the run crashes
+    """
+
+    def __init__(self, file_name, height, width, crash):
+        super().__init__(file_name, height, width)
+        self.crash = crash
+
+    def record(self, board, iteration, final=False):
+        if iteration == self.crash:
+            raise Crash
+        super().record(board, iteration, final)
+
+
+def new_board():
+    """
+    Creates and populates a small board.
+
+    :return: ArrayBoard
+    """
+
+    board = ArrayBoard(40, 30, 0.1, 4)
+    board.populate([0.5, 1], [0.7, 0.7])
+    return board
+
+
+def test_resume_after_crash(tmp_path):
+    full_name, part_name, checkpoint_name = (str(tmp_path / name) for name in ('full.npy', 'part.npy', 'run.ck'))
+    with frames.FrameWriter(full_name, 30, 40) as writer:
+        new_board().run(12, frames=writer)
+
+    # The checkpoint of iteration 5 is the last before the crash, frames 6 and 7 were recorded after it
+    writer = CrashingWriter(part_name, 30, 40, 8)
+    with pytest.raises(Crash):
+        new_board().run(12, frames=writer, checkpoints=checkpoint.Checkpointer(checkpoint_name, 5, writer))
+    writer.close()
+    assert len(frames.load(part_name)) == 8
+
+    board = checkpoint.load(checkpoint_name)
+    keep = checkpoint.read_header(checkpoint_name)[0]['frames']
+    assert (board.iteration, keep) == (5, 6)
+    with frames.FrameWriter(part_name, 30, 40, keep=keep) as writer:
+        writer.last = board.iteration
+        board.run(12 - board.iteration, frames=writer)
+
+    assert np.array_equal(frames.load(part_name), frames.load(full_name))
+
+
+def test_resume_with_fewer_frames(tmp_path):
+    with frames.FrameWriter(str(tmp_path / 'part.npy'), 30, 40) as writer:
+        writer.record(new_board(), 0)
+
+    with pytest.raises(ValueError):
+        frames.FrameWriter(str(tmp_path / 'part.npy'), 30, 40, keep=2)
@@ -0,0 +1,113 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the neighbourhoods: the neighbour tables and the neighbour counts
+are checked against the neighbours found house by house from the offsets.
+"""
+
+# Python Packages
+import numpy as np
+import pytest
+
+# Project Modules
+import neighbourhood
+from neighbourhood import Neighbourhood
+
+
+NEIGHBOURHOODS = [Neighbourhood('moore', 1, False), Neighbourhood('moore', 2, True),
+                  Neighbourhood('von_neumann', 3, False), Neighbourhood('von_neumann', 2, True)]
+
+
+def neighbours(hood, width, height, x, y):
+    """
+    Finds the neighbours of a house one offset at a time.
+
+    :param hood: Neighbourhood
+    :param width, height: int, the board's size
+    :param x, y: int, the coordinates of the house
+    :return: list of ints, the indices of the neighbours, in the order of the offsets
+    """
+
+    found = []
+    for offset_x, offset_y in hood.offsets:
+        near_x, near_y = x + offset_x, y + offset_y
+        if hood.torus:
+            found.append(near_y % height * width + near_x % width)
+        elif 0 <= near_x < width and 0 <= near_y < height:
+            found.append(near_y * width + near_x)
+    return found
+
+
+def direct_sum(hood, mask):
+    """
+    Counts the neighbours set in a mask house by house.
+
+    :param hood: Neighbourhood
+    :param mask: 2 dimensional numpy array of bool
+    :return: 2 dimensional numpy array of ints
+    """
+
+    height, width = mask.shape
+    flat = mask.ravel()
+    return np.array([[flat[neighbours(hood, width, height, x, y)].sum() for x in range(width)]
+                     for y in range(height)])
+
+
+@pytest.mark.parametrize('hood', NEIGHBOURHOODS, ids=repr)
+def test_table(hood):
+    width, height = 13, 9
+    table = hood.table(width, height)
+    assert table.indices is not None
+    for house in range(width * height):
+        y, x = divmod(house, width)
+        assert list(table[house]) == neighbours(hood, width, height, x, y)
+
+
+@pytest.mark.parametrize('hood', NEIGHBOURHOODS, ids=repr)
+def test_table_from_offsets(hood, monkeypatch):
+    monkeypatch.setattr(neighbourhood, 'TABLE_ENTRIES', 0)
+    width, height = 13, 9
+    table = hood.table(width, height)
+    assert table.indices is None
+    for house in range(width * height):
+        y, x = divmod(house, width)
+        assert table[house].tolist() == neighbours(hood, width, height, x, y)
+
+
+@pytest.mark.parametrize('hood', NEIGHBOURHOODS, ids=repr)
+def test_stencil_sum(hood):
+    mask = np.random.RandomState(1).rand(9, 13) < 0.4
+    assert (hood.stencil_sum(mask) == direct_sum(hood, mask)).all()
+
+
+def test_small_torus():
+    with pytest.raises(ValueError):
+        Neighbourhood('moore', 2, True).table(4, 10)
+
+
+@pytest.mark.parametrize('hood', NEIGHBOURHOODS + [Neighbourhood('moore', 7, False), Neighbourhood('moore', 6, True),
+                                                   Neighbourhood('von_neumann', 7, False),
+                                                   Neighbourhood('von_neumann', 5, True)], ids=repr)
+def test_summed_area_sum(hood):
+    masks = np.random.RandomState(3).rand(2, 17, 23) < 0.5
+    total = hood.summed_area_sum(masks)
+    assert total.dtype == hood.count_dtype
+    for mask, counts in zip(masks, total):
+        assert (counts == direct_sum(hood, mask)).all()
+        assert (counts == hood.stencil_sum(mask)).all()
+
+
+@pytest.mark.parametrize('kind', neighbourhood.KINDS)
+def test_summed_area_used(kind):
+    radius = 1
+    while Neighbourhood(kind, radius).size < neighbourhood.SUMMED_AREA_SIZE[kind]:
+        radius += 1
+    assert not Neighbourhood(kind, radius - 1).summed_area
+    hood = Neighbourhood(kind, radius, True)
+    assert hood.summed_area
+    assert hood.table(2 * radius + 3, 2 * radius + 1).indices is None
+    mask = np.random.RandomState(4).rand(2 * radius + 1, 2 * radius + 3) < 0.5
+    assert (hood.stencil_sum(mask) == direct_sum(hood, mask)).all()
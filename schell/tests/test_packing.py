@@ -0,0 +1,92 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the packed boards: they decode and load back to the board packed, and their counts and metrics,
+computed band by band, are those of the whole board.
+"""
+
+# Python Packages
+import numpy as np
+import pytest
+
+# Project Modules
+import happiness
+import packing
+import schelling
+from neighbourhood import MOORE, Neighbourhood
+
+
+NEIGHBOURHOODS = [MOORE, Neighbourhood('moore', 2, True), Neighbourhood('von_neumann', 3, False)]
+
+
+def new_board(num_races, width=37, height=29, seed=2):
+    """
+    Draws the races of a board at random, with a fifth of the houses empty.
+
+    :param num_races: int, the number of races
+    :param width, height: int, the board's size
+    :param seed: int, to draw the races
+    :return: tuple of 2 dimensional numpy arrays, the races (EMPTY if empty) and the intolerances,
+        the same for every Agent of a race
+    """
+
+    random = np.random.RandomState(seed)
+    races = random.randint(0, num_races, (height, width)).astype(np.int8)
+    races[random.rand(height, width) < 0.2] = happiness.EMPTY
+    intolerance = np.append(np.linspace(0.3, 0.7, num_races), 0.0)[races]
+    return races, intolerance
+
+
+@pytest.mark.parametrize('num_races, bits', [(2, 2), (3, 2), (3, 4), (15, 4)])
+def test_round_trip(num_races, bits, tmp_path):
+    races, intolerance = new_board(num_races)
+    packed = packing.pack(races, intolerance, bits)
+    assert packed.bits == bits
+    assert packed.words.shape == (29, -(-37 * bits // 8))
+    packing.save(packed, str(tmp_path / 'board.pack'))
+    loaded = packing.load(str(tmp_path / 'board.pack'))
+    assert loaded.neighbourhood == packed.neighbourhood
+    for board in (packed, loaded):
+        decoded_races, decoded_intolerance = board.to_arrays()
+        assert np.array_equal(decoded_races, races)
+        assert np.array_equal(decoded_intolerance, intolerance)
+        assert np.array_equal(board.rows(5, 9), races[5:9])
+
+
+def test_fewest_bits():
+    assert packing.pack(*new_board(3)).bits == 2
+    assert packing.pack(*new_board(4)).bits == 4
+
+
+def test_refused():
+    races, intolerance = new_board(4)
+    with pytest.raises(ValueError):
+        packing.pack(races, intolerance, 2)
+    intolerance[races == 1] = np.linspace(0.1, 0.9, int((races == 1).sum()))
+    with pytest.raises(ValueError):
+        packing.pack(races, intolerance)
+
+
+def test_not_packed(tmp_path):
+    (tmp_path / 'board.npy').write_bytes(b'\x93NUMPY not a packed board')
+    with pytest.raises(ValueError):
+        packing.load(str(tmp_path / 'board.npy'))
+
+
+@pytest.mark.parametrize('neighbourhood', NEIGHBOURHOODS, ids=repr)
+def test_bands(neighbourhood, monkeypatch):
+    monkeypatch.setattr(packing, 'CHUNK_ROWS', 6)
+    races, intolerance = new_board(3)
+    packed = packing.pack(races, intolerance, neighbourhood=neighbourhood)
+    whole = happiness.neighbour_counts(races, 3, neighbourhood)
+    rows = 0
+    for start, stop, counts in packed.neighbour_counts():
+        assert start == rows
+        assert np.array_equal(counts, whole[:, start:stop])
+        rows = stop
+    assert rows == 29
+    assert packed.calculate_segregation_happiness() == \
+        happiness.calculate_segregation_happiness(races, intolerance, schelling.similarity_table(3), neighbourhood)
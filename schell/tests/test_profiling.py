@@ -0,0 +1,55 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the run traces: every move, empty house pick and happiness evaluation is counted,
+one by one or moving together, and whatever the relocation policy.
+"""
+
+# Python Packages
+import pytest
+
+# Project Modules
+import profiling
+import schelling
+from neighbourhood import Neighbourhood
+
+
+def traced_run(engine, relocation='random', synchronous=False, num_iterations=4):
+    """
+    Runs a small board with a trace.
+
+    :param engine: string, one of schelling.ENGINES
+    :param relocation: string, one of vacancies.POLICIES
+    :param synchronous: Boolean, move the unhappy Agents together
+    :param num_iterations: int, the iterations to run
+    :return: tuple, with the board's number of Agents and the trace's totals
+    """
+
+    if engine == 'agents':
+        board = schelling.Board(30, 30, 0.2, 3)
+    else:
+        board = schelling.board_class(engine)(30, 30, 0.2, 3, Neighbourhood('moore', 1, False), relocation, 4)
+    board.populate([0.5, 1], [0.6, 0.6])
+    agents = int((board.to_arrays()[0] != -1).sum())
+    trace = profiling.RunTrace()
+    board.run(num_iterations, trace=trace, synchronous=synchronous)
+    return agents, trace.totals()
+
+
+@pytest.mark.parametrize('engine', schelling.ENGINES)
+def test_synchronous_counts(engine):
+    agents, totals = traced_run(engine, synchronous=True)
+    assert totals['move_agent_calls'] == totals['unhappy'] > 0
+    assert totals['empty_house_pick_calls'] == totals['unhappy']
+    assert totals['is_happy_calls'] == agents * totals['iterations']
+
+
+@pytest.mark.parametrize('engine', schelling.RELOCATION_ENGINES)
+@pytest.mark.parametrize('relocation', ['random', 'nearest', 'best_of_k'])
+def test_picks_counted(engine, relocation):
+    agents, totals = traced_run(engine, relocation)
+    assert totals['move_agent_calls'] > 0
+    assert totals['empty_house_pick_calls'] == totals['move_agent_calls']
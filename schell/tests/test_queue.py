@@ -0,0 +1,82 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the event-driven engine: the queue holds the unhappy Agents and no other,
+the neighbour counts follow the moves, and the runs end when every Agent is happy.
+"""
+
+# Python Packages
+import numpy as np
+import pytest
+
+# Project Modules
+import profiling
+import schelling_queue
+from neighbourhood import MOORE, Neighbourhood
+from schelling_queue import QueueBoard
+
+
+NEIGHBOURHOODS = [MOORE, Neighbourhood('von_neumann', 2, True), Neighbourhood('moore', 8, False)]
+
+
+def new_board(neighbourhood, seed=4, relocation='random'):
+    """
+    Creates and populates a small QueueBoard.
+
+    :param neighbourhood: neighbourhood.Neighbourhood
+    :param seed: int, the seed of the board
+    :param relocation: string, one of vacancies.POLICIES
+    :return: QueueBoard
+    """
+
+    board = QueueBoard(24, 20, 0.2, seed, neighbourhood, relocation)
+    board.populate([0.5, 1], [0.5, 0.5])
+    return board
+
+
+@pytest.mark.parametrize('neighbourhood', NEIGHBOURHOODS, ids=repr)
+def test_queue(neighbourhood):
+    board = new_board(neighbourhood)
+    for _iteration in range(5):
+        board.run(1)
+        counts = board.counts.copy()
+        board.count_neighbours()
+        assert (board.counts == counts).all()
+        assert board.queue == np.flatnonzero(board.unhappy()).tolist()
+        assert board.slots == {house: slot for slot, house in enumerate(board.queue)}
+        assert np.flatnonzero(board.queued).tolist() == board.queue
+
+
+@pytest.mark.parametrize('relocation', ['random', 'nearest', 'best_of_k'])
+def test_run_until_happy(relocation):
+    board = new_board(MOORE, relocation=relocation)
+    trace = profiling.RunTrace()
+    iterations = board.run(200, trace=trace)
+    assert iterations < 200
+    assert not board.queue
+    assert not board.unhappy().any()
+    assert board.moves == trace.totals()['move_agent_calls'] <= trace.totals()['unhappy']
+
+
+def test_seeded():
+    first, second = new_board(MOORE, 6), new_board(MOORE, 6)
+    first.run(3)
+    second.run(1)
+    second.run(2)
+    assert (first.grid == second.grid).all()
+    assert first.moves == second.moves
+    assert list(first.empty_houses) == list(second.empty_houses)
+
+
+def test_checked_at_once(monkeypatch):
+    at_once = new_board(Neighbourhood('moore', 4, True))
+    at_once.run(4)
+    monkeypatch.setattr(schelling_queue, 'VECTOR_NEIGHBOURS', 1000)
+    one_by_one = new_board(Neighbourhood('moore', 4, True))
+    one_by_one.run(4)
+    assert np.array_equal(at_once.grid, one_by_one.grid)
+    assert at_once.queue == one_by_one.queue
+    assert at_once.moves == one_by_one.moves
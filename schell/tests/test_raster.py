@@ -0,0 +1,67 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the PNG snapshots: the files are decoded back, chunk by chunk, into the houses written.
+"""
+
+# Python Modules
+import struct
+import zlib
+
+# Python Packages
+import numpy as np
+import pytest
+
+# Project Modules
+import raster
+
+
+def decode(png):
+    """
+    Decodes an indexed PNG without filters, as raster.encode writes them, checking every chunk.
+
+    :param png: bytes, the PNG file
+    :return: tuple, with the 2 dimensional numpy array of uint8 of the palette indices and the palette
+    """
+
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks = {}
+    position = 8
+    while position < len(png):
+        length, = struct.unpack('>I', png[position:position + 4])
+        kind = png[position + 4:position + 8]
+        data = png[position + 8:position + 8 + length]
+        crc, = struct.unpack('>I', png[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(kind + data)
+        chunks[kind] = data
+        position += 12 + length
+    assert list(chunks) == [b'IHDR', b'PLTE', b'IDAT', b'IEND']
+
+    width, height, depth, color, compression, filtering, interlace = struct.unpack('>IIBBBBB', chunks[b'IHDR'])
+    assert (depth, color, compression, filtering, interlace) == (8, 3, 0, 0, 0)
+    palette = [tuple(chunks[b'PLTE'][index:index + 3]) for index in range(0, len(chunks[b'PLTE']), 3)]
+    scanlines = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8).reshape(height, width + 1)
+    assert not scanlines[:, 0].any()
+    return scanlines[:, 1:], palette
+
+
+@pytest.mark.parametrize('scale', [1, 3])
+def test_round_trip(scale):
+    indices = np.random.RandomState(2).randint(0, len(raster.PALETTE), (7, 11)).astype(np.uint8)
+    pixels, palette = decode(raster.encode(indices, scale))
+    assert palette == raster.PALETTE
+    assert pixels.shape == (7 * scale, 11 * scale)
+    assert (pixels[::scale, ::scale] == indices).all()
+    assert (pixels == indices.repeat(scale, axis=0).repeat(scale, axis=1)).all()
+
+
+def test_write_png(tmp_path):
+    indices = np.arange(12, dtype=np.uint8).reshape(3, 4) % 3
+    palette = [(1, 2, 3), (4, 5, 6), (7, 8, 9)]
+    raster.write_png(indices.T, str(tmp_path / 'board.png'), palette=palette)
+    pixels, written = decode((tmp_path / 'board.png').read_bytes())
+    assert written == palette
+    assert (pixels == indices.T).all()
@@ -0,0 +1,93 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the parameter sweeps: the runs follow their configurations, batches end as the boards
+run one by one, the results table is saved and read back, and impossible sweeps are refused.
+"""
+
+# Python Modules
+import argparse
+
+# Python Packages
+import pytest
+
+# Project Modules
+import sweep
+from neighbourhood import MOORE, Neighbourhood
+
+
+def run(engine, batch=False, **options):
+    """
+    Runs a small sweep in this process.
+
+    :param engine: string, the boards' implementation, or batch
+    :param batch: Boolean, run the replicates of each combination together
+    :param options: the other arguments of sweep.configurations
+    :return: list of dicts, the rows of the results table
+    """
+
+    configurations_list = sweep.configurations([16], [0.2], [[0.5, 1]], [0.4, 0.6], 3, engine, 60, seed=7,
+                                               **options)
+    return sweep.sweep(configurations_list, 1, batch)
+
+
+def outcomes(rows):
+    """
+    Takes what the runs of a sweep ended with.
+
+    :param rows: list of dicts, the rows of the results table
+    :return: list of tuples, the seed, iterations, segregation and happiness of every run
+    """
+
+    return [(row['seed'], row['iterations'], row['segregation'], row['happiness']) for row in rows]
+
+
+def test_batch_as_array():
+    neighbourhood = Neighbourhood('von_neumann', 2, True)
+    rows = run('batch', True, neighbourhood=neighbourhood)
+    assert {row['engine'] for row in rows} == {'batch'}
+    assert outcomes(rows) == outcomes(run('array', neighbourhood=neighbourhood))
+
+
+def test_configurations_are_followed():
+    plain = outcomes(run('array'))
+    assert outcomes(run('agents')) == plain
+    assert outcomes(run('array', neighbourhood=Neighbourhood('moore', 2))) != plain
+    assert outcomes(run('array', synchronous=True)) != plain
+    assert outcomes(run('array', relocation='nearest')) != plain
+
+
+def test_refused_batches():
+    with pytest.raises(ValueError):
+        run('batch', True, synchronous=True)
+    with pytest.raises(ValueError):
+        run('array', True)
+
+
+@pytest.mark.parametrize('options, error', [
+    ({'sweep_batch': True, 'sweep_engine': 'compiled'}, True),
+    ({'sweep_batch': True, 'sweep_incremental': True}, True),
+    ({'sweep_batch': True, 'update': 'synchronous'}, True),
+    ({'sweep_batch': True, 'relocation': 'nearest'}, True),
+    ({'sweep_engine': 'agents', 'relocation': 'nearest'}, True),
+    ({'sweep_engine': 'queue', 'relocation': 'best_of_k', 'update': 'synchronous'}, True),
+    ({'sweep_batch': True}, False),
+    ({'sweep_engine': 'queue', 'relocation': 'best_of_k'}, False),
+])
+def test_arguments_error(options, error):
+    args = argparse.Namespace(**dict({'sweep_engine': None, 'sweep_batch': False, 'sweep_incremental': False,
+                                      'update': 'sequential', 'relocation': 'random',
+                                      'neighbourhood': MOORE}, **options))
+    assert (sweep.arguments_error(args) is not None) == error
+
+
+def test_table(tmp_path):
+    rows = run('array')
+    sweep.write_table(rows, str(tmp_path / 'sweep.csv'))
+    table = sweep.read_table(str(tmp_path / 'sweep.csv'))
+    assert [(row['seed'], row['iterations'], row['segregation']) for row in table] == \
+        [(row['seed'], row['iterations'], row['segregation']) for row in rows]
+    assert sorted(sweep.curves(table, 'segregation')[(16, 16, 0.2, '0.5 1')])[0][0] == 0.4
@@ -0,0 +1,189 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+Tests of the empty houses and of the relocation policies: the slots of the empty houses follow
+every change, and the nearest and best_of_k picks are checked against searches of every empty house,
+on bounded boards and on tori.
+"""
+
+# Python Packages
+import numpy as np
+import pytest
+
+# Project Modules
+import schelling
+from happiness import EMPTY
+from neighbourhood import Neighbourhood
+from vacancies import EmptyHouses, best_of
+
+
+NEIGHBOURHOODS = [Neighbourhood('moore', 1, False), Neighbourhood('moore', 1, True),
+                  Neighbourhood('moore', 2, True), Neighbourhood('von_neumann', 2, False)]
+
+
+def check_slots(empty_houses, expected):
+    """
+    Checks that the empty houses are the expected ones, in order, and that the slots point at them.
+
+    :param empty_houses: EmptyHouses
+    :param expected: list of tuples, the coordinates (x, y) of the empty houses, in order
+    :return: nothing
+    """
+
+    assert list(empty_houses) == expected
+    assert len(empty_houses) == len(expected)
+    slots = np.full(empty_houses.slots.shape, -1)
+    for slot, (x, y) in enumerate(expected):
+        slots[y * empty_houses.width + x] = slot
+        assert (x, y) in empty_houses
+        assert empty_houses[slot] == (x, y)
+    assert np.array_equal(empty_houses.slots, slots)
+
+
+def test_empty_houses():
+    width, height = 7, 5
+    random = np.random.RandomState(8)
+    houses = [(x, y) for y in range(height) for x in range(width)]
+    random.shuffle(houses)
+    expected, full = houses[:12], houses[12:]
+    empty_houses = EmptyHouses(width, height, expected)
+    check_slots(empty_houses, expected)
+    for _change in range(200):
+        change = random.randint(3)
+        if change == 0 and full:
+            house = full.pop(random.randint(len(full)))
+            empty_houses.add(house)
+            expected.append(house)
+        elif change == 1 and expected:
+            house = expected[random.randint(len(expected))]
+            empty_houses.remove(house)
+            full.append(house)
+            # The last house takes the slot of the removed one
+            last = expected.pop()
+            if last != house:
+                expected[expected.index(house)] = last
+        elif expected and full:
+            slot = random.randint(len(expected))
+            house = full.pop(random.randint(len(full)))
+            assert empty_houses.replace(slot, house) == expected[slot]
+            full.append(expected[slot])
+            expected[slot] = house
+        check_slots(empty_houses, expected)
+        assert all(house not in empty_houses for house in full)
+
+
+@pytest.mark.parametrize('engine', ['agents', 'array', 'queue'])
+@pytest.mark.parametrize('synchronous', [False, True])
+def test_empty_houses_follow_moves(engine, synchronous):
+    board = schelling.board_class(engine)(30, 20, 0.2, 9)
+    board.populate([0.5, 1], [0.6, 0.6])
+    board.run(4, synchronous=synchronous)
+    races, _intolerance = board.to_arrays()
+    check_slots(board.empty_houses, list(board.empty_houses))
+    assert sorted(board.empty_houses) == sorted((int(x), int(y)) for y, x in zip(*np.nonzero(races == -1)))
+
+
+def new_board(neighbourhood, relocation, seed=5):
+    """
+    Creates and populates a board whose sizes are not multiples of vacancies.BLOCK.
+
+    :param neighbourhood: neighbourhood.Neighbourhood
+    :param relocation: string, one of vacancies.POLICIES
+    :param seed: int, the seed of the board
+    :return: ArrayBoard
+    """
+
+    board = schelling.board_class('array')(70, 50, 0.2, seed, neighbourhood, relocation, 4)
+    board.populate([0.5, 1], [0.6, 0.6])
+    return board
+
+
+def agents(board):
+    """
+    Lists the Agents of a board.
+
+    :param board: ArrayBoard
+    :return: generator of tuples, the race, intolerance, coordinates and neighbours (set of house indices)
+        of every Agent
+    """
+
+    for y, x in zip(*np.nonzero(board.grid != EMPTY)):
+        x, y = int(x), int(y)
+        yield (int(board.grid[y, x]), float(board.intolerance[y, x]), x, y,
+               set(board.table[y * board.width + x].tolist()))
+
+
+def distance(board, x, y, other_x, other_y):
+    """
+    Computes the squared distance between two houses, across the edges of a torus.
+
+    :param board: ArrayBoard
+    :param x, y, other_x, other_y: int, the coordinates of the houses
+    :return: int
+    """
+
+    dx, dy = abs(other_x - x), abs(other_y - y)
+    if board.neighbourhood.torus:
+        dx, dy = min(dx, board.width - dx), min(dy, board.height - dy)
+    return dx * dx + dy * dy
+
+
+@pytest.mark.parametrize('neighbourhood', NEIGHBOURHOODS, ids=repr)
+def test_nearest(neighbourhood):
+    board = new_board(neighbourhood, 'nearest')
+    vacancies = board.vacancies
+    for _iteration in range(2):
+        for race, tolerance, x, y, near in list(agents(board))[::4]:
+            picked = vacancies.nearest(race, tolerance, x, y, near)
+            distances = [distance(board, x, y, empty_x, empty_y) for empty_x, empty_y in board.empty_houses
+                         if vacancies.similarity(race, empty_y * board.width + empty_x, near) >= tolerance]
+            if picked is None:
+                assert not distances
+            else:
+                assert vacancies.similarity(race, picked[1] * board.width + picked[0], near) >= tolerance
+                assert distance(board, x, y, *picked) == min(distances)
+        board.run(1)
+
+
+@pytest.mark.parametrize('neighbourhood', NEIGHBOURHOODS[:2], ids=repr)
+def test_best_of(neighbourhood):
+    board = new_board(neighbourhood, 'best_of_k')
+    for race, _tolerance, x, y, near in list(agents(board))[:300]:
+        house = y * board.width + x
+        state = board.random.state()
+        picked = best_of(board, race, house, board.candidates, near)
+        board.random.restore(state)
+        drawn = [board.empty_houses[slot] for slot in board.random.indices(len(board.empty_houses), 4)]
+
+        similarities = []
+        for empty_x, empty_y in drawn:
+            empty_house = empty_y * board.width + empty_x
+            liked, total = int(board.liked[race, empty_y, empty_x]), int(board.occupied[empty_y, empty_x])
+            if empty_house in near:
+                liked, total = liked - 1, total - 1
+            similarities.append(liked / total if total else 1.0)
+        # The first of the houses drawn that is ranked best
+        assert picked == drawn[similarities.index(max(similarities))]
+
+
+@pytest.mark.parametrize('relocation', ['nearest', 'best_of_k'])
+def test_relocation_moves(relocation):
+    board = new_board(Neighbourhood('moore', 1, True), relocation)
+    board.run(5)
+    empty = [(int(x), int(y)) for y, x in zip(*np.nonzero(board.grid == EMPTY))]
+    assert sorted(board.empty_houses) == sorted(empty)
+
+    # The neighbour counts kept up to date by the moves are those of the board as it ends
+    fresh = schelling.board_class('array')(70, 50, 0.2, 5, board.neighbourhood)
+    fresh.restore(board.grid.copy(), board.intolerance.copy(), np.array(board.empty_houses.houses))
+    assert np.array_equal(board.counts, fresh.counts)
+
+
+@pytest.mark.parametrize('relocation', ['nearest', 'best_of_k'])
+def test_relocation_not_synchronous(relocation):
+    board = new_board(Neighbourhood('moore', 1, False), relocation)
+    with pytest.raises(ValueError):
+        board.run(1, synchronous=True)
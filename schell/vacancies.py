@@ -0,0 +1,306 @@
+# CRC 2018/2019
+# Group 98
+# 71003, Carlos Branco
+# 78690, Isaac Vargas
+
+"""
+The empty houses of a board of the Schelling's segregation model.
+
+The empty houses are kept in a list, in no particular order, together with the position (slot)
+of every house of the board in that list. Picking a slot at random, finding a house, and
+replacing, adding or removing one take constant time, whatever the number of empty houses:
+a house is removed by moving the last one to its slot, and nothing is ever shifted.
+
+An unhappy Agent moves to a random empty house, unless the board has another relocation policy
+(POLICIES): the nearest empty house where the Agent would be happy, or the best of a few empty
+houses drawn at random. Both rank the empty houses by the neighbour counts an ArrayBoard keeps
+up to date, the attractiveness of every house for every race. The nearest house is found with a
+VacancyIndex, the empty houses welcoming each race, counted by blocks of the board.
+"""
+
+# Python Packages
+import numpy as np
+
+# Project Modules
+from happiness import EMPTY
+
+
+# Where an unhappy Agent moves to: a random empty house, the nearest one where it would be happy,
+# or the one it ranks best of a few drawn at random
+POLICIES = ['random', 'nearest', 'best_of_k']
+
+# Side, in houses, of the blocks of the board where a VacancyIndex counts the welcoming empty houses
+BLOCK = 16
+
+
+class EmptyHouses:
+    """
+    Class EmptyHouses has 3 attributes:
+        width: int, the width of the board, to number its houses (y * width + x)
+        houses: list of tuples, the coordinates (x, y) of the empty houses
+        slots: 1 dimensional numpy array of int32, the position in houses of each house of the board,
+            -1 if it is not empty
+    """
+
+    def __init__(self, width, height, houses=()):
+        self.width = width
+        self.houses = []
+        self.slots = np.full(width * height, -1, dtype=np.int32)
+        self._slots = memoryview(self.slots).cast('B').cast('i')
+        for house in houses:
+            self.add(house)
+
+    def __len__(self):
+        return len(self.houses)
+
+    def __iter__(self):
+        return iter(self.houses)
+
+    def __getitem__(self, slot):
+        return self.houses[slot]
+
+    def __contains__(self, house):
+        return self._slots[house[1] * self.width + house[0]] != -1
+
+    def __eq__(self, other):
+        if not isinstance(other, EmptyHouses):
+            return NotImplemented
+        return self.houses == other.houses
+
+    def __repr__(self):
+        return 'EmptyHouses({!r})'.format(self.houses)
+
+    def add(self, house):
+        """
+        Adds an empty house, in the last slot.
+
+        :param house: tuple of ints, the coordinates of a house that is not empty yet
+        :return: nothing
+        """
+
+        self._slots[house[1] * self.width + house[0]] = len(self.houses)
+        self.houses.append(house)
+
+    def remove(self, house):
+        """
+        Removes an empty house, moving the last house to its slot.
+
+        :param house: tuple of ints, the coordinates of an empty house
+        :return: nothing
+        """
+
+        slots = self._slots
+        index = house[1] * self.width + house[0]
+        slot = slots[index]
+        slots[index] = -1
+        last = self.houses.pop()
+        if last != house:
+            self.houses[slot] = last
+            slots[last[1] * self.width + last[0]] = slot
+
+    def replace(self, slot, house):
+        """
+        Replaces the empty house of a slot with another house, which takes its slot.
+
+        :param slot: int, the position of the empty house in houses
+        :param house: tuple of ints, the coordinates of a house that is not empty yet
+        :return: tuple of ints, the coordinates of the house replaced
+        """
+
+        slots = self._slots
+        replaced = self.houses[slot]
+        slots[replaced[1] * self.width + replaced[0]] = -1
+        slots[house[1] * self.width + house[0]] = slot
+        self.houses[slot] = house
+        return replaced
+
+
+class VacancyIndex:
+    """
+    Class VacancyIndex has 4 attributes:
+        board: ArrayBoard, whose empty houses are indexed, from its neighbour counts
+        thresholds: list of floats, the highest intolerance of the Agents of each race (list index)
+        welcoming: list of EmptyHouses, the empty houses where an Agent of each race would be happy
+        blocks: 3 dimensional numpy array of int32, where entry [r][i][j] is the number of houses
+            welcoming for race r in the block of BLOCK by BLOCK houses in row i and column j of blocks
+    """
+
+    def __init__(self, board):
+        self.board = board
+        grid, intolerance = board.grid, board.intolerance
+        num_races = len(board.similar)
+        self.thresholds = [float(intolerance[grid == race].max(initial=0)) for race in range(num_races)]
+        rows, columns = -(-board.height // BLOCK), -(-board.width // BLOCK)
+        self.blocks = np.zeros((num_races, rows, columns), dtype=np.int32)
+        self.welcoming = []
+        total = board.occupied
+        for race in range(num_races):
+            similarity = np.divide(board.liked[race], total, out=np.ones(grid.shape), where=total > 0)
+            ys, xs = np.nonzero((grid == EMPTY) & (similarity >= self.thresholds[race]))
+            self.welcoming.append(EmptyHouses(board.width, board.height, zip(xs.tolist(), ys.tolist())))
+            np.add.at(self.blocks[race], (ys // BLOCK, xs // BLOCK), 1)
+
+    def similarity(self, race, house, near=()):
+        """
+        Computes the fraction of the neighbours of a house an Agent of a race would rank as similar,
+        without the Agent moving there, if it is one of them now.
+
+        :param race: int, the Agent's race
+        :param house: int, the index of the house (y * width + x)
+        :param near: set of ints, the indices of the houses next to the Agent's house
+        :return: float, 1 if the house has no neighbours
+        """
+
+        board = self.board
+        counts = board._counts
+        liked = counts[race * board.grid.size + house]
+        total = counts[board.planes[0][-1] + house]
+        if house in near:
+            # Agents rank their own race as similar
+            liked -= 1
+            total -= 1
+        return liked / total if total else 1.0
+
+    def refresh(self, houses):
+        """
+        Checks again if some houses are welcoming for each race, after a move changed their neighbour counts.
+
+        :param houses: list of ints, the indices of the houses (y * width + x)
+        :return: nothing
+        """
+
+        width = self.board.width
+        cells = self.board._cells
+        for house in houses:
+            y, x = divmod(house, width)
+            empty = cells[house] == EMPTY
+            for race, welcoming in enumerate(self.welcoming):
+                welcome = empty and self.similarity(race, house) >= self.thresholds[race]
+                if welcome != ((x, y) in welcoming):
+                    if welcome:
+                        welcoming.add((x, y))
+                    else:
+                        welcoming.remove((x, y))
+                    self.blocks[race, y // BLOCK, x // BLOCK] += 1 if welcome else -1
+
+    def nearest(self, race, tolerance, x, y, near):
+        """
+        Finds the nearest empty house where an Agent would be happy, searching the blocks
+        around the Agent's in rings, and only within blocks with welcoming houses.
+
+        :param race: int, the Agent's race
+        :param tolerance: float, the Agent's intolerance
+        :param x, y: int, the coordinates of the Agent's house
+        :param near: set of ints, the indices of the houses next to the Agent's house
+        :return: tuple of ints, the coordinates of the house, or None if there is none
+        """
+
+        board = self.board
+        width, height = board.width, board.height
+        torus = board.neighbourhood.torus
+        blocks = self.blocks[race]
+        rows, columns = blocks.shape
+        slots = self.welcoming[race].slots.reshape(height, width)
+        block_x, block_y = x // BLOCK, y // BLOCK
+        visited = set()
+        best, best_distance = None, 0
+        for ring in range(max(rows, columns)):
+            # The houses of a ring of blocks are at least this far, less a smaller block at the edge of a torus
+            if best is not None and (max(ring - 1 - torus, 0) * BLOCK + 1) ** 2 > best_distance:
+                break
+            ring_blocks = around(block_x, block_y, ring)
+            if torus:
+                ring_blocks = [(column % columns, row % rows) for column, row in ring_blocks]
+            for column, row in ring_blocks:
+                if not (0 <= column < columns and 0 <= row < rows) or (column, row) in visited \
+                        or not blocks[row, column]:
+                    continue
+                visited.add((column, row))
+                top, left = row * BLOCK, column * BLOCK
+                gap_x, gap_y = gap(x, left, width, torus), gap(y, top, height, torus)
+                if best is not None and gap_x * gap_x + gap_y * gap_y >= best_distance:
+                    continue
+                ys, xs = np.nonzero(slots[top:top + BLOCK, left:left + BLOCK] >= 0)
+                ys += top
+                xs += left
+                dx, dy = np.abs(xs - x), np.abs(ys - y)
+                if torus:
+                    dx, dy = np.minimum(dx, width - dx), np.minimum(dy, height - dy)
+                distances = dx * dx + dy * dy
+                # The nearest house of the block that is welcoming without the Agent moving away
+                for house in np.argsort(distances, kind='stable').tolist():
+                    distance = int(distances[house])
+                    if best is not None and distance >= best_distance:
+                        break
+                    empty_x, empty_y = int(xs[house]), int(ys[house])
+                    if self.similarity(race, empty_y * width + empty_x, near) >= tolerance:
+                        best, best_distance = (empty_x, empty_y), distance
+                        break
+        return best
+
+
+def around(x, y, distance):
+    """
+    Lists the positions at a given distance from another along the rows or columns, whichever is farther:
+    the ring of the square of side 2 * distance + 1 around it.
+
+    :param x, y: int, the position in the middle
+    :param distance: int, the distance of the ring
+    :return: list of tuples of ints, the positions (x, y) of the ring
+    """
+
+    if distance == 0:
+        return [(x, y)]
+    sides = range(-distance, distance + 1)
+    return [(x + dx, y - distance) for dx in sides] + [(x + dx, y + distance) for dx in sides] + \
+        [(x - distance, y + dy) for dy in sides[1:-1]] + [(x + distance, y + dy) for dy in sides[1:-1]]
+
+
+def gap(position, start, size, torus):
+    """
+    Computes the distance along a row or column from a position to the nearest of the BLOCK positions of a block.
+
+    :param position: int, the position
+    :param start: int, the first position of the block
+    :param size: int, the number of positions of the row or column
+    :param torus: Boolean, the row or column wraps around
+    :return: int, 0 if the position is in the block
+    """
+
+    end = min(start + BLOCK, size) - 1
+    if start <= position <= end:
+        return 0
+    if torus:
+        return min((start - position) % size, (position - end) % size)
+    return max(start - position, position - end)
+
+
+def best_of(board, race, house, candidates, near):
+    """
+    Draws a few empty houses at random and picks the one where an Agent would rank
+    the largest fraction of its neighbours as similar.
+
+    :param board: ArrayBoard, whose neighbour counts rank the houses
+    :param race: int, the Agent's race
+    :param house: int, the index of the Agent's house (y * width + x)
+    :param candidates: int, the number of empty houses drawn
+    :param near: set of ints, the indices of the houses next to the Agent's house
+    :return: tuple of ints, the coordinates of the house picked
+    """
+
+    width = board.width
+    counts = board._counts
+    plane = race * board.grid.size
+    occupied = board.planes[0][-1]
+    best, best_similarity = None, -1.0
+    for slot in board.random.indices(len(board.empty_houses), candidates):
+        empty_x, empty_y = board.empty_houses[slot]
+        empty_house = empty_y * width + empty_x
+        liked, total = counts[plane + empty_house], counts[occupied + empty_house]
+        if empty_house in near:
+            liked -= 1
+            total -= 1
+        similarity = liked / total if total else 1.0
+        if similarity > best_similarity:
+            best, best_similarity = (empty_x, empty_y), similarity
+    return best